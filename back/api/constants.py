@@ -30,6 +30,15 @@ class DataType(TextChoices):
     VEGESTRATE = "vegestrate", "Vegestrate"
 
 
+# Datatypes the dashboard is computed from
+DASHBOARD_DATATYPES = (
+    DataType.TILE.value,
+    DataType.VULNERABILITY.value,
+    DataType.LCZ.value,
+    DataType.VEGESTRATE.value,
+)
+
+
 class FrontendDataType(TextChoices):
     """DataType enum used by the frontend"""
 
@@ -0,0 +1,60 @@
+"""Compute the DashboardSummary of the metropole, of every city and IRIS."""
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from tqdm import tqdm
+
+from api.constants import DASHBOARD_DATATYPES, GeoLevel
+from api.views.dashboard_views import DashboardView
+from iarbre_data.models import City, DashboardSummary, Iris
+from iarbre_data.utils.data_version import get_data_version
+
+
+class Command(BaseCommand):
+    help = "Compute the dashboard data of the metropole, of every city and IRIS"
+
+    def handle(self, *args, **options):
+        view = DashboardView()
+        # Read first: data changed during the computation makes the summaries stale
+        data_version = get_data_version(*DASHBOARD_DATATYPES)
+        summaries = [
+            DashboardSummary(
+                geolevel=DashboardSummary.METROPOLE,
+                code="",
+                data_version=data_version,
+                data=view.compute_dashboard(view.get_scope()),
+            )
+        ]
+        city_codes = City.objects.exclude(code__isnull=True).exclude(code="")
+        for code in tqdm(
+            city_codes.values_list("code", flat=True), desc="Processing cities"
+        ):
+            summaries.append(
+                DashboardSummary(
+                    geolevel=GeoLevel.CITY.value,
+                    code=code,
+                    data_version=data_version,
+                    data=view.compute_dashboard(view.get_scope(city_code=code)),
+                )
+            )
+        iris_codes = Iris.objects.exclude(code__isnull=True).exclude(code="")
+        for code in tqdm(
+            iris_codes.values_list("code", flat=True), desc="Processing IRIS"
+        ):
+            summaries.append(
+                DashboardSummary(
+                    geolevel=GeoLevel.IRIS.value,
+                    code=code,
+                    data_version=data_version,
+                    data=view.compute_dashboard(view.get_scope(iris_code=code)),
+                )
+            )
+
+        # Replace all the summaries at once, the view never sees a partial set
+        with transaction.atomic():
+            DashboardSummary.objects.all().delete()
+            DashboardSummary.objects.bulk_create(summaries)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully computed {len(summaries)} summaries!")
+        )
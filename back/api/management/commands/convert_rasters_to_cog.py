@@ -0,0 +1,37 @@
+"""Convert the rasters served by `/api/rasters/` to Cloud-Optimized GeoTIFF.
+
+`compute_plantability_raster` already writes COGs; this command converts the
+rasters produced elsewhere, such as the vegestrate raster, and those written
+before. Rasters already laid out as COG are left untouched.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.views.raster_views import RASTER_MAP
+from iarbre_data.utils.cog import convert_to_cog, is_cog
+
+# Raster type -> resampling of the overviews, nearest for classes
+RESAMPLING = {"plantability": "average"}
+
+
+class Command(BaseCommand):
+    help = "Convert the downloadable rasters to Cloud-Optimized GeoTIFF"
+
+    def handle(self, *args, **options):
+        for raster_type, (relative_path, _) in RASTER_MAP.items():
+            path = os.path.join(settings.MEDIA_ROOT, relative_path)
+            if not os.path.exists(path):
+                self.stdout.write(
+                    self.style.WARNING(f"{raster_type}: {path} not found, skipped")
+                )
+                continue
+            if is_cog(path):
+                self.stdout.write(f"{raster_type}: already a COG")
+                continue
+            convert_to_cog(path, resampling=RESAMPLING.get(raster_type, "nearest"))
+            self.stdout.write(f"{raster_type}: converted to COG")
+
+        self.stdout.write(self.style.SUCCESS("Successfully converted the rasters!"))
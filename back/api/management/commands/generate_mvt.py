@@ -62,6 +62,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Keep already existing tiles, do not delete them.",
         )
+        parser.add_argument(
+            "--prioritize-hits",
+            action="store_true",
+            help="Generate the most requested tiles first (see report_tile_hits).",
+        )
         parser.add_argument(
             "--min_zoom_level",
             type=int,
@@ -81,6 +86,7 @@ class Command(BaseCommand):
         zoom_levels: Tuple[int, int] = DEFAULT_ZOOM_LEVELS,
         number_of_threads_by_worker: int = 1,
         number_of_workers: int = 1,
+        prioritize_hits: bool = False,
     ) -> None:
         """
         Generate MVT tiles for a geographic model.
@@ -94,6 +100,7 @@ class Command(BaseCommand):
             zoom_levels (Tuple[int, int]): A tuple specifying the range of zoom levels
                                            to generate tiles for (inclusive).
             number_of_workers (int): The number of workers to use for generating tiles.
+            prioritize_hits (bool): Generate the most requested tiles first.
 
         Returns:
             None
@@ -105,7 +112,9 @@ class Command(BaseCommand):
             number_of_threads_by_worker=number_of_threads_by_worker,
         )
 
-        mvt_generator.generate_tiles(ignore_existing=False)
+        mvt_generator.generate_tiles(
+            ignore_existing=False, prioritize_hits=prioritize_hits
+        )
         self.stdout.write(self.style.SUCCESS("MVT tiles generated successfully!"))
 
     def handle(self, *args, **options):
@@ -164,4 +173,5 @@ class Command(BaseCommand):
             zoom_levels=zoom_levels,
             number_of_workers=number_of_workers,
             number_of_threads_by_worker=number_of_threads_by_worker,
+            prioritize_hits=options.get("prioritize_hits", False),
         )
@@ -0,0 +1,131 @@
+"""Report on MVT tile requests recorded by TileView.
+
+For each layer and zoom level, the report gives the number of requested tiles
+against the number of generated ones, how many tiles are needed to serve a given
+share of the traffic and the disk size of that working set. It is meant to choose
+which zoom levels should be pre-generated, how to size the tile cache and to feed
+`generate_mvt --prioritize-hits`.
+"""
+
+import os
+
+from django.core.management import BaseCommand
+from django.db.models import Count
+
+from api.models import TileHit
+from iarbre_data.models import MVTTile
+
+SIZE_SAMPLE = 100
+
+
+def tiles_for_share(hits: list[int], share: float) -> int:
+    """Number of most requested tiles needed to serve `share` of the hits.
+
+    Args:
+        hits (list[int]): Hits of each tile, sorted in descending order.
+        share (float): Share of the total hits, between 0 and 1.
+
+    Returns:
+        int: The number of tiles.
+    """
+    target = share * sum(hits)
+    cumulated = 0
+    for count, value in enumerate(hits, start=1):
+        cumulated += value
+        if cumulated >= target:
+            return count
+    return len(hits)
+
+
+def average_mvt_size(geolevel: str, datatype: str, zoom: int) -> float:
+    """Average file size in bytes of a random sample of generated tiles."""
+    sample = MVTTile.objects.filter(
+        geolevel=geolevel, datatype=datatype, zoom_level=zoom
+    ).order_by("?")[:SIZE_SAMPLE]
+    sizes = []
+    for mvt_tile in sample:
+        try:
+            sizes.append(os.path.getsize(mvt_tile.mvt_file.path))
+        except (OSError, ValueError):
+            continue
+    return sum(sizes) / len(sizes) if sizes else 0.0
+
+
+class Command(BaseCommand):
+    help = "Summarize recorded MVT tile requests by layer and zoom level."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--geolevel", type=str, help="Restrict to a geolevel.")
+        parser.add_argument("--datatype", type=str, help="Restrict to a datatype.")
+        parser.add_argument(
+            "--share",
+            type=float,
+            default=0.9,
+            help="Share of the traffic used to size the working set (default 0.9).",
+        )
+        parser.add_argument(
+            "--on-demand-threshold",
+            type=float,
+            default=0.05,
+            help="Below this ratio of requested/generated tiles a zoom level is "
+            "reported as an on-demand candidate (default 0.05).",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=0,
+            help="Also list the N most requested tiles.",
+        )
+
+    def handle(self, *args, **options):
+        hits_qs = TileHit.objects.all()
+        mvt_qs = MVTTile.objects.all()
+        for field in ("geolevel", "datatype"):
+            if options[field]:
+                hits_qs = hits_qs.filter(**{field: options[field]})
+                mvt_qs = mvt_qs.filter(**{field: options[field]})
+
+        if not hits_qs.exists():
+            self.stdout.write("No tile hit recorded yet.")
+            return
+
+        generated = {
+            (row["geolevel"], row["datatype"], row["zoom_level"]): row["total"]
+            for row in mvt_qs.values("geolevel", "datatype", "zoom_level").annotate(
+                total=Count("id")
+            )
+        }
+        hits_by_level = {}
+        for geolevel, datatype, zoom, hits in hits_qs.values_list(
+            "geolevel", "datatype", "zoom_level", "hits"
+        ):
+            hits_by_level.setdefault((geolevel, datatype, zoom), []).append(hits)
+
+        share = options["share"]
+        self.stdout.write(
+            f"{'layer':<35} {'zoom':>4} {'requested':>10} {'generated':>10} "
+            f"{'hits':>12} {f'tiles@{share:.0%}':>10} {'cache size':>11}  policy"
+        )
+        for (geolevel, datatype, zoom), hits in sorted(hits_by_level.items()):
+            hits.sort(reverse=True)
+            n_generated = generated.get((geolevel, datatype, zoom), 0)
+            n_working_set = tiles_for_share(hits, share)
+            cache_size_mb = (
+                n_working_set * average_mvt_size(geolevel, datatype, zoom) / 1e6
+            )
+            requested_ratio = len(hits) / n_generated if n_generated else 1.0
+            policy = (
+                "on-demand"
+                if requested_ratio < options["on_demand_threshold"]
+                else "pre-generate"
+            )
+            self.stdout.write(
+                f"{geolevel + '/' + datatype:<35} {zoom:>4} {len(hits):>10} "
+                f"{n_generated:>10} {sum(hits):>12} {n_working_set:>10} "
+                f"{cache_size_mb:>8.1f} MB  {policy}"
+            )
+
+        if options["top"]:
+            self.stdout.write(f"\nTop {options['top']} tiles:")
+            for tile_hit in hits_qs.order_by("-hits")[: options["top"]]:
+                self.stdout.write(f"  {tile_hit}")
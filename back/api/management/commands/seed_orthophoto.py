@@ -0,0 +1,167 @@
+"""Pre-seed the orthophoto tile archive from the Grand Lyon WMS.
+
+The metropole extent (union of the `City` geometries) is walked zoom by zoom, by
+metatiles, with a bounded number of concurrent WMS requests. Tiles are written to
+the MBTiles archive at `ORTHOPHOTO_ARCHIVE_PATH`, which `OrthophotoTileView` reads
+before falling back to the live proxy. Metatiles already in the archive are
+skipped, so an interrupted run can simply be launched again.
+"""
+
+import asyncio
+
+import mercantile
+from django.conf import settings
+from django.contrib.gis.db.models import Union
+from django.contrib.gis.geos import Polygon
+from django.core.management import BaseCommand
+from tqdm import tqdm
+
+from api.utils.http_client import get_http_client
+from api.utils.orthophoto import (
+    WMSError,
+    fetch_metatile,
+    get_orthophoto_archive,
+    slice_metatile,
+)
+from api.utils.tile_math import metatile_origin, metatile_to_bbox
+from iarbre_data.models import City
+from iarbre_data.settings import SRID_DOWNLOADED_DATA, SRID_MAPLIBRE
+
+
+def metatiles_covering(geometry, zoom: int, size: int) -> list[tuple[int, int, int]]:
+    """Origins (x0, y0) and side of the metatiles intersecting `geometry`.
+
+    Args:
+        geometry (GEOSGeometry): Area to cover, in EPSG:3857.
+        zoom (int): Zoom level.
+        size (int): Side of the metatiles, in tiles.
+
+    Returns:
+        list[tuple[int, int, int]]: (x0, y0, size) of each metatile.
+    """
+    prepared = geometry.prepared
+    west, south, east, north = geometry.transform(
+        SRID_DOWNLOADED_DATA, clone=True
+    ).extent
+    top_left = mercantile.tile(west, north, zoom)
+    bottom_right = mercantile.tile(east, south, zoom)
+    x_start, y_start, size = metatile_origin(zoom, top_left.x, top_left.y, size)
+
+    metatiles = []
+    for x0 in range(x_start, bottom_right.x + 1, size):
+        for y0 in range(y_start, bottom_right.y + 1, size):
+            bbox = Polygon.from_bbox(metatile_to_bbox(zoom, x0, y0, size))
+            if prepared.intersects(bbox):
+                metatiles.append((x0, y0, size))
+    return metatiles
+
+
+class Command(BaseCommand):
+    help = "Pre-seed the orthophoto tile archive over the metropole extent."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-zoom", type=int, default=14, help="First zoom level to seed."
+        )
+        parser.add_argument(
+            "--max-zoom", type=int, default=19, help="Last zoom level to seed."
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.ORTHOPHOTO_UPSTREAM_CONCURRENCY,
+            help="Maximum number of concurrent WMS requests.",
+        )
+        parser.add_argument(
+            "--metatile-size",
+            type=int,
+            default=settings.ORTHOPHOTO_METATILE_SIZE,
+            help="Side, in tiles, of the metatiles requested to the WMS (power of two).",
+        )
+
+    def handle(self, *args, **options):
+        geometry = City.objects.aggregate(union=Union("geometry"))["union"]
+        if geometry is None:
+            self.stderr.write("No city in database, nothing to seed.")
+            return
+        geometry.transform(SRID_MAPLIBRE)
+
+        archive = get_orthophoto_archive()
+        connection = archive.open_writer()
+        west, south, east, north = geometry.transform(
+            SRID_DOWNLOADED_DATA, clone=True
+        ).extent
+        archive.set_metadata(
+            connection,
+            {
+                "name": "Orthophoto Grand Lyon",
+                "type": "baselayer",
+                "format": "png",
+                "minzoom": options["min_zoom"],
+                "maxzoom": options["max_zoom"],
+                "bounds": f"{west},{south},{east},{north}",
+            },
+        )
+
+        failed = 0
+        try:
+            for zoom in range(options["min_zoom"], options["max_zoom"] + 1):
+                existing = archive.existing_tiles(connection, zoom)
+                metatiles = [
+                    (x0, y0, size)
+                    for x0, y0, size in metatiles_covering(
+                        geometry, zoom, options["metatile_size"]
+                    )
+                    if not all(
+                        (x0 + dx, y0 + dy) in existing
+                        for dx in range(size)
+                        for dy in range(size)
+                    )
+                ]
+                failed += asyncio.run(
+                    self._seed_zoom(
+                        archive, connection, zoom, metatiles, options["concurrency"]
+                    )
+                )
+        finally:
+            connection.close()
+
+        if failed:
+            self.stderr.write(
+                f"{failed} metatiles could not be fetched, run the command again "
+                "to retry them."
+            )
+        print(f"Orthophoto archive written to {archive.path}")
+
+    @staticmethod
+    async def _seed_zoom(archive, connection, zoom, metatiles, concurrency) -> int:
+        """Fetch and store `metatiles`, return the number of failed ones."""
+        pending = iter(metatiles)
+        progress = tqdm(total=len(metatiles), desc=f"Seeding zoom {zoom}")
+        failed = 0
+
+        async def worker():
+            nonlocal failed
+            for x0, y0, size in pending:
+                try:
+                    content = await fetch_metatile(zoom, x0, y0, size)
+                    tiles = (
+                        await asyncio.to_thread(
+                            slice_metatile, content, zoom, x0, y0, size
+                        )
+                    )["png"]
+                except WMSError:
+                    failed += 1
+                else:
+                    archive.put_many(
+                        connection,
+                        [(tile, sliced.content) for tile, sliced in tiles.items()],
+                    )
+                progress.update()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            progress.close()
+            await get_http_client().aclose()
+        return failed
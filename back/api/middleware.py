@@ -0,0 +1,34 @@
+"""Middlewares of the API."""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.deprecation import MiddlewareMixin
+
+_END = object()
+
+
+async def _async_chunks(chunks):
+    """Read a sync iterator chunk by chunk in the sync thread."""
+    iterator = iter(chunks)
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(iterator, _END)) is not _END:
+        yield chunk
+
+
+class AsyncStreamingMiddleware(MiddlewareMixin):
+    """Send the streaming responses of ASGI requests chunk by chunk.
+
+    Under ASGI, Django reads a streaming response built on a sync iterator
+    (file downloads, WFS output, batch scores) to the end before sending it.
+    Its content is wrapped in an async iterator computing each chunk in the
+    sync thread, where the ORM can be used.
+    """
+
+    def process_response(self, request, response):
+        if (
+            isinstance(request, ASGIRequest)
+            and response.streaming
+            and not response.is_async
+        ):
+            response.streaming_content = _async_chunks(response.streaming_content)
+        return response
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.13 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TileHit",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("geolevel", models.CharField(max_length=50)),
+                ("datatype", models.CharField(max_length=50)),
+                ("zoom_level", models.IntegerField()),
+                ("tile_x", models.IntegerField()),
+                ("tile_y", models.IntegerField()),
+                ("hits", models.BigIntegerField(default=0)),
+                ("last_hit", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "geolevel",
+                            "datatype",
+                            "zoom_level",
+                            "tile_x",
+                            "tile_y",
+                        ),
+                        name="unique_tile_hit",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -19,3 +19,33 @@ class Feedback(TimeStampedModel):
 
     def __str__(self):
         return f"Feedback from {self.email or 'Anonymous'}"
+
+
+class TileHit(models.Model):
+    """Sampled number of requests received by an MVT tile.
+
+    Rows are written by `api.utils.tile_analytics.TileHitRecorder` and read by the
+    `report_tile_hits` and `generate_mvt --prioritize-hits` commands.
+    """
+
+    geolevel = models.CharField(max_length=50)
+    datatype = models.CharField(max_length=50)
+    zoom_level = models.IntegerField()
+    tile_x = models.IntegerField()
+    tile_y = models.IntegerField()
+    hits = models.BigIntegerField(default=0)
+    last_hit = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["geolevel", "datatype", "zoom_level", "tile_x", "tile_y"],
+                name="unique_tile_hit",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.geolevel}/{self.datatype}/{self.zoom_level}/"
+            f"{self.tile_x}/{self.tile_y}: {self.hits} hits"
+        )
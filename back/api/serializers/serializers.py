@@ -3,6 +3,7 @@ import json
 from rest_framework import serializers
 
 from iarbre_data.models import (
+    Cadastre,
     City,
     Iris,
     Lcz,
@@ -116,6 +117,38 @@ class IrisSerializer(serializers.ModelSerializer):
         )
 
 
+class CadastreSerializer(serializers.ModelSerializer):
+    vulnerability_indice_day = serializers.FloatField(
+        source="vulnerability_idx.vulnerability_index_day",
+        allow_null=True,
+        default=None,
+    )
+    vulnerability_indice_night = serializers.FloatField(
+        source="vulnerability_idx.vulnerability_index_night",
+        allow_null=True,
+        default=None,
+    )
+
+    class Meta:
+        model = Cadastre
+        fields = (
+            "id",
+            "parcel_id",
+            "city_code",
+            "city_name",
+            "section",
+            "numero",
+            "surface",
+            "plantability_counts",
+            "average_normalized_indice",
+            "plantable_area",
+            "vulnerability_indice_day",
+            "vulnerability_indice_night",
+            "geolevel",
+            "datatype",
+        )
+
+
 class VegestrateSerializer(serializers.ModelSerializer):
     indice = serializers.CharField(source="strate")
 
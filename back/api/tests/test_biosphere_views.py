@@ -1,7 +1,14 @@
+import os
+import tempfile
+
+import numpy as np
+import rasterio
 from django.contrib.gis.geos import Polygon
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from rasterio.transform import from_origin
 
+from api.utils import land_cover_composition
 from iarbre_data.models import BiosphereFunctionalIntegrityLandCover
 from iarbre_data.settings import SRID_DB
 from iarbre_data.utils.biosphere_land_cover import LandCoverClass
@@ -42,3 +49,59 @@ class BiosphereLandCoverAtPointViewTest(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), [])
+
+
+@override_settings(LAND_COVER_FROM_RASTER=True)
+class BiosphereLandCoverFromRasterTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.media_root.name, "rasters"))
+        # 4 km square of 4 m pixels, Feuillu (9) west of x = 845000, Bâtiment (1) east
+        classes = np.ones((1000, 1000), dtype=np.uint8)
+        classes[:, :500] = 9
+        with rasterio.open(
+            os.path.join(
+                self.media_root.name,
+                "rasters",
+                land_cover_composition.LAND_COVER_RASTER,
+            ),
+            "w",
+            driver="GTiff",
+            height=1000,
+            width=1000,
+            count=1,
+            dtype="uint8",
+            nodata=0,
+            crs=f"EPSG:{SRID_DB}",
+            transform=from_origin(843000, 6527000, 4, 4),
+        ) as dst:
+            dst.write(classes, 1)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.url = reverse("biosphere-land-cover-at-point")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_land_cover_from_raster(self):
+        # About 40 m east of the boundary between the two land covers
+        response = self.client.get(self.url, {"lat": 45.8095, "lng": 4.8677})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [d["landCover"] for d in data],
+            [LandCoverClass.FEUILLU, LandCoverClass.BATIMENT],
+        )
+        self.assertEqual([d["binary"] for d in data], [True, False])
+        self.assertAlmostEqual(sum(d["percentage"] for d in data), 100, delta=0.2)
+        self.assertGreater(data[0]["percentage"], 40)
+        self.assertLess(data[0]["percentage"], 50)
+
+    def test_outside_raster_returns_empty(self):
+        response = self.client.get(self.url, {"lat": 48.8566, "lng": 2.3522})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
@@ -0,0 +1,55 @@
+from django.contrib.gis.geos import Polygon
+from django.test import TestCase
+from django.urls import reverse
+
+from iarbre_data.factories import VulnerabilityFactory
+from iarbre_data.models import Cadastre
+from iarbre_data.settings import SRID_DB
+
+
+class CadastreDetailViewTest(TestCase):
+    def setUp(self):
+        geometry = Polygon.from_bbox((845000, 6525000, 845100, 6525100))
+        geometry.srid = SRID_DB
+        self.vulnerability = VulnerabilityFactory(
+            vulnerability_index_day=5.0, vulnerability_index_night=4.0
+        )
+        Cadastre.objects.create(
+            geometry=geometry,
+            parcel_id="69123000AB0001",
+            city_code="69123",
+            plantability_counts={"8": 400},
+            average_normalized_indice=8.0,
+            plantable_area=10000.0,
+            vulnerability_idx=self.vulnerability,
+        )
+        Cadastre.objects.create(
+            geometry=geometry, parcel_id="69123000AB0002", city_code="69123"
+        )
+
+    def test_parcel_stats(self):
+        response = self.client.get(
+            reverse("cadastre-detail", kwargs={"parcel_id": "69123000AB0001"})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["averageNormalizedIndice"], 8.0)
+        self.assertEqual(data["plantableArea"], 10000.0)
+        self.assertEqual(data["vulnerabilityIndiceDay"], 5.0)
+        self.assertEqual(data["vulnerabilityIndiceNight"], 4.0)
+
+    def test_parcel_without_stats(self):
+        response = self.client.get(
+            reverse("cadastre-detail", kwargs={"parcel_id": "69123000AB0002"})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["vulnerabilityIndiceDay"])
+
+    def test_unknown_parcel(self):
+        response = self.client.get(
+            reverse("cadastre-detail", kwargs={"parcel_id": "unknown"})
+        )
+
+        self.assertEqual(response.status_code, 404)
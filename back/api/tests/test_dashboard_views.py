@@ -1,9 +1,21 @@
+import threading
+
 from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import SimpleTestCase, TestCase, Client, override_settings
 from django.urls import reverse
 
-from api.views.dashboard_views import _avg_from_counts, _m2_to_ha, _safe_round
+from api.constants import DASHBOARD_DATATYPES, DataType
+from api.views.dashboard_views import (
+    DashboardView,
+    _avg_from_counts,
+    _m2_to_ha,
+    _safe_round,
+)
+from iarbre_data.models import AdminUnitOverlay, DashboardSummary
 from iarbre_data.settings import SRID_DB
+from iarbre_data.utils.data_version import bump_data_version, get_data_version
 from iarbre_data.factories import (
     CityFactory,
     IrisFactory,
@@ -24,6 +36,7 @@ GEOM = Polygon(
 )
 
 NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
 
 @override_settings(CACHES=NO_CACHE)
@@ -746,3 +759,260 @@ class DashboardViewAreaHaTest(TestCase):
     def test_metropole_area_ha(self):
         data = self.client.get(self.url).json()
         self.assertGreater(data["areaHa"], 0)
+
+
+@override_settings(CACHES=NO_CACHE)
+class DashboardSummaryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.city = CityFactory(
+            code="69123",
+            name="Lyon",
+            geometry=GEOM,
+            plantability_counts={"0": 10, "2": 20, "4": 30, "6": 40, "8": 50, "10": 60},
+        )
+        IrisFactory(
+            code="691230101",
+            name="Presqu'ile",
+            city=cls.city,
+            geometry=GEOM,
+            plantability_counts={"0": 1, "10": 3},
+        )
+        VulnerabilityFactory(
+            geometry=GEOM, vulnerability_index_day=6.0, vulnerability_index_night=4.0
+        )
+        VegestrateFactory(geometry=GEOM, strate="arborescent", surface=20_000)
+
+    def test_summaries_match_computed_dashboard(self):
+        url = reverse("dashboard")
+        params = [{}, {"city_code": "69123"}, {"iris_code": "691230101"}]
+        computed = [self.client.get(url, query).json() for query in params]
+
+        call_command("compute_dashboard_summaries")
+
+        self.assertEqual(DashboardSummary.objects.count(), 3)
+        for query, expected in zip(params, computed):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(url, query).json(), expected)
+
+    def test_dashboard_is_read_from_summary(self):
+        DashboardSummary.objects.create(
+            geolevel="city",
+            code="69123",
+            data={"areaHa": 12.5},
+            data_version=get_data_version(*DASHBOARD_DATATYPES),
+        )
+
+        response = self.client.get(reverse("dashboard"), {"city_code": "69123"})
+
+        self.assertEqual(response.json(), {"areaHa": 12.5})
+
+    def test_summary_of_older_data_is_not_served(self):
+        DashboardSummary.objects.create(
+            geolevel="city",
+            code="69123",
+            data={"areaHa": 12.5},
+            data_version=get_data_version(*DASHBOARD_DATATYPES),
+        )
+
+        bump_data_version(DataType.VULNERABILITY.value)
+        response = self.client.get(reverse("dashboard"), {"city_code": "69123"})
+
+        self.assertNotEqual(response.json(), {"areaHa": 12.5})
+        self.assertGreater(response.json()["areaHa"], 0)
+
+
+# 200 x 100 m, half of it outside of GEOM
+HALF_OVERLAPPING_GEOM = Polygon(
+    (
+        (845050, 6525000),
+        (845250, 6525000),
+        (845250, 6525100),
+        (845050, 6525100),
+        (845050, 6525000),
+    ),
+    srid=SRID_DB,
+)
+
+
+@override_settings(CACHES=NO_CACHE)
+class DashboardAdminUnitOverlayTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.city = CityFactory(code="69123", name="Lyon", geometry=GEOM)
+        IrisFactory(code="691230101", city=cls.city, geometry=GEOM)
+        cls.vulnerability = VulnerabilityFactory(
+            geometry=GEOM, vulnerability_index_day=6.0, vulnerability_index_night=4.0
+        )
+        cls.overlapping_vulnerability = VulnerabilityFactory(
+            geometry=HALF_OVERLAPPING_GEOM,
+            vulnerability_index_day=2.0,
+            vulnerability_index_night=4.0,
+        )
+        VegestrateFactory(
+            geometry=HALF_OVERLAPPING_GEOM, strate="arborescent", surface=20_000
+        )
+        LczFactory(geometry=GEOM, lcz_index="2", details={"ror": 30.0, "hre": 10.0})
+        LczFactory(
+            geometry=HALF_OVERLAPPING_GEOM,
+            lcz_index="A",
+            details={"ror": 60.0, "hre": 0.0},
+        )
+
+    def _get(self, **params):
+        return self.client.get(reverse("dashboard"), params).json()
+
+    def test_overlays_store_intersection_area_and_weight(self):
+        call_command("compute_admin_unit_overlays")
+
+        overlay = AdminUnitOverlay.objects.get(
+            geolevel="city", vulnerability=self.overlapping_vulnerability
+        )
+        self.assertAlmostEqual(overlay.intersection_area, 5_000)
+        self.assertAlmostEqual(overlay.weight, 0.25)
+        # City and IRIS, each with 2 vulnerability, 1 vegestrate and 2 LCZ overlays
+        self.assertEqual(AdminUnitOverlay.objects.count(), 10)
+
+    def test_without_overlays_every_intersecting_feature_counts_the_same(self):
+        data = self._get(city_code="69123")
+
+        self.assertAlmostEqual(data["vulnerability"]["averageDay"], 4.0)
+        self.assertEqual(data["vegetation"]["treesSurfaceHa"], 2.0)
+
+    def test_metrics_are_weighted_by_intersection_area(self):
+        call_command("compute_admin_unit_overlays")
+
+        for params in [{"city_code": "69123"}, {"iris_code": "691230101"}]:
+            with self.subTest(params=params):
+                data = self._get(**params)
+                # (6 * 10 000 + 2 * 5 000) / 15 000
+                self.assertAlmostEqual(
+                    data["vulnerability"]["averageDay"], 14 / 3, places=1
+                )
+                self.assertAlmostEqual(data["vulnerability"]["averageNight"], 4.0)
+                # A quarter of the vegetation polygon is inside the scope
+                self.assertEqual(data["vegetation"]["treesSurfaceHa"], 0.5)
+                # (30 * 10 000 + 60 * 5 000) / 15 000
+                self.assertAlmostEqual(
+                    data["lcz"]["impermeableSurfaceRate"], 40.0, places=1
+                )
+                # Only the built LCZ is averaged
+                self.assertAlmostEqual(data["lcz"]["averageBuildingHeight"], 10.0)
+
+    def test_layer_without_overlays_falls_back_to_intersects(self):
+        call_command("compute_admin_unit_overlays")
+        # As after import_lcz
+        AdminUnitOverlay.objects.filter(lcz__isnull=False).delete()
+
+        data = self._get(city_code="69123")
+
+        self.assertAlmostEqual(data["vulnerability"]["averageDay"], 14 / 3, places=1)
+        # (30 + 60) / 2
+        self.assertAlmostEqual(data["lcz"]["impermeableSurfaceRate"], 45.0)
+
+    def test_metropole_ignores_overlays(self):
+        call_command("compute_admin_unit_overlays")
+
+        data = self._get()
+
+        self.assertAlmostEqual(data["vulnerability"]["averageDay"], 4.0)
+
+
+@override_settings(CACHES=NO_CACHE)
+class DashboardSectionTimingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CityFactory(code="69123", geometry=GEOM)
+
+    def test_section_durations_are_in_server_timing_header(self):
+        response = self.client.get(reverse("dashboard"), {"city_code": "69123"})
+
+        timings = [entry.split(";") for entry in response["Server-Timing"].split(", ")]
+        self.assertEqual(
+            [name for name, _ in timings],
+            ["plantability", "vulnerability", "vegetation", "lcz"],
+        )
+        for _, duration in timings:
+            self.assertTrue(duration.startswith("dur="))
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_cached_response_has_no_server_timing(self):
+        cache.clear()
+        self.client.get(reverse("dashboard"), {"city_code": "69123"})
+
+        response = self.client.get(reverse("dashboard"), {"city_code": "69123"})
+
+        self.assertNotIn("Server-Timing", response)
+
+
+@override_settings(DASHBOARD_SECTION_WORKERS=4)
+class DashboardConcurrentSectionsTest(SimpleTestCase):
+    def test_sections_are_computed_by_the_pool(self):
+        view = DashboardView()
+        threads = {}
+
+        def aggregate(name):
+            def compute(scope):
+                threads[name] = threading.current_thread().name
+                return {"name": name}
+
+            return compute
+
+        names = ["plantability", "vulnerability", "vegetation", "lcz"]
+        for name in names:
+            setattr(view, f"_aggregate_{name}", aggregate(name))
+
+        sections = view._compute_sections(scope=None)
+
+        self.assertEqual(list(sections), names)
+        for name, (section, duration) in sections.items():
+            self.assertEqual(section, {"name": name})
+            self.assertGreaterEqual(duration, 0)
+            self.assertTrue(threads[name].startswith("dashboard"))
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class DashboardVersionedCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CityFactory(code="69123", geometry=GEOM)
+
+    def setUp(self):
+        cache.clear()
+        self.summary = DashboardSummary.objects.create(
+            geolevel="city",
+            code="69123",
+            data={"areaHa": 1.0},
+            data_version=get_data_version(*DASHBOARD_DATATYPES),
+        )
+
+    def _get(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(
+            reverse("dashboard"), {"city_code": "69123"}, headers=headers
+        )
+
+    def test_response_is_revalidated_with_etag(self):
+        response = self._get()
+
+        self.assertIn("max-age=0", response["Cache-Control"])
+        self.assertIn("must-revalidate", response["Cache-Control"])
+        self.assertEqual(response["X-Accel-Expires"], "60")
+        self.assertEqual(self._get(etag=response["ETag"]).status_code, 304)
+
+    def test_response_is_cached_until_its_data_changes(self):
+        etag = self._get()["ETag"]
+        self.summary.data = {"areaHa": 2.0}
+        self.summary.save()
+
+        bump_data_version(DataType.CADASTRE.value)
+        self.assertEqual(self._get().json(), {"areaHa": 1.0})
+        self.assertEqual(self._get(etag=etag).status_code, 304)
+
+        # As compute_dashboard_summaries does after an import
+        self.summary.data_version = bump_data_version(*DASHBOARD_DATATYPES)
+        self.summary.save()
+        response = self._get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"areaHa": 2.0})
+        self.assertNotEqual(response["ETag"], etag)
@@ -0,0 +1,114 @@
+import os
+import tempfile
+
+from django.test import Client, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from api.utils.file_range import RangeNotSatisfiable, parse_range
+
+CONTENT = bytes(range(256)) * 4
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range("bytes=0-99", 1024), (0, 99))
+        self.assertEqual(parse_range("bytes=1000-", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=1000-5000", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=-24", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=-5000", 1024), (0, 1023))
+
+    def test_ignored_ranges(self):
+        for header in ["", "bytes=-", "bytes=10-5", "bytes=0-1,5-9", "items=0-9"]:
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1024))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ["bytes=1024-", "bytes=-0"]:
+            with self.subTest(header=header):
+                with self.assertRaises(RangeNotSatisfiable):
+                    parse_range(header, 1024)
+
+
+class ExportDownloadViewTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.media_root.name, "exports"))
+        with open(
+            os.path.join(self.media_root.name, "exports", "plantability.fgb"), "wb"
+        ) as f:
+            f.write(CONTENT)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.url = reverse(
+            "download-export",
+            kwargs={"layer": "plantability", "export_format": "fgb"},
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("plantability.fgb", response["Content-Disposition"])
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=8-15")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[8:16])
+        self.assertEqual(response["Content-Length"], "8")
+        self.assertEqual(response["Content-Range"], f"bytes 8-15/{len(CONTENT)}")
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[-10:])
+
+    def test_head(self):
+        response = self.client.head(self.url, HTTP_RANGE="bytes=8-15")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, b"")
+        self.assertFalse(response.streaming)
+        self.assertEqual(response["Content-Length"], "8")
+        self.assertEqual(response["Content-Range"], f"bytes 8-15/{len(CONTENT)}")
+        self.assertIn("plantability.fgb", response["Content-Disposition"])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+        # The file changed since the client read the first range
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"outdated"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+
+    def test_missing_export(self):
+        url = reverse(
+            "download-export",
+            kwargs={"layer": "vegestrate", "export_format": "parquet"},
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unknown_export(self):
+        url = reverse(
+            "download-export", kwargs={"layer": "lcz", "export_format": "fgb"}
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
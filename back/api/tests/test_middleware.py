@@ -0,0 +1,49 @@
+import io
+
+from asgiref.sync import async_to_sync
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
+
+from api.middleware import AsyncStreamingMiddleware
+
+
+async def read(response) -> bytes:
+    return b"".join([chunk async for chunk in response])
+
+
+class AsyncStreamingMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.middleware = AsyncStreamingMiddleware(lambda request: None)
+
+    def test_asgi_streaming_response(self):
+        response = self.middleware.process_response(
+            AsyncRequestFactory().get("/"),
+            StreamingHttpResponse(iter([b"a", b"b"])),
+        )
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(async_to_sync(read)(response), b"ab")
+
+    def test_asgi_file_response(self):
+        content = b"x" * 100_000
+        response = self.middleware.process_response(
+            AsyncRequestFactory().get("/"), FileResponse(io.BytesIO(content))
+        )
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(response["Content-Length"], str(len(content)))
+        self.assertEqual(async_to_sync(read)(response), content)
+
+    def test_wsgi_streaming_response(self):
+        response = self.middleware.process_response(
+            RequestFactory().get("/"), StreamingHttpResponse(iter([b"a"]))
+        )
+
+        self.assertFalse(response.is_async)
+
+    def test_not_streaming_response(self):
+        response = HttpResponse(b"a")
+        self.assertIs(
+            self.middleware.process_response(AsyncRequestFactory().get("/"), response),
+            response,
+        )
@@ -1,9 +1,54 @@
-from unittest.mock import patch, MagicMock
+import asyncio
+import io
+import os
+import tempfile
+import time
+from unittest.mock import patch, AsyncMock, MagicMock
 
-from django.test import TestCase, Client, override_settings
+import httpx
+from django.contrib.gis.geos import Polygon
+from django.conf import settings
+from django.core.management import call_command
+from django.core.cache import caches
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.http import Http404
 from django.urls import reverse
+from PIL import Image
+
+from api.utils.http_client import CircuitBreaker, SingleFlight
+from api.utils.tile_archive import TileArchive
+from api.utils.tile_math import metatile_origin, metatile_to_bbox, tile_to_bbox
+from api.utils.orthophoto import WMS_BASE_URL, WMS_LAYER, tile_key
+from api.views import orthophoto_views
+from api.views.orthophoto_views import OrthophotoTileView, _wms_breaker
+from iarbre_data.models import City
+from iarbre_data.settings import SRID_DB
+
+
+def _png(size=1024, color=(0, 128, 0), mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, (size, size), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
 
-from api.views.orthophoto_views import WMS_BASE_URL, WMS_LAYER
+def _mock_client(content=None, content_type="image/png"):
+    if content is None:
+        content = _png()
+    mock_response = MagicMock()
+    mock_response.content = content
+    mock_response.text = content.decode(errors="ignore")
+    mock_response.headers = {"Content-Type": content_type}
+    mock_response.raise_for_status = MagicMock()
+    mock_client = MagicMock()
+    mock_client.get = AsyncMock(return_value=mock_response)
+    mock_client.aclose = AsyncMock()
+    return mock_client
 
 
 # Disable cache during tests
@@ -11,33 +56,340 @@ from api.views.orthophoto_views import WMS_BASE_URL, WMS_LAYER
     CACHES={
         "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
         "orthophoto": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
-    }
+    },
+    ORTHOPHOTO_ARCHIVE_PATH="/nonexistent/orthophoto.mbtiles",
 )
 class OrthophotoTileViewTest(TestCase):
     def setUp(self):
         self.client = Client()
+        _wms_breaker.reset()
 
     def _get_url(self, z=14, x=8345, y=5765):
         return reverse("orthophoto-tile", kwargs={"z": z, "x": x, "y": y})
 
-    @patch("api.views.orthophoto_views.requests.get")
-    def test_passes_correct_wms_params(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.content = b"png"
-        mock_response.headers = {"Content-Type": "image/png"}
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_passes_correct_wms_params(self, mock_get_client):
+        mock_client = _mock_client()
+        mock_get_client.return_value = mock_client
 
-        self.client.get(self._get_url(z=14, x=8345, y=5765))
+        response = self.client.get(self._get_url(z=14, x=8345, y=5765))
 
-        mock_get.assert_called_once()
-        call_args = mock_get.call_args
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("Accept", response["Vary"])
+        with Image.open(io.BytesIO(response.content)) as tile:
+            self.assertEqual(tile.format, "JPEG")
+            self.assertEqual(tile.size, (256, 256))
+        mock_client.get.assert_called_once()
+        call_args = mock_client.get.call_args
         self.assertEqual(call_args[0][0], WMS_BASE_URL)
         params = call_args[1]["params"]
         self.assertEqual(params["SERVICE"], "WMS")
         self.assertEqual(params["LAYERS"], WMS_LAYER)
         self.assertEqual(params["CRS"], "EPSG:3857")
         self.assertEqual(params["FORMAT"], "image/png")
-        self.assertEqual(params["WIDTH"], 256)
-        self.assertEqual(params["HEIGHT"], 256)
+        self.assertEqual(params["WIDTH"], 1024)
+        self.assertEqual(params["HEIGHT"], 1024)
         self.assertEqual(params["TRANSPARENT"], "TRUE")
+        bbox = metatile_to_bbox(14, 8344, 5764, 4)
+        self.assertEqual(params["BBOX"], ",".join(str(v) for v in bbox))
+
+    @override_settings(ORTHOPHOTO_METATILE_SIZE=2)
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_metatile_is_sliced_into_tiles(self, mock_get_client):
+        metatile = Image.new("RGB", (512, 512), (255, 0, 0))
+        metatile.paste((0, 0, 255), (256, 256, 512, 512))
+        buffer = io.BytesIO()
+        metatile.save(buffer, format="PNG")
+        mock_get_client.return_value = _mock_client(buffer.getvalue())
+
+        # Bottom-right tile of the metatile starting at (8344, 5764)
+        response = self.client.get(self._get_url(z=14, x=8345, y=5765))
+
+        self.assertEqual(response.status_code, 200)
+        with Image.open(io.BytesIO(response.content)) as tile:
+            self.assertEqual(tile.size, (256, 256))
+            red, _, blue = tile.getpixel((128, 128))
+            self.assertLess(red, 20)
+            self.assertGreater(blue, 235)
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_webp_is_served_when_accepted(self, mock_get_client):
+        mock_get_client.return_value = _mock_client()
+
+        response = self.client.get(
+            self._get_url(), HTTP_ACCEPT="image/webp,image/apng,image/*,*/*;q=0.8"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        with Image.open(io.BytesIO(response.content)) as tile:
+            self.assertEqual(tile.format, "WEBP")
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_formats_share_the_wms_call(self, mock_get_client):
+        mock_client = _mock_client()
+        mock_get_client.return_value = mock_client
+
+        jpeg = self.client.get(self._get_url())
+        webp = self.client.get(self._get_url(), HTTP_ACCEPT="image/webp")
+
+        self.assertEqual(jpeg["Content-Type"], "image/jpeg")
+        self.assertEqual(webp["Content-Type"], "image/webp")
+        mock_client.get.assert_called_once()
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_transparent_tiles_stay_png_for_jpeg(self, mock_get_client):
+        mock_get_client.return_value = _mock_client(
+            _png(color=(0, 0, 0, 0), mode="RGBA")
+        )
+
+        response = self.client.get(self._get_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_unreadable_image_returns_404(self, mock_get_client):
+        mock_get_client.return_value = _mock_client(b"not an image")
+
+        response = self.client.get(self._get_url())
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_xml_response_returns_404(self, mock_get_client):
+        mock_get_client.return_value = _mock_client(
+            b"<ServiceExceptionReport/>", "application/vnd.ogc.se_xml"
+        )
+
+        response = self.client.get(self._get_url())
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_upstream_error_returns_404(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_client.get = AsyncMock(side_effect=httpx.ConnectTimeout("timeout"))
+        mock_get_client.return_value = mock_client
+
+        response = self.client.get(self._get_url())
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_archived_tile_is_served_without_wms_call(self, mock_get_client):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "orthophoto.mbtiles")
+            connection = TileArchive(path).open_writer()
+            TileArchive.put_many(connection, [((14, 8345, 5765), b"archived")])
+            connection.close()
+
+            with self.settings(ORTHOPHOTO_ARCHIVE_PATH=path):
+                response = self.client.get(self._get_url(z=14, x=8345, y=5765))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"archived")
+        mock_get_client.assert_not_called()
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+        "orthophoto": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    },
+    ORTHOPHOTO_ARCHIVE_PATH="/nonexistent/orthophoto.mbtiles",
+)
+class OrthophotoTileCachingTest(SimpleTestCase):
+    def setUp(self):
+        caches["orthophoto"].clear()
+        _wms_breaker.reset()
+
+    def _get(self, z=14, x=8345, y=5765):
+        """Call the view and wait for its background refreshes."""
+
+        async def get():
+            response = await OrthophotoTileView().get(
+                RequestFactory().get("/"), z, x, y
+            )
+            await asyncio.gather(*orthophoto_views._background_refreshes)
+            return response
+
+        return asyncio.run(get())
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_stale_tile_is_served_and_refreshed(self, mock_get_client):
+        mock_client = _mock_client()
+        mock_get_client.return_value = mock_client
+        caches["orthophoto"].set(
+            tile_key(14, 8345, 5765, "jpeg"),
+            {
+                "content": b"stale",
+                "content_type": "image/jpeg",
+                "fresh_until": time.time() - 1,
+            },
+        )
+
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"stale")
+        mock_client.get.assert_called_once()
+        entry = caches["orthophoto"].get(tile_key(14, 8345, 5765, "jpeg"))
+        self.assertNotEqual(entry["content"], b"stale")
+        self.assertGreater(entry["fresh_until"], time.time())
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_upstream_failure_is_cached(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_client.get = AsyncMock(side_effect=httpx.ConnectTimeout("timeout"))
+        mock_get_client.return_value = mock_client
+
+        for _ in range(2):
+            with self.assertRaises(Http404):
+                self._get()
+
+        mock_client.get.assert_called_once()
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_blank_tiles_are_fresh_for_a_short_time(self, mock_get_client):
+        mock_get_client.return_value = _mock_client(
+            _png(color=(0, 0, 0, 0), mode="RGBA")
+        )
+
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        entry = caches["orthophoto"].get(tile_key(14, 8345, 5765, "jpeg"))
+        self.assertLessEqual(
+            entry["fresh_until"],
+            time.time() + settings.ORTHOPHOTO_NEGATIVE_CACHE_DURATION,
+        )
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_breaker_stops_upstream_calls(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_client.get = AsyncMock(side_effect=httpx.ConnectTimeout("timeout"))
+        mock_get_client.return_value = mock_client
+
+        with patch.object(orthophoto_views, "_wms_breaker", CircuitBreaker(2, 60)):
+            # Different metatiles, so that failures are not served from cache
+            for x in (0, 4, 8):
+                with self.assertRaises(Http404):
+                    self._get(z=14, x=x, y=0)
+
+        self.assertEqual(mock_client.get.call_count, 2)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def test_opens_after_threshold_and_half_opens(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        with patch("api.utils.http_client.time.monotonic", return_value=1e12):
+            # One trial call is let through after the timeout
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+
+
+class SeedOrthophotoCommandTest(TestCase):
+    def setUp(self):
+        # A few hundred meters around Lyon city hall
+        square = Polygon.from_bbox((842000, 6519000, 842300, 6519300))
+        square.srid = SRID_DB
+        City.objects.create(geometry=square, code="69123", name="Lyon")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "orthophoto.mbtiles")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _seed(self):
+        with self.settings(ORTHOPHOTO_ARCHIVE_PATH=self.path):
+            call_command("seed_orthophoto", min_zoom=14, max_zoom=15, metatile_size=2)
+
+    @patch("api.utils.orthophoto.get_http_client")
+    def test_seeds_archive_and_resumes(self, mock_get_client):
+        mock_client = _mock_client(_png(512))
+        mock_get_client.return_value = mock_client
+
+        self._seed()
+
+        self.assertGreater(mock_client.get.call_count, 0)
+        archive = TileArchive(self.path)
+        connection = archive.open_writer()
+        for zoom in (14, 15):
+            self.assertGreater(len(archive.existing_tiles(connection, zoom)), 0)
+        connection.close()
+
+        # Everything is already in the archive: nothing is fetched again
+        mock_client.get.reset_mock()
+        self._seed()
+        mock_client.get.assert_not_called()
+
+
+class MetatileTest(SimpleTestCase):
+    def test_origin_is_aligned_on_metatile_size(self):
+        self.assertEqual(metatile_origin(14, 8345, 5766, 4), (8344, 5764, 4))
+
+    def test_size_is_clamped_at_low_zoom(self):
+        self.assertEqual(metatile_origin(1, 1, 0, 4), (0, 0, 2))
+
+    def test_size_must_be_a_power_of_two(self):
+        for size in (0, 3, 6):
+            with self.assertRaises(ValueError):
+                metatile_origin(14, 8345, 5766, size)
+
+    def test_bbox_covers_the_tiles(self):
+        left, bottom, right, top = metatile_to_bbox(14, 8344, 5764, 2)
+        self.assertEqual(
+            (left, top),
+            (tile_to_bbox(14, 8344, 5764)[0], tile_to_bbox(14, 8344, 5764)[3]),
+        )
+        self.assertEqual(
+            (right, bottom),
+            (tile_to_bbox(14, 8345, 5765)[2], tile_to_bbox(14, 8345, 5765)[1]),
+        )
+
+
+class SingleFlightTest(SimpleTestCase):
+    def test_concurrent_calls_are_coalesced(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return b"tile"
+
+        async def run():
+            return await asyncio.gather(
+                *(single_flight.do("key", fetch) for _ in range(5))
+            )
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, [b"tile"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_key_is_released_after_failure(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            raise ValueError("upstream error")
+
+        async def run():
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    await single_flight.do("key", fetch)
+
+        asyncio.run(run())
+
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,232 @@
+import os
+import tempfile
+
+import numpy as np
+import rasterio
+from django.contrib.gis.geos import Polygon
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rasterio.io import MemoryFile
+from rasterio.transform import from_origin
+
+from api.constants import DataType
+from api.utils.raster_clip import clip_cache_path, delete_previous_clips
+from iarbre_data.models import City, Iris
+from iarbre_data.settings import SRID_DB
+from iarbre_data.utils.cog import convert_to_cog
+from iarbre_data.utils.data_version import bump_data_version
+
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+class RasterDownloadViewTest(SimpleTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.media_root.name, "rasters"))
+        self.path = os.path.join(self.media_root.name, "rasters", "plantability.tif")
+        with rasterio.open(
+            self.path,
+            "w",
+            driver="GTiff",
+            height=1024,
+            width=1024,
+            count=1,
+            dtype="float32",
+            nodata=-9999,
+            crs="EPSG:2154",
+            transform=from_origin(842000, 6520000, 5, 5),
+        ) as dst:
+            dst.write(np.ones((1024, 1024), dtype=np.float32), 1)
+        convert_to_cog(self.path, resampling="average")
+        with open(self.path, "rb") as f:
+            self.content = f.read()
+
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.url = reverse("download-raster", kwargs={"raster_type": "plantability"})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_whole_raster(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/tiff")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("plantability_2025.tif", response["Content-Disposition"])
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_range(self):
+        # GDAL starts by reading the TIFF header
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-16383")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response["Content-Range"], f"bytes 0-16383/{len(self.content)}"
+        )
+        self.assertEqual(b"".join(response.streaming_content), self.content[:16384])
+
+    def test_head(self):
+        response = self.client.head(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertFalse(response.streaming)
+
+    @override_settings(MEDIA_X_ACCEL_REDIRECT_LOCATION="/internal-media/")
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-16383")
+
+        # nginx answers the range request
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/internal-media/rasters/plantability.tif"
+        )
+        self.assertEqual(response["Content-Type"], "image/tiff")
+        self.assertIn("plantability_2025.tif", response["Content-Disposition"])
+        self.assertEqual(response.content, b"")
+
+    def test_missing_raster(self):
+        url = reverse("download-raster", kwargs={"raster_type": "vegestrate"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unknown_raster(self):
+        url = reverse("download-raster", kwargs={"raster_type": "lcz"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(CACHES=NO_CACHE)
+class RasterClipViewTest(TestCase):
+    # 100 × 100 pixels of 5 m
+    ORIGIN = (842000, 6520500)
+
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.media_root.name, "rasters"))
+        with rasterio.open(
+            os.path.join(self.media_root.name, "rasters", "plantability.tif"),
+            "w",
+            driver="GTiff",
+            height=100,
+            width=100,
+            count=1,
+            dtype="float32",
+            nodata=-9999,
+            crs="EPSG:2154",
+            transform=from_origin(*self.ORIGIN, 5, 5),
+        ) as dst:
+            dst.write(np.full((100, 100), 4, dtype=np.float32), 1)
+
+        x, y = self.ORIGIN
+        # Right triangle over the 20 × 20 pixels of the top left corner
+        self.city = City.objects.create(
+            name="Lyon",
+            code="69123",
+            geometry=Polygon(
+                ((x, y), (x + 100, y), (x, y - 100), (x, y)), srid=SRID_DB
+            ),
+        )
+        self.iris = Iris.objects.create(
+            name="Iris",
+            code="691230101",
+            city=self.city,
+            geometry=Polygon.from_bbox((x, y - 50, x + 50, y)),
+        )
+
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.url = reverse("clip-raster", kwargs={"raster_type": "plantability"})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def _read(self, response):
+        content = (
+            b"".join(response.streaming_content)
+            if response.streaming
+            else response.content
+        )
+        with MemoryFile(content) as memfile:
+            with memfile.open() as src:
+                return src.read(1), src.bounds, src.nodata
+
+    def test_clip_city(self):
+        response = self.client.get(self.url, {"city_code": "69123"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/tiff")
+        self.assertIn("plantability_69123.tif", response["Content-Disposition"])
+        data, bounds, nodata = self._read(response)
+        self.assertEqual(data.shape, (20, 20))
+        self.assertEqual(bounds.left, self.ORIGIN[0])
+        self.assertEqual(bounds.top, self.ORIGIN[1])
+        # Pixels outside of the triangle are masked
+        self.assertEqual(data[0, 0], 4)
+        self.assertEqual(data[-1, -1], nodata)
+
+    def test_clip_iris(self):
+        response = self.client.get(self.url, {"iris_code": "691230101"})
+
+        self.assertEqual(response.status_code, 200)
+        data, _, _ = self._read(response)
+        self.assertEqual(data.shape, (10, 10))
+        self.assertTrue((data == 4).all())
+
+    def test_clip_bbox(self):
+        response = self.client.get(self.url, {"bbox": "4.829,45.766,4.831,45.768"})
+
+        self.assertEqual(response.status_code, 200)
+        data, _, _ = self._read(response)
+        self.assertTrue((data == 4).all())
+
+    def test_unit_clips_are_cached(self):
+        self.client.get(self.url, {"city_code": "69123"})
+        clip_path = clip_cache_path("plantability", "city-69123")
+        mtime = os.stat(clip_path).st_mtime_ns
+
+        response = self.client.get(self.url, {"city_code": "69123"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.stat(clip_path).st_mtime_ns, mtime)
+
+        # The clips of the previous version are kept until they are deleted
+        bump_data_version(DataType.TILE.value)
+        self.client.get(self.url, {"city_code": "69123"})
+        self.assertTrue(os.path.exists(clip_path))
+        self.assertTrue(os.path.exists(clip_cache_path("plantability", "city-69123")))
+
+        delete_previous_clips()
+        self.assertFalse(os.path.exists(clip_path))
+        self.assertTrue(os.path.exists(clip_cache_path("plantability", "city-69123")))
+
+    def test_bbox_clips_are_not_cached(self):
+        response = self.client.get(self.url, {"bbox": "4.829,45.766,4.831,45.768"})
+
+        self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertFalse(
+            os.path.exists(os.path.join(self.media_root.name, "rasters", "clips"))
+        )
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(
+            self.client.get(self.url, {"bbox": "4.8,45.7"}).status_code, 400
+        )
+        self.assertEqual(
+            self.client.get(self.url, {"city_code": "00000"}).status_code, 404
+        )
+        # Outside of the raster
+        self.assertEqual(
+            self.client.get(self.url, {"bbox": "5.5,46,5.6,46.1"}).status_code, 404
+        )
+
+    @override_settings(RASTER_CLIP_MAX_PIXELS=100)
+    def test_clip_too_large(self):
+        response = self.client.get(self.url, {"city_code": "69123"})
+
+        self.assertEqual(response.status_code, 400)
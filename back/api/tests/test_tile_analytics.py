@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from api.management.commands.report_tile_hits import tiles_for_share
+from api.models import TileHit
+from api.utils.tile_analytics import TileHitRecorder, tile_hit_recorder
+from iarbre_data.models import MVTTile
+
+
+@override_settings(TILE_ANALYTICS_SAMPLE_RATE=1.0)
+class TileHitRecorderTest(TestCase):
+    def setUp(self):
+        self.recorder = TileHitRecorder()
+
+    def test_flush_creates_then_increments(self):
+        self.recorder.record("tile", "plantability", 14, 8345, 5765)
+        self.recorder.record("tile", "plantability", "14", "8345", "5765")
+        self.assertEqual(self.recorder.flush(), 1)
+
+        self.recorder.record("tile", "plantability", 14, 8345, 5765)
+        self.recorder.flush()
+
+        tile_hit = TileHit.objects.get()
+        self.assertEqual(tile_hit.hits, 3)
+        self.assertEqual(tile_hit.zoom_level, 14)
+
+    @override_settings(TILE_ANALYTICS_SAMPLE_RATE=0.0)
+    def test_disabled_sampling_records_nothing(self):
+        self.recorder.record("tile", "plantability", 14, 1, 1)
+        self.assertEqual(self.recorder.flush(), 0)
+        self.assertFalse(TileHit.objects.exists())
+
+    def test_invalid_coordinates_are_ignored(self):
+        self.recorder.record("tile", "plantability", "abc", 1, 1)
+        self.assertEqual(self.recorder.flush(), 0)
+
+    def test_tile_view_records_hits(self):
+        MVTTile.objects.create(
+            geolevel="city",
+            datatype="test",
+            zoom_level=10,
+            tile_x=512,
+            tile_y=256,
+            mvt_file=ContentFile(b"test_mvt_data", name="test.mvt"),
+        )
+        url = reverse(
+            "retrieve-tile",
+            kwargs={
+                "geolevel": "city",
+                "datatype": "test",
+                "zoom": 10,
+                "x": 512,
+                "y": 256,
+            },
+        )
+        Client().get(url)
+        tile_hit_recorder.flush()
+
+        self.assertTrue(
+            TileHit.objects.filter(
+                geolevel="city", datatype="test", tile_x=512, tile_y=256
+            ).exists()
+        )
+
+
+class ReportTileHitsCommandTest(TestCase):
+    def test_tiles_for_share(self):
+        self.assertEqual(tiles_for_share([50, 30, 10, 10], 0.5), 1)
+        self.assertEqual(tiles_for_share([50, 30, 10, 10], 0.9), 3)
+        self.assertEqual(tiles_for_share([50, 30, 10, 10], 1.0), 4)
+
+    def test_report_lists_requested_levels(self):
+        TileHit.objects.create(
+            geolevel="tile",
+            datatype="plantability",
+            zoom_level=14,
+            tile_x=1,
+            tile_y=1,
+            hits=10,
+        )
+        out = StringIO()
+        call_command("report_tile_hits", "--top=1", stdout=out)
+        self.assertIn("tile/plantability", out.getvalue())
+        self.assertIn("10 hits", out.getvalue())
+
+    def test_report_without_hits(self):
+        out = StringIO()
+        call_command("report_tile_hits", stdout=out)
+        self.assertIn("No tile hit recorded yet.", out.getvalue())
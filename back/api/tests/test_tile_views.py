@@ -1,10 +1,31 @@
 import json
-from django.test import TestCase, Client
+import os
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from django.test import TestCase, Client, override_settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
-from django.contrib.gis.geos import Polygon
+from django.core.management import call_command
+from django.contrib.gis.geos import Point, Polygon
 from django.urls import reverse
+from iarbre_data.factories import CityFactory, IrisFactory
 from iarbre_data.settings import SRID_DB
-from iarbre_data.models import MVTTile, Tile, Lcz, Vulnerability
+from iarbre_data.utils.data_version import bump_data_version
+from api.views.tile_views import ScoresInPolygonView, ScoresInPolygonsBatchView
+from iarbre_data.models import (
+    MVTTile,
+    PlantabilityGridCell,
+    Tile,
+    Lcz,
+    Vulnerability,
+)
+
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
 
 class TileViewTest(TestCase):
@@ -139,6 +160,7 @@ class TileDetailsViewTest(TestCase):
         self.assertIsNone(response_data["details"])
 
 
+@override_settings(CACHES=NO_CACHE)
 class ScoresInPolygonViewTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -242,3 +264,365 @@ class ScoresInPolygonViewTest(TestCase):
         )
 
         self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ScoresInPolygonRasterTest(TestCase):
+    """Scores computed from the plantability raster instead of the Tile table."""
+
+    POLYGON = {
+        "type": "Polygon",
+        "coordinates": [
+            [
+                [4.867256, 45.809200],
+                [4.868544, 45.809179],
+                [4.868574, 45.810079],
+                [4.867287, 45.810101],
+                [4.867256, 45.809200],
+            ]
+        ],
+    }
+
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.media_root.name, "rasters"))
+        profile = {
+            "driver": "GTiff",
+            "height": 60,
+            "width": 60,
+            "count": 1,
+            "crs": f"EPSG:{SRID_DB}",
+            "transform": from_origin(844900, 6525200, 5, 5),
+        }
+        # Plantability 1.0 (normalized 8) on the left half, -3.0 (normalized 2)
+        # on the right half
+        plantability = np.ones((60, 60), dtype=np.float32)
+        plantability[:, 30:] = -3.0
+        with rasterio.open(
+            os.path.join(self.media_root.name, "rasters", "plantability.tif"),
+            "w",
+            dtype="float32",
+            nodata=-9999,
+            **profile,
+        ) as dst:
+            dst.write(plantability, 1)
+
+        self.vulnerability = Vulnerability.objects.create(
+            geometry=Polygon.from_bbox((844900, 6524900, 845200, 6525200)),
+            vulnerability_index_day=5.0,
+            vulnerability_index_night=4.0,
+        )
+        vulnerability_ids = np.full((60, 60), self.vulnerability.id, dtype=np.int32)
+        with rasterio.open(
+            os.path.join(self.media_root.name, "rasters", "tile_vulnerability_idx.tif"),
+            "w",
+            dtype="int32",
+            nodata=0,
+            **profile,
+        ) as dst:
+            dst.write(vulnerability_ids, 1)
+
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name, POLYGON_SCORES_FROM_RASTER=True
+        )
+        self.settings_override.enable()
+        # Small polygons are scored exactly from the tiles, not from the raster
+        self.max_area_patch = patch.object(
+            ScoresInPolygonView, "MAX_POLYGON_AREA_M2", 1000
+        )
+        self.max_area_patch.start()
+
+    def tearDown(self):
+        self.max_area_patch.stop()
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def _post(self, datatype, polygon):
+        url = reverse("scores-in-polygon", kwargs={"datatype": datatype})
+        return self.client.post(
+            url, data=json.dumps(polygon), content_type="application/json"
+        )
+
+    def test_plantability_scores_from_raster(self):
+        response = self._post("plantability", self.POLYGON)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data["distribution"].keys()), {"2", "8"})
+        self.assertEqual(data["count"], sum(data["distribution"].values()))
+        # The ~100 m square covers at least 20 × 20 pixels of 5 m
+        self.assertGreaterEqual(data["count"], 400)
+        self.assertGreater(data["plantabilityNormalizedIndice"], 2)
+        self.assertLess(data["plantabilityNormalizedIndice"], 8)
+
+    def test_plantability_vulnerability_scores_from_raster(self):
+        response = self._post("plantability_vulnerability", self.POLYGON)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["vulnerabilityIndiceDay"], 5.0)
+        self.assertEqual(data["vulnerabilityIndiceNight"], 4.0)
+
+    def test_polygon_outside_raster(self):
+        polygon = {
+            "type": "Polygon",
+            "coordinates": [
+                [
+                    [2.0, 48.0],
+                    [2.01, 48.0],
+                    [2.01, 48.01],
+                    [2.0, 48.01],
+                    [2.0, 48.0],
+                ]
+            ],
+        }
+        response = self._post("plantability", polygon)
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ScoresInPolygonGridTest(TestCase):
+    """Scores computed from the pre-aggregated grid match the Tile table ones."""
+
+    def setUp(self):
+        self.client = Client()
+        vulnerabilities = [
+            Vulnerability.objects.create(
+                geometry=Polygon.from_bbox((844900, 6525120, 844980, 6525200)),
+                vulnerability_index_day=day,
+                vulnerability_index_night=night,
+            )
+            for day, night in ((5.0, 4.0), (2.0, 1.0))
+        ]
+        # 16 × 16 tiles of 5 m, aligned on the raster grid
+        Tile.objects.bulk_create(
+            Tile(
+                geometry=Polygon.from_bbox(
+                    (
+                        844900 + 5 * col,
+                        6525195 - 5 * row,
+                        844905 + 5 * col,
+                        6525200 - 5 * row,
+                    )
+                ),
+                plantability_normalized_indice=(
+                    None if (col + row) % 7 == 0 else float(2 * ((col + row) % 6))
+                ),
+                vulnerability_idx=vulnerabilities[col // 8],
+            )
+            for col in range(16)
+            for row in range(16)
+        )
+        # Covers the two cells of 40 m of the first column and crosses the others
+        polygon = Polygon.from_bbox((844890, 6525110, 844962, 6525210))
+        polygon.srid = SRID_DB
+        self.polygon = json.loads(polygon.transform(4326, clone=True).json)
+
+    def _post(self, datatype):
+        url = reverse("scores-in-polygon", kwargs={"datatype": datatype})
+        return self.client.post(
+            url, data=json.dumps(self.polygon), content_type="application/json"
+        )
+
+    def test_grid_scores_match_tile_scores(self):
+        for datatype in ("plantability", "plantability_vulnerability"):
+            with self.subTest(datatype=datatype):
+                PlantabilityGridCell.objects.all().delete()
+                from_tiles = self._post(datatype)
+                call_command("compute_plantability_grid")
+                from_grid = self._post(datatype)
+
+                self.assertEqual(from_tiles.status_code, 200)
+                self.assertEqual(from_grid.status_code, 200)
+                self.assertEqual(from_grid.json(), from_tiles.json())
+
+    def test_grid_cells(self):
+        call_command("compute_plantability_grid")
+
+        self.assertEqual(PlantabilityGridCell.objects.filter(resolution=40).count(), 4)
+        cell = PlantabilityGridCell.objects.get(resolution=160)
+        self.assertEqual(cell.tile_count, 256)
+        self.assertEqual(len(cell.vulnerability_ids), 2)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ScoresInPolygonCacheTest(TestCase):
+    """In-polygon scores are cached per polygon and data version."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.square = Polygon.from_bbox((845000, 6525000, 845100, 6525100))
+        self.square.srid = SRID_DB
+        Tile.objects.create(geometry=self.square, plantability_normalized_indice=8.0)
+
+    def _post(self, polygon, datatype="plantability"):
+        url = reverse("scores-in-polygon", kwargs={"datatype": datatype})
+        geojson = polygon.transform(4326, clone=True).json
+        return self.client.post(url, data=geojson, content_type="application/json")
+
+    def test_same_polygon_is_served_from_cache(self):
+        first = self._post(self.square)
+        Tile.objects.all().delete()
+        # Same outline, opposite orientation and another starting vertex
+        reversed_square = Polygon(
+            (
+                (845100, 6525100),
+                (845100, 6525000),
+                (845000, 6525000),
+                (845000, 6525100),
+                (845100, 6525100),
+            ),
+            srid=SRID_DB,
+        )
+        second = self._post(reversed_square)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+
+    def test_data_version_invalidates_cache(self):
+        self.assertEqual(self._post(self.square).status_code, 200)
+        Tile.objects.all().delete()
+        bump_data_version()
+
+        self.assertEqual(self._post(self.square).status_code, 404)
+
+    def test_iris_outline_uses_plantability_counts(self):
+        city = CityFactory(geometry=self.square, code="69123")
+        # Larger and more detailed than the polygons accepted otherwise
+        outline = Polygon(
+            [(845000 + 100 * i, 6525000) for i in range(40)]
+            + [(849000, 6525000), (849000, 6529000), (845000, 6529000)]
+            + [(845000, 6525000)],
+            srid=SRID_DB,
+        )
+        IrisFactory(
+            geometry=outline,
+            code="691230101",
+            city=city,
+            plantability_counts={"0.0": 2, "4.0": 0, "10.0": 6},
+        )
+
+        response = self._post(outline)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 8)
+        self.assertEqual(data["distribution"], {"0": 2, "10": 6})
+        self.assertEqual(data["plantabilityNormalizedIndice"], 7.5)
+        self.assertEqual(data["irisCodes"], ["691230101"])
+        self.assertEqual(data["cityCodes"], ["69123"])
+
+
+class ScoresInPolygonsBatchTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        square = Polygon.from_bbox((845000, 6525000, 845100, 6525100))
+        square.srid = SRID_DB
+        Tile.objects.create(geometry=square, plantability_normalized_indice=8.0)
+        Vulnerability.objects.create(
+            geometry=square, vulnerability_index_day=5.0, vulnerability_index_night=4.0
+        )
+        far_square = Polygon.from_bbox((800000, 6500000, 800100, 6500100))
+        far_square.srid = SRID_DB
+        self.features = [
+            {
+                "type": "Feature",
+                "id": "parcel-1",
+                "geometry": json.loads(square.transform(4326, clone=True).json),
+            },
+            {
+                "type": "Feature",
+                "id": "parcel-2",
+                "geometry": json.loads(far_square.transform(4326, clone=True).json),
+            },
+            {
+                "type": "Feature",
+                "id": "parcel-3",
+                "geometry": {"type": "Point", "coordinates": [4.86, 45.8]},
+            },
+        ]
+
+    def _post(self, datatype, features):
+        url = reverse("scores-in-polygons-batch", kwargs={"datatype": datatype})
+        return self.client.post(
+            url,
+            data=json.dumps({"type": "FeatureCollection", "features": features}),
+            content_type="application/json",
+        )
+
+    def test_plantability_results_per_feature(self):
+        response = self._post("plantability", self.features)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(
+            [(result["id"], result["status"]) for result in results],
+            [("parcel-1", 200), ("parcel-2", 404), ("parcel-3", 400)],
+        )
+        self.assertEqual(results[0]["scores"]["count"], 1)
+        self.assertEqual(results[0]["scores"]["plantabilityNormalizedIndice"], 8.0)
+
+    def test_vulnerability_results_per_feature(self):
+        response = self._post("vulnerability", self.features[:2])
+
+        results = response.json()["results"]
+        self.assertEqual(results[0]["scores"]["vulnerabilityIndiceDay"], 5.0)
+        self.assertEqual(results[0]["scores"]["vulnerabilityIndiceNight"], 4.0)
+        self.assertEqual(results[1]["status"], 404)
+
+    def test_large_batches_are_streamed(self):
+        with patch.object(ScoresInPolygonsBatchView, "CHUNK_SIZE", 1):
+            response = self._post("plantability_vulnerability", self.features)
+            content = b"".join(response.streaming_content)
+
+        results = json.loads(content)["results"]
+        self.assertEqual([result["status"] for result in results], [200, 404, 400])
+        self.assertEqual(results[0]["scores"]["vulnerabilityIndiceDay"], 5.0)
+
+    def test_malformed_geometries(self):
+        features = [
+            {"type": "Feature", "id": "list", "geometry": [4.86, 45.8]},
+            {"type": "Feature", "id": "string", "geometry": "POLYGON"},
+        ]
+
+        response = self._post("plantability", features)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["results"]], [400, 400]
+        )
+
+    def test_parcels_with_many_vertices(self):
+        # Outline of a parcel with 24 vertices, inside the tile
+        parcel = Point(845050, 6525050, srid=SRID_DB).buffer(40, quadsegs=6)
+        features = [
+            {
+                "type": "Feature",
+                "id": "parcel",
+                "geometry": json.loads(parcel.transform(4326, clone=True).json),
+            }
+        ]
+
+        response = self._post("plantability", features)
+
+        result = response.json()["results"][0]
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(result["scores"]["count"], 1)
+
+    def test_too_many_features(self):
+        with patch.object(ScoresInPolygonsBatchView, "MAX_FEATURES", 2):
+            response = self._post("plantability", self.features)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_a_feature_collection(self):
+        url = reverse("scores-in-polygons-batch", kwargs={"datatype": "plantability"})
+        response = self.client.post(
+            url, data=json.dumps(self.features[0]), content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
@@ -1,4 +1,7 @@
-from django.test import TestCase, Client
+import json
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
 from django.contrib.gis.geos import Polygon
 from iarbre_data.settings import SRID_DB
 from iarbre_data.models import City, Tile, Vegestrate
@@ -200,3 +203,152 @@ class VegestrateWFSViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         body = b"".join(response.streaming_content)
         self.assertIn(b'numberReturned="0"', body)
+
+
+@override_settings(WFS_MAX_ESTIMATED_FEATURES=1000)
+@patch("api.views.wfs_views._planner_rows", return_value=10_000)
+class WFSAdmissionTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        Tile.objects.create(
+            geometry=VILLARD_SQUARE,
+            plantability_indice=3.5,
+            plantability_normalized_indice=7,
+        )
+
+    def _get_feature(self, **params):
+        return self.client.get(
+            WFS_URL,
+            {
+                "SERVICE": "WFS",
+                "VERSION": "2.0.0",
+                "REQUEST": "GetFeature",
+                "TYPENAMES": "plantability",
+                **params,
+            },
+        )
+
+    def test_estimated_count_is_logged(self, planner_rows):
+        with self.assertLogs("wfs", level="INFO") as logs:
+            self._get_feature(COUNT="10")
+
+        self.assertIn("estimated_count=10000", logs.output[0])
+
+    def test_oversized_request_is_rejected(self, planner_rows):
+        response = self._get_feature()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"InvalidParameterValue", response.content)
+
+    def test_paged_request_is_accepted(self, planner_rows):
+        response = self._get_feature(COUNT="100")
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(WFS_MAX_ESTIMATED_FEATURES=200_000)
+    def test_estimate_is_capped_by_the_page_size(self, planner_rows):
+        planner_rows.return_value = 10_000_000
+
+        # GML pages are limited to GISSERVER_DEFAULT_MAX_PAGE_SIZE features
+        self.assertEqual(self._get_feature().status_code, 200)
+        # GeoJSON has no page size limit
+        response = self._get_feature(OUTPUTFORMAT="geojson")
+        self.assertEqual(response.status_code, 400)
+
+    def test_filtered_request_is_not_estimated(self, planner_rows):
+        response = self._get_feature(
+            FILTER=(
+                '<fes:Filter xmlns:fes="http://www.opengis.net/fes/2.0">'
+                "<fes:PropertyIsGreaterThan>"
+                "<fes:ValueReference>plantability_indice</fes:ValueReference>"
+                "<fes:Literal>1</fes:Literal>"
+                "</fes:PropertyIsGreaterThan>"
+                "</fes:Filter>"
+            )
+        )
+
+        self.assertEqual(response.status_code, 200)
+        planner_rows.assert_not_called()
+
+    def test_hits_request_is_not_estimated(self, planner_rows):
+        response = self._get_feature(RESULTTYPE="hits")
+
+        self.assertEqual(response.status_code, 200)
+        body = (
+            b"".join(response.streaming_content)
+            if response.streaming
+            else response.content
+        )
+        self.assertIn(b'numberMatched="1"', body)
+        planner_rows.assert_not_called()
+
+
+class WFSRowOutputTest(TestCase):
+    """GeoJSON and CSV outputs are rendered from rows."""
+
+    def setUp(self):
+        self.client = Client()
+        self.tiles = [
+            Tile.objects.create(
+                geometry=VILLARD_SQUARE,
+                plantability_indice=indice,
+                plantability_normalized_indice=normalized_indice,
+            )
+            for indice, normalized_indice in [(3.5, 7), (1.0, 2)]
+        ]
+
+    def _get_feature(self, **params):
+        response = self.client.get(
+            WFS_URL,
+            {
+                "SERVICE": "WFS",
+                "VERSION": "2.0.0",
+                "REQUEST": "GetFeature",
+                "TYPENAMES": "plantability",
+                **params,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_geojson_features(self):
+        data = json.loads(self._get_feature(OUTPUTFORMAT="geojson"))
+
+        self.assertEqual(data["numberReturned"], 2)
+        feature = data["features"][0]
+        self.assertEqual(feature["id"], f"plantability.{self.tiles[0].pk}")
+        self.assertEqual(feature["geometry"]["type"], "Polygon")
+        self.assertEqual(
+            feature["properties"],
+            {"plantability_indice": 3.5, "plantability_normalized_indice": 7.0},
+        )
+
+    def test_geojson_is_reprojected(self):
+        data = json.loads(
+            self._get_feature(OUTPUTFORMAT="geojson", SRSNAME="EPSG:4326")
+        )
+
+        x, y = data["features"][0]["geometry"]["coordinates"][0][0]
+        self.assertAlmostEqual(x, 5.5, delta=0.5)
+        self.assertAlmostEqual(y, 45.1, delta=0.5)
+
+    def test_geojson_paging(self):
+        data = json.loads(
+            self._get_feature(OUTPUTFORMAT="geojson", COUNT="1", STARTINDEX="1")
+        )
+
+        self.assertEqual(
+            [feature["id"] for feature in data["features"]],
+            [f"plantability.{self.tiles[1].pk}"],
+        )
+
+    def test_csv_rows(self):
+        lines = self._get_feature(OUTPUTFORMAT="csv").strip().splitlines()
+
+        self.assertEqual(
+            lines[0],
+            '"geometry","plantability_indice","plantability_normalized_indice"',
+        )
+        self.assertEqual(len(lines), 3)
+        self.assertIn("POLYGON", lines[1])
+        self.assertTrue(lines[1].endswith('"3.5","7.0"'))
@@ -1,7 +1,11 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from .views.tile_views import TileDetailsView, ScoresInPolygonView
+from .views.tile_views import (
+    TileDetailsView,
+    ScoresInPolygonView,
+    ScoresInPolygonsBatchView,
+)
 from .views.dashboard_views import DashboardView
 from .views import (
     CityView,
@@ -12,10 +16,13 @@ from .views import (
     QPVListView,
     CityBoundaryView,
     MetadataView,
+    RasterClipView,
     RasterDownloadView,
+    ExportDownloadView,
     IArbreWFSView,
     OrthophotoTileView,
     BiosphereLandCoverAtPointView,
+    CadastreDetailView,
 )
 
 router = routers.DefaultRouter()
@@ -34,19 +41,39 @@ urlpatterns = [
         ScoresInPolygonView.as_view(),
         name="scores-in-polygon",
     ),
+    path(
+        "tiles/<datatype>/in-polygons/",
+        ScoresInPolygonsBatchView.as_view(),
+        name="scores-in-polygons-batch",
+    ),
     path(
         "tiles/<datatype>/<id>/",
         TileDetailsView.as_view(),
         name="retrieve-tile-details",
     ),
     path("feedback/", FeedbackView.as_view(), name="create-feedback"),
+    path(
+        "cadastre/<str:parcel_id>/",
+        CadastreDetailView.as_view(),
+        name="cadastre-detail",
+    ),
     path("qpv/", QPVListView.as_view(), name="qpv-list"),
     path("boundaries/cities/", CityBoundaryView.as_view(), name="city-boundaries"),
+    path(
+        "rasters/<str:raster_type>/clip/",
+        RasterClipView.as_view(),
+        name="clip-raster",
+    ),
     path(
         "rasters/<str:raster_type>/",
         RasterDownloadView.as_view(),
         name="download-raster",
     ),
+    path(
+        "exports/<slug:layer>.<slug:export_format>",
+        ExportDownloadView.as_view(),
+        name="download-export",
+    ),
     path("dashboard/", DashboardView.as_view(), name="dashboard"),
     path("", include(router.urls)),
     path("health-check/", HealthCheckView.as_view(), name="health-check"),
@@ -0,0 +1,87 @@
+"""Scores of many polygons at once.
+
+Each function runs a single query joining the polygons with the scored layer,
+grouped by polygon, instead of one spatial query per polygon.
+"""
+
+from django.db import connection
+
+from api.utils.grid_scores import TilesAggregate
+from iarbre_data.models import Tile, Vulnerability
+
+_FEATURES_CTE = """
+    WITH features AS (
+        SELECT feature.index, ST_GeomFromEWKT(feature.ewkt) AS geometry
+        FROM unnest(%s::integer[], %s::text[]) AS feature(index, ewkt)
+    )
+"""
+
+
+def _features_params(polygons: list) -> list:
+    return [list(range(len(polygons))), [polygon.ewkt for polygon in polygons]]
+
+
+def aggregate_tiles_by_polygon(polygons: list) -> list[TilesAggregate]:
+    """Aggregate the tiles intersecting each polygon.
+
+    Args:
+        polygons (list[GEOSGeometry]): Polygons in SRID_DB.
+
+    Returns:
+        list[TilesAggregate]: Aggregate of the intersecting tiles, per polygon.
+    """
+    table = Tile._meta.db_table
+    query = f"""
+        {_FEATURES_CTE}
+        SELECT
+            features.index,
+            tile.plantability_normalized_indice,
+            tile.vulnerability_idx_id,
+            tile.iris_id,
+            tile.city_id,
+            count(*)
+        FROM features
+        JOIN {table} AS tile ON ST_Intersects(tile.geometry, features.geometry)
+        GROUP BY 1, 2, 3, 4, 5
+    """
+    aggregates = [TilesAggregate() for _ in polygons]
+    with connection.cursor() as cursor:
+        cursor.execute(query, _features_params(polygons))
+        for index, value, vulnerability_id, iris_id, city_id, count in cursor:
+            aggregates[index].add_group(
+                count, value, vulnerability_id, iris_id, city_id
+            )
+    return aggregates
+
+
+def vulnerability_averages_by_polygon(polygons: list) -> list[dict]:
+    """Count and average indices of the vulnerability zones intersecting each polygon.
+
+    Args:
+        polygons (list[GEOSGeometry]): Polygons in SRID_DB.
+
+    Returns:
+        list[dict]: `count`, `avg_day` and `avg_night` per polygon.
+    """
+    table = Vulnerability._meta.db_table
+    query = f"""
+        {_FEATURES_CTE}
+        SELECT
+            features.index,
+            count(*),
+            avg(zone.vulnerability_index_day),
+            avg(zone.vulnerability_index_night)
+        FROM features
+        JOIN {table} AS zone ON ST_Intersects(zone.geometry, features.geometry)
+        GROUP BY 1
+    """
+    results = [{"count": 0, "avg_day": None, "avg_night": None} for _ in polygons]
+    with connection.cursor() as cursor:
+        cursor.execute(query, _features_params(polygons))
+        for index, count, avg_day, avg_night in cursor:
+            results[index] = {
+                "count": count,
+                "avg_day": avg_day,
+                "avg_night": avg_night,
+            }
+    return results
@@ -0,0 +1,150 @@
+"""File responses answering HTTP range requests.
+
+A request for a single byte range gets a `206 Partial Content` response with
+only these bytes, so that clients reading indexed formats (FlatGeobuf,
+GeoParquet, COG) fetch just the parts they need. Other requests, including
+those for several ranges, get the whole file. The ETag is derived from the
+modification time and size of the file, and `If-Range` keeps a client from
+mixing ranges of two versions of the file. `HEAD` requests get the same
+headers, without the file being opened.
+
+When `MEDIA_X_ACCEL_REDIRECT_LOCATION` is set, files of MEDIA_ROOT are sent by
+nginx, which answers range requests itself: under ASGI, Django would read the
+whole file in memory before sending it.
+"""
+
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range starts after the end of the file."""
+
+
+class _FileSlice:
+    """Read `length` bytes of a file from its current position."""
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """First and last bytes of the single range of a `Range` header.
+
+    Args:
+        header (str): Value of the `Range` header.
+        size (int): Size of the file, in bytes.
+
+    Returns:
+        tuple[int, int] | None: The bytes, last one included, or None if the
+            header is missing, invalid or requests several ranges.
+
+    Raises:
+        RangeNotSatisfiable: If the range is out of the file.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = size - 1 if not last else min(int(last), size - 1)
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last bytes of the file
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def x_accel_redirect_uri(path: str) -> str | None:
+    """Internal nginx URI of the file at `path`, None if nginx does not serve it."""
+    location = settings.MEDIA_X_ACCEL_REDIRECT_LOCATION
+    if not location:
+        return None
+    relative_path = os.path.relpath(
+        os.path.realpath(path), os.path.realpath(settings.MEDIA_ROOT)
+    )
+    if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+        return None
+    return location.rstrip("/") + "/" + quote(relative_path.replace(os.sep, "/"))
+
+
+def ranged_file_response(
+    request, path: str, content_type: str, filename: str | None = None
+) -> HttpResponse:
+    """Serve the file at `path`, or the byte range requested by `request`.
+
+    Args:
+        request (HttpRequest): Request, with optional `Range` and `If-Range`.
+        path (str): Path of the file.
+        content_type (str): Content type of the file.
+        filename (str | None): Name of the file downloaded as attachment.
+    """
+    uri = x_accel_redirect_uri(path)
+    if uri is not None:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = uri
+        if filename is not None:
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+        return response
+
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    byte_range = None
+    # A range of another version of the file is useless to the client
+    if request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range", ""), stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+    start, end = byte_range or (0, stat.st_size - 1)
+    status = 200 if byte_range is None else 206
+
+    if request.method == "HEAD":
+        # Headers only, without opening the file
+        response = HttpResponse(content_type=content_type, status=status)
+        if filename is not None:
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+    else:
+        file = open(path, "rb")
+        if byte_range is not None:
+            file.seek(start)
+            file = _FileSlice(file, end - start + 1)
+        response = FileResponse(
+            file,
+            status=status,
+            content_type=content_type,
+            as_attachment=filename is not None,
+            filename=filename or "",
+        )
+    response["Content-Length"] = end - start + 1
+    if byte_range is not None:
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
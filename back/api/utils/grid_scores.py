@@ -0,0 +1,125 @@
+"""Aggregate of the tiles intersecting a polygon, from the pre-aggregated grid.
+
+The tiles of the cells lying inside the polygon are counted from the cell
+aggregates, using the coarsest cells possible. Only the tiles of the finest
+cells crossing the polygon boundary are read from the `Tile` table, so the cost
+grows with the polygon perimeter instead of its area. The result is the same as
+aggregating all the tiles intersecting the polygon.
+"""
+
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Q
+
+from iarbre_data.models import PlantabilityGridCell, Tile
+
+# Each resolution is a multiple of the previous one, so cells are nested
+GRID_RESOLUTIONS = (40, 160, 640)
+
+
+@dataclass
+class TilesAggregate:
+    """Aggregate of a set of tiles, enough to compute the polygon scores."""
+
+    count: int = 0
+    # Number of tiles per plantability_normalized_indice value (null excluded)
+    histogram: dict[float, int] = field(default_factory=dict)
+    vulnerability_ids: set[int] = field(default_factory=set)
+    iris_ids: set[int] = field(default_factory=set)
+    city_ids: set[int] = field(default_factory=set)
+
+    def add_cell(self, cell: dict):
+        self.count += cell["tile_count"]
+        for value, count in cell["plantability_histogram"].items():
+            self.histogram[float(value)] = self.histogram.get(float(value), 0) + count
+        self.vulnerability_ids.update(cell["vulnerability_ids"])
+        self.iris_ids.update(cell["iris_ids"])
+        self.city_ids.update(cell["city_ids"])
+
+    def add_tiles(self, tiles):
+        """Add the tiles of a queryset, in a single grouped query."""
+        grouped = tiles.values(
+            "plantability_normalized_indice",
+            "vulnerability_idx_id",
+            "iris_id",
+            "city_id",
+        ).annotate(count=Count("id"))
+        for row in grouped:
+            self.add_group(
+                row["count"],
+                row["plantability_normalized_indice"],
+                row["vulnerability_idx_id"],
+                row["iris_id"],
+                row["city_id"],
+            )
+
+    def add_group(self, count, value, vulnerability_id, iris_id, city_id):
+        """Add `count` tiles sharing the same value and attachments."""
+        self.count += count
+        if value is not None:
+            self.histogram[value] = self.histogram.get(value, 0) + count
+        for ids, id_ in (
+            (self.vulnerability_ids, vulnerability_id),
+            (self.iris_ids, iris_id),
+            (self.city_ids, city_id),
+        ):
+            if id_ is not None:
+                ids.add(id_)
+
+
+def grid_available() -> bool:
+    return PlantabilityGridCell.objects.exists()
+
+
+def _ancestors(resolution: int, col: int, row: int):
+    for coarser in GRID_RESOLUTIONS:
+        if coarser > resolution:
+            yield coarser, col * resolution // coarser, row * resolution // coarser
+
+
+def aggregate_tiles_in_polygon(polygon) -> TilesAggregate:
+    """Aggregate the tiles intersecting `polygon` using the grid.
+
+    Args:
+        polygon (GEOSGeometry): Polygon in SRID_DB.
+
+    Returns:
+        TilesAggregate: Aggregate of the intersecting tiles.
+    """
+    inner_cells = {
+        (cell["resolution"], cell["col"], cell["row"]): cell
+        for cell in PlantabilityGridCell.objects.filter(
+            geometry__coveredby=polygon
+        ).values(
+            "resolution",
+            "col",
+            "row",
+            "tile_count",
+            "plantability_histogram",
+            "vulnerability_ids",
+            "iris_ids",
+            "city_ids",
+        )
+    }
+    aggregate = TilesAggregate()
+    for key, cell in inner_cells.items():
+        # Tiles of a cell inside a coarser inner cell are counted with the latter
+        if not any(ancestor in inner_cells for ancestor in _ancestors(*key)):
+            aggregate.add_cell(cell)
+
+    boundary_cells = PlantabilityGridCell.objects.filter(
+        resolution=GRID_RESOLUTIONS[0], geometry__intersects=polygon
+    ).exclude(geometry__coveredby=polygon)
+    boundary_geometries = list(boundary_cells.values_list("geometry", flat=True))
+    if boundary_geometries:
+        # One condition per cell, so that the spatial index only returns the
+        # tiles of the boundary cells
+        in_boundary_cells = reduce(
+            or_, (Q(geometry__coveredby=geometry) for geometry in boundary_geometries)
+        )
+        aggregate.add_tiles(
+            Tile.objects.filter(in_boundary_cells, geometry__intersects=polygon)
+        )
+    return aggregate
@@ -0,0 +1,103 @@
+"""Shared asynchronous HTTP client for the upstream services proxied by the API."""
+
+import asyncio
+import time
+import weakref
+from typing import Awaitable, Callable, Hashable
+
+import httpx
+from django.conf import settings
+
+UPSTREAM_TIMEOUT = 10
+
+# One client (and thus one connection pool) per event loop: under ASGI there is a
+# single loop per process, so every request shares the same keep-alive connections.
+_clients = weakref.WeakKeyDictionary()
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the HTTP client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+def get_upstream_semaphore(name: str, limit: int) -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent calls to the `name` upstream."""
+    loop = asyncio.get_running_loop()
+    semaphores = _semaphores.setdefault(loop, {})
+    if name not in semaphores:
+        semaphores[name] = asyncio.Semaphore(limit)
+    return semaphores[name]
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing the same key into a single execution.
+
+    The first caller starts the call in its own task and every caller, including
+    the first one, awaits it: a client disconnecting does not cancel the call for
+    the others. Once the call is done the key is released, results are not kept.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is None:
+            task = loop.create_task(func())
+            calls[key] = task
+
+            def release(done_task):
+                if calls.get(key) is done_task:
+                    del calls[key]
+
+            task.add_done_callback(release)
+        return await asyncio.shield(task)
+
+
+class CircuitBreaker:
+    """Stop calling a failing upstream for a while.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    `allow()` returns False for `reset_timeout` seconds. Then a single trial
+    call is let through: a success closes the breaker, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.reset()
+
+    def reset(self):
+        self._failures = 0
+        self._opened_at = None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return False
+        # Half-open: let one call through, further ones wait for its outcome
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self):
+        self.reset()
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
@@ -0,0 +1,64 @@
+"""Land cover around a point, read from the land cover raster.
+
+`compute_land_cover_raster` rasterizes `BiosphereFunctionalIntegrityLandCover`
+with the class code of the land cover of each pixel. The area of each land
+cover in a disc is the number of its pixels whose center is in the disc, read
+from the window of the disc, instead of intersecting the disc with the
+polygons.
+"""
+
+import os
+
+import numpy as np
+import rasterio
+from django.conf import settings
+from rasterio.windows import Window
+
+from api.utils.raster_scores import raster_path
+from iarbre_data.utils.biosphere_land_cover import CLASS_TO_LAND_COVER
+
+LAND_COVER_RASTER = "biosphere_land_cover.tif"
+# Value of the pixels without land cover
+NO_LAND_COVER = 0
+
+
+def land_cover_raster_available() -> bool:
+    """Whether the land cover around a point can be read from the raster."""
+    return settings.LAND_COVER_FROM_RASTER and os.path.exists(
+        raster_path(LAND_COVER_RASTER)
+    )
+
+
+def land_cover_areas(point, radius: float) -> dict[str, float]:
+    """Area of each land cover within `radius` of `point`.
+
+    Args:
+        point (Point): Point in the raster CRS.
+        radius (float): Radius of the disc, in meters.
+
+    Returns:
+        dict[str, float]: Area in m² of each land cover in the disc.
+    """
+    with rasterio.open(raster_path(LAND_COVER_RASTER)) as src:
+        inverse = ~src.transform
+        col_min, row_min = inverse * (point.x - radius, point.y + radius)
+        col_max, row_max = inverse * (point.x + radius, point.y - radius)
+        window = Window.from_slices(
+            (int(np.floor(row_min)), int(np.ceil(row_max))),
+            (int(np.floor(col_min)), int(np.ceil(col_max))),
+            boundless=True,
+        )
+        # Pixels outside of the raster have no land cover
+        classes = src.read(1, window=window, boundless=True, fill_value=NO_LAND_COVER)
+        transform = src.window_transform(window)
+        pixel_area = abs(src.transform.a * src.transform.e)
+
+    rows, cols = np.indices(classes.shape)
+    xs, ys = transform * (cols + 0.5, rows + 0.5)
+    in_disc = (xs - point.x) ** 2 + (ys - point.y) ** 2 <= radius**2
+    counts = np.bincount(classes[in_disc], minlength=NO_LAND_COVER + 1)
+    return {
+        CLASS_TO_LAND_COVER[code].value: float(count * pixel_area)
+        for code, count in enumerate(counts)
+        if count and code in CLASS_TO_LAND_COVER
+    }
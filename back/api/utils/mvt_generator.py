@@ -22,6 +22,7 @@ import mercantile
 import mapbox_vector_tile
 from api.constants import DEFAULT_ZOOM_LEVELS, ZOOM_TO_GRID_SIZE
 from iarbre_data.utils.database import load_geodataframe_from_db
+from api.models import TileHit
 from iarbre_data.models import City, MVTTile, Vulnerability
 from iarbre_data.settings import SRID_MAPLIBRE, SRID_DB, SRID_DOWNLOADED_DATA
 from plantability.constants import PLANTABILITY_NORMALIZED
@@ -33,7 +34,11 @@ MVT_EXTENT = 4096
 ZOOM_AGGREGATE_BREAKPOINT = max(ZOOM_TO_GRID_SIZE.keys())
 
 
-def partition(list_in, n):
+def partition(list_in, n, shuffle=True):
+    if not shuffle:
+        # Keep the order of list_in, e.g. when tiles are sorted by priority
+        size = math.ceil(len(list_in) / n) if n else 0
+        return [list_in[i * size : (i + 1) * size] for i in range(n)]
     # Use shuffle to distribute the working load
     # evenly across workers
     random.shuffle(list_in)
@@ -664,8 +669,26 @@ class MVTGenerator:
                 covered.add(t)
         return covered
 
-    def generate_tiles(self, ignore_existing=False):
-        """Generate MVT tiles for the entire geometry queryset."""
+    def _get_tile_hits(self) -> dict[tuple[int, int, int], int]:
+        """Return the recorded hits by (zoom, x, y) for the model layer."""
+        return {
+            (zoom, x, y): hits
+            for zoom, x, y, hits in TileHit.objects.filter(
+                geolevel=self.mdl.geolevel,
+                datatype=self.mdl.datatype,
+                zoom_level__gte=self.min_zoom,
+                zoom_level__lte=self.max_zoom,
+            ).values_list("zoom_level", "tile_x", "tile_y", "hits")
+        }
+
+    def generate_tiles(self, ignore_existing=False, prioritize_hits=False):
+        """Generate MVT tiles for the entire geometry queryset.
+
+        Args:
+            ignore_existing (bool): Regenerate tiles that already exist.
+            prioritize_hits (bool): Generate the most requested tiles first,
+                according to the recorded `TileHit`.
+        """
 
         tiles_to_generate = []
         for zoom in range(self.min_zoom, self.max_zoom + 1):
@@ -685,9 +708,18 @@ class MVTGenerator:
                 elif (tile.x, tile.y) not in existing_tiles:
                     tiles_to_generate.append((tile, zoom))
 
+        if prioritize_hits:
+            hits = self._get_tile_hits()
+            tiles_to_generate.sort(
+                key=lambda item: hits.get((item[1], item[0].x, item[0].y), 0),
+                reverse=True,
+            )
+
         print(f"Start to generate {len(tiles_to_generate)} tiles")
         tiles_to_generate_by_process = partition(
-            tiles_to_generate, math.ceil(len(tiles_to_generate) / 100)
+            tiles_to_generate,
+            math.ceil(len(tiles_to_generate) / 100),
+            shuffle=not prioritize_hits,
         )
 
         futures = []
@@ -0,0 +1,163 @@
+"""Fetching Grand Lyon orthophoto tiles from its WMS service."""
+
+import functools
+import io
+import logging
+from dataclasses import dataclass
+
+import httpx
+from django.conf import settings
+from PIL import Image
+
+from api.utils.http_client import get_http_client
+from api.utils.tile_archive import TileArchive
+from api.utils.tile_math import metatile_to_bbox
+
+logger = logging.getLogger(__name__)
+
+WMS_BASE_URL = "https://download.data.grandlyon.com/wms/grandlyon"
+WMS_LAYER = "grandlyon:ortho_latest"
+TILE_SIZE = 256
+WMS_TIMEOUT = 10
+TILE_CONTENT_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+class WMSError(Exception):
+    """The WMS did not return a usable image."""
+
+
+@functools.lru_cache(maxsize=None)
+def _get_archive(path: str) -> TileArchive:
+    return TileArchive(path)
+
+
+def get_orthophoto_archive() -> TileArchive:
+    """Return the archive of pre-seeded orthophoto tiles."""
+    return _get_archive(settings.ORTHOPHOTO_ARCHIVE_PATH)
+
+
+def tile_key(z: int, x: int, y: int, image_format: str) -> str:
+    return f"orthophoto:tile:{image_format}:{z}:{x}:{y}"
+
+
+async def fetch_metatile(z: int, x0: int, y0: int, size: int) -> bytes:
+    """Request the `size` × `size` tiles metatile starting at (x0, y0) as a PNG."""
+    bbox = metatile_to_bbox(z, x0, y0, size)
+
+    params = {
+        "SERVICE": "WMS",
+        "VERSION": "1.3.0",
+        "REQUEST": "GetMap",
+        "LAYERS": WMS_LAYER,
+        "CRS": "EPSG:3857",
+        "BBOX": f"{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
+        "WIDTH": TILE_SIZE * size,
+        "HEIGHT": TILE_SIZE * size,
+        "FORMAT": "image/png",
+        "TRANSPARENT": "TRUE",
+    }
+
+    try:
+        wms_response = await get_http_client().get(
+            WMS_BASE_URL, params=params, timeout=WMS_TIMEOUT
+        )
+        wms_response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.exception("WMS request failed for metatile z=%s x=%s y=%s", z, x0, y0)
+        raise WMSError(str(e)) from e
+
+    content_type = wms_response.headers.get("Content-Type", "image/png")
+    if "xml" in content_type or "html" in content_type:
+        logger.warning(
+            "WMS returned non-image response for metatile z=%s x=%s y=%s: %s",
+            z,
+            x0,
+            y0,
+            wms_response.text[:200],
+        )
+        raise WMSError(f"Unexpected content type {content_type}")
+
+    return wms_response.content
+
+
+def _alpha_extrema(tile: Image.Image) -> tuple[int, int]:
+    """Minimum and maximum opacity of the tile pixels."""
+    if tile.mode != "RGBA":
+        if "A" not in tile.getbands() and "transparency" not in tile.info:
+            return 255, 255
+        tile = tile.convert("RGBA")
+    return tile.getextrema()[3]
+
+
+@dataclass
+class SlicedTile:
+    """A tile cut from a metatile and encoded."""
+
+    content: bytes
+    content_type: str
+    blank: bool
+
+
+# Formats of the proxied tiles, all encoded from each WMS metatile
+PROXY_FORMATS = ("webp", "jpeg")
+
+
+def negotiate_format(accept: str) -> str:
+    """Lossy format to serve tiles in, given the `Accept` header of the request."""
+    return "webp" if "image/webp" in accept else "jpeg"
+
+
+def _encode(tile: Image.Image, image_format: str) -> tuple[bytes, str]:
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        tile.save(buffer, format="WEBP", quality=settings.ORTHOPHOTO_WEBP_QUALITY)
+    elif image_format == "jpeg" and _alpha_extrema(tile)[0] == 255:
+        tile.convert("RGB").save(
+            buffer, format="JPEG", quality=settings.ORTHOPHOTO_JPEG_QUALITY
+        )
+    else:
+        # JPEG has no transparency: tiles on the edge of the covered area stay PNG
+        image_format = "png"
+        tile.save(buffer, format="PNG")
+    return buffer.getvalue(), TILE_CONTENT_TYPES[image_format]
+
+
+def slice_metatile(
+    content: bytes,
+    z: int,
+    x0: int,
+    y0: int,
+    size: int,
+    image_formats: tuple[str, ...] = ("png",),
+) -> dict[str, dict[tuple[int, int, int], SlicedTile]]:
+    """Cut a metatile image into its tiles, keyed by format then by (z, x, y).
+
+    The image is decoded once and each tile is encoded in every one of
+    `image_formats` ("png", "webp" or "jpeg"). Blank (fully transparent) tiles
+    are outside of the area covered by the WMS.
+    """
+    tiles = {image_format: {} for image_format in image_formats}
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.load()
+            for dx in range(size):
+                for dy in range(size):
+                    box = (
+                        dx * TILE_SIZE,
+                        dy * TILE_SIZE,
+                        (dx + 1) * TILE_SIZE,
+                        (dy + 1) * TILE_SIZE,
+                    )
+                    tile = image.crop(box)
+                    blank = _alpha_extrema(tile)[1] == 0
+                    for image_format in image_formats:
+                        tile_content, content_type = _encode(tile, image_format)
+                        tiles[image_format][(z, x0 + dx, y0 + dy)] = SlicedTile(
+                            tile_content, content_type, blank
+                        )
+    except OSError as e:
+        logger.exception(
+            "WMS returned an unreadable image for metatile z=%s x=%s y=%s", z, x0, y0
+        )
+        raise WMSError(str(e)) from e
+    return tiles
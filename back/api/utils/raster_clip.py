@@ -0,0 +1,139 @@
+"""Clip of a downloadable raster to a city, an IRIS or a bounding box.
+
+Only the window of the geometry bounding box is read from the raster, which is
+tiled, and the pixels outside of the geometry are set to nodata. The clip is
+written as a compressed GeoTIFF, in memory for a bounding box, or as a file
+of MEDIA_ROOT for a city or an IRIS, kept until the data version changes and
+deleted by `delete_previous_clips`.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import rasterio
+from django.conf import settings
+from rasterio.errors import WindowError
+from rasterio.features import geometry_window
+from rasterio.io import MemoryFile
+from rasterio.mask import mask
+
+from iarbre_data.utils.data_version import get_data_version
+
+
+class ClipTooLarge(Exception):
+    """The clip covers more pixels than `RASTER_CLIP_MAX_PIXELS`."""
+
+
+def _read_clip(path: str, geometry) -> tuple[np.ndarray, dict] | None:
+    """Pixels of the raster at `path` in `geometry`, and their GeoTIFF profile."""
+    shapes = [json.loads(geometry.geojson)]
+    with rasterio.open(path) as src:
+        try:
+            window = geometry_window(src, shapes)
+        except WindowError:
+            return None
+        max_pixels = settings.RASTER_CLIP_MAX_PIXELS
+        if max_pixels and window.width * window.height > max_pixels:
+            raise ClipTooLarge
+
+        nodata = src.nodata if src.nodata is not None else 0
+        data, transform = mask(src, shapes, crop=True, all_touched=True, nodata=nodata)
+        profile = src.profile
+        profile.update(
+            driver="GTiff",
+            height=data.shape[1],
+            width=data.shape[2],
+            transform=transform,
+            nodata=nodata,
+            compress="deflate",
+            tiled=True,
+            blockxsize=256,
+            blockysize=256,
+        )
+    return data, profile
+
+
+def clip_raster(path: str, geometry) -> bytes | None:
+    """Clip the raster at `path` to `geometry`.
+
+    Args:
+        path (str): Path of the raster.
+        geometry (GEOSGeometry): Polygon in the raster CRS.
+
+    Returns:
+        bytes | None: The GeoTIFF of the clip, None if `geometry` is outside
+            of the raster.
+
+    Raises:
+        ClipTooLarge: If the clip covers too many pixels.
+    """
+    clip = _read_clip(path, geometry)
+    if clip is None:
+        return None
+    data, profile = clip
+    with MemoryFile() as memfile:
+        with memfile.open(**profile) as dst:
+            dst.write(data)
+        return memfile.read()
+
+
+def write_clip(path: str, geometry, output_path: str) -> bool:
+    """Clip the raster at `path` to `geometry` and write it to `output_path`.
+
+    The clip is written under a temporary name then renamed, so that
+    concurrent requests never read a partial file.
+
+    Returns:
+        bool: False if `geometry` is outside of the raster.
+
+    Raises:
+        ClipTooLarge: If the clip covers too many pixels.
+    """
+    clip = _read_clip(path, geometry)
+    if clip is None:
+        return False
+    data, profile = clip
+    directory = os.path.dirname(output_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tif.tmp")
+    os.close(fd)
+    try:
+        with rasterio.open(tmp_path, "w", **profile) as dst:
+            dst.write(data)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def _clips_folder(raster_type: str = "") -> str:
+    return os.path.join(settings.MEDIA_ROOT, "rasters", "clips", raster_type)
+
+
+def clip_cache_path(raster_type: str, name: str) -> str:
+    """Path of the cached clip `name` of the current version of `raster_type`."""
+    version = get_data_version(raster_type)
+    return os.path.join(_clips_folder(raster_type), version, f"{name}.tif")
+
+
+def delete_previous_clips() -> None:
+    """Delete the cached clips of the previous data versions.
+
+    Called by the commands bumping the data version, not by the API, so that
+    the clips being downloaded are not deleted at each request.
+    """
+    folder = _clips_folder()
+    if not os.path.isdir(folder):
+        return
+    for raster_type in os.listdir(folder):
+        version = get_data_version(raster_type)
+        for previous_version in os.listdir(os.path.join(folder, raster_type)):
+            if previous_version != version:
+                shutil.rmtree(
+                    os.path.join(folder, raster_type, previous_version),
+                    ignore_errors=True,
+                )
@@ -0,0 +1,93 @@
+"""Scores of a polygon computed from the plantability raster.
+
+`raster_plantability_to_geom` creates one `Tile` per valid pixel of
+`plantability.tif`, so the tiles intersecting a polygon are the pixels touched by
+it. Reading the raster window of the polygon replaces the scans of the `Tile`
+table: the cost depends on the polygon bounding box, not on the number of rows.
+IRIS and cities are the ones whose boundaries intersect the polygon.
+The vulnerability zone of each tile is read from a companion raster written by
+the `vulnerability_idx_to_raster` command.
+"""
+
+import json
+import os
+
+import numpy as np
+import rasterio
+from django.conf import settings
+from rasterio.mask import mask
+
+from api.utils.grid_scores import TilesAggregate
+from iarbre_data.models import City, Iris
+from plantability.constants import score_thresholding_array
+
+PLANTABILITY_RASTER = "plantability.tif"
+VULNERABILITY_IDX_RASTER = "tile_vulnerability_idx.tif"
+# Value of the vulnerability id raster for tiles without vulnerability zone
+NO_VULNERABILITY = 0
+
+
+def raster_path(filename: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, "rasters", filename)
+
+
+def rasters_available() -> bool:
+    """Whether polygon scores can be computed from the rasters."""
+    return settings.POLYGON_SCORES_FROM_RASTER and os.path.exists(
+        raster_path(PLANTABILITY_RASTER)
+    )
+
+
+def read_polygon_pixels(filename: str, polygon) -> np.ndarray:
+    """Values of the pixels touched by `polygon`, nodata excluded.
+
+    Args:
+        filename (str): Name of the raster in the rasters media directory.
+        polygon (GEOSGeometry): Polygon in the raster CRS.
+
+    Returns:
+        np.ndarray: 1D array of the pixel values.
+    """
+    with rasterio.open(raster_path(filename)) as src:
+        try:
+            data, _ = mask(
+                src,
+                [json.loads(polygon.geojson)],
+                crop=True,
+                all_touched=True,
+                filled=False,
+            )
+        except ValueError:
+            # Polygon outside of the raster
+            return np.empty(0, dtype=src.dtypes[0])
+        values = data[0].compressed()
+        if src.nodata is not None:
+            values = values[values != src.nodata]
+    return values
+
+
+def vulnerability_ids_in_polygon(polygon) -> list[int]:
+    """Ids of the vulnerability zones of the tiles touched by `polygon`."""
+    if not os.path.exists(raster_path(VULNERABILITY_IDX_RASTER)):
+        return []
+    ids = np.unique(read_polygon_pixels(VULNERABILITY_IDX_RASTER, polygon))
+    return [int(i) for i in ids if i != NO_VULNERABILITY]
+
+
+def aggregate_tiles_from_raster(polygon) -> TilesAggregate:
+    """Aggregate the tiles touched by `polygon` from the rasters."""
+    values = read_polygon_pixels(PLANTABILITY_RASTER, polygon)
+    aggregate = TilesAggregate(count=int(values.size))
+    if not values.size:
+        return aggregate
+
+    indices, counts = np.unique(score_thresholding_array(values), return_counts=True)
+    aggregate.histogram = {float(i): int(c) for i, c in zip(indices, counts)}
+    aggregate.vulnerability_ids = set(vulnerability_ids_in_polygon(polygon))
+    aggregate.iris_ids = set(
+        Iris.objects.filter(geometry__intersects=polygon).values_list("id", flat=True)
+    )
+    aggregate.city_ids = set(
+        City.objects.filter(geometry__intersects=polygon).values_list("id", flat=True)
+    )
+    return aggregate
@@ -0,0 +1,75 @@
+"""Cache of the in-polygon scores.
+
+The same polygons are scored over and over (IRIS and city outlines, drawings
+submitted again), so results are cached under a fingerprint of the polygon, the
+datatype and the version of the data it is scored from. Concurrent requests for
+the same key, possibly from several workers, wait for the first one to compute
+the result instead of computing it again.
+"""
+
+import hashlib
+import time
+from typing import Callable
+
+from django.contrib.gis.geos import GEOSGeometry, WKTWriter
+from django.core.cache import cache
+
+from api.constants import DataType, FrontendDataType
+from iarbre_data.utils.data_version import get_data_version
+
+SCORES_CACHE_DURATION = 60 * 60 * 24 * 30
+# Coordinates are rounded to 10 cm (in SRID_DB) before hashing
+COORDINATE_PRECISION = 1
+# Longest time a request waits for a concurrent computation of the same scores
+COMPUTE_LOCK_TIMEOUT = 30
+POLL_INTERVAL = 0.1
+
+
+def polygon_fingerprint(polygon) -> str:
+    """Hash of the polygon, insensitive to ring orientation and starting vertex."""
+    canonical = GEOSGeometry(
+        WKTWriter(precision=COORDINATE_PRECISION).write(polygon), srid=polygon.srid
+    )
+    canonical.normalize()
+    return hashlib.sha256(f"{canonical.srid}:{canonical.wkt}".encode()).hexdigest()
+
+
+def _scored_datatypes(datatype: str) -> tuple[str, ...]:
+    if datatype == FrontendDataType.PLANTABILITY_VULNERABILITY.value:
+        return (DataType.TILE.value, DataType.VULNERABILITY.value)
+    return (datatype,)
+
+
+def scores_cache_key(datatype: str, polygon) -> str:
+    version = get_data_version(*_scored_datatypes(datatype))
+    return f"scores:{version}:{datatype}:{polygon_fingerprint(polygon)}"
+
+
+def get_or_compute(key: str, compute: Callable):
+    """Return the cached value of `key`, computing and caching it when missing.
+
+    A lock entry is added to the cache while computing, so that other requests
+    poll for the result. If the computation takes longer than
+    `COMPUTE_LOCK_TIMEOUT`, the waiting requests compute the result themselves.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + COMPUTE_LOCK_TIMEOUT
+    locked = cache.add(lock_key, True, COMPUTE_LOCK_TIMEOUT)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        locked = cache.add(lock_key, True, COMPUTE_LOCK_TIMEOUT)
+
+    try:
+        value = compute()
+        cache.set(key, value, SCORES_CACHE_DURATION)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
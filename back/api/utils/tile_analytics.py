@@ -0,0 +1,112 @@
+"""Sampled tile request analytics.
+
+`TileView` records every request it receives in a process-local counter. Only a
+fraction of the requests (`TILE_ANALYTICS_SAMPLE_RATE`) is kept, each sampled hit
+being weighted by the inverse of the rate so that `TileHit.hits` is an estimate of
+the real number of requests. Counters are flushed to the database every
+`TILE_ANALYTICS_FLUSH_INTERVAL` seconds or once `TILE_ANALYTICS_MAX_PENDING`
+distinct tiles are pending, so only one request per interval pays for a write.
+"""
+
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import TileHit
+
+logger = logging.getLogger(__name__)
+
+
+class TileHitRecorder:
+    """Aggregate tile hits in memory and flush them periodically."""
+
+    def __init__(self):
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, geolevel: str, datatype: str, zoom, x, y) -> bool:
+        """Count a request for a tile, subject to sampling.
+
+        Recording never touches the database, so it is safe to call from async
+        views which then run `flush` in a thread when it is due.
+
+        Returns:
+            bool: Whether pending counters should be flushed.
+        """
+        rate = settings.TILE_ANALYTICS_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return False
+        try:
+            key = (geolevel, datatype, int(zoom), int(x), int(y))
+        except (TypeError, ValueError):
+            return False
+
+        with self._lock:
+            self._pending[key] += max(1, round(1 / rate))
+            return (
+                len(self._pending) >= settings.TILE_ANALYTICS_MAX_PENDING
+                or time.monotonic() - self._last_flush
+                >= settings.TILE_ANALYTICS_FLUSH_INTERVAL
+            )
+
+    def flush(self) -> int:
+        """Write pending counters to the database.
+
+        Returns:
+            int: Number of distinct tiles written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                # Create missing rows first so concurrent workers only race on updates
+                TileHit.objects.bulk_create(
+                    [
+                        TileHit(
+                            geolevel=geolevel,
+                            datatype=datatype,
+                            zoom_level=zoom,
+                            tile_x=x,
+                            tile_y=y,
+                        )
+                        for geolevel, datatype, zoom, x, y in pending
+                    ],
+                    ignore_conflicts=True,
+                )
+                for (geolevel, datatype, zoom, x, y), hits in pending.items():
+                    TileHit.objects.filter(
+                        geolevel=geolevel,
+                        datatype=datatype,
+                        zoom_level=zoom,
+                        tile_x=x,
+                        tile_y=y,
+                    ).update(hits=F("hits") + hits, last_hit=now)
+        except DatabaseError:
+            logger.exception("Failed to flush %d tile hit counters", len(pending))
+            return 0
+        return len(pending)
+
+
+tile_hit_recorder = TileHitRecorder()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        tile_hit_recorder.flush()
+    except Exception:  # Database may already be unavailable at shutdown
+        pass
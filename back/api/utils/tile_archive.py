@@ -0,0 +1,107 @@
+"""Raster tile archive stored in an MBTiles (SQLite) file.
+
+Tiles are stored with the TMS row numbering of the MBTiles specification, the
+XYZ row is flipped on read and write.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Iterable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER,
+    tile_column INTEGER,
+    tile_row INTEGER,
+    tile_data BLOB
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (
+    zoom_level, tile_column, tile_row
+);
+"""
+
+
+def _tms_row(z: int, y: int) -> int:
+    return (1 << z) - 1 - y
+
+
+class TileArchive:
+    """Read and write access to the tiles of an MBTiles file.
+
+    Read connections are opened lazily, one per thread, so that the archive can
+    be read from the threads running `sync_to_async` calls.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        """Return the tile data, or None if the tile is not in the archive."""
+        if not self.exists():
+            return None
+        try:
+            row = (
+                self._reader()
+                .execute(
+                    "SELECT tile_data FROM tiles "
+                    "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    (z, x, _tms_row(z, y)),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error:
+            # Archive being created or replaced: serve from the proxy meanwhile
+            self._local.connection = None
+            return None
+        return row[0] if row else None
+
+    def open_writer(self) -> sqlite3.Connection:
+        """Create the archive if needed and return a connection to write to it."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    @staticmethod
+    def existing_tiles(connection: sqlite3.Connection, z: int) -> set[tuple[int, int]]:
+        """Return the (x, y) of the tiles already stored at zoom `z`."""
+        rows = connection.execute(
+            "SELECT tile_column, tile_row FROM tiles WHERE zoom_level = ?", (z,)
+        )
+        return {(x, _tms_row(z, row)) for x, row in rows}
+
+    @staticmethod
+    def put_many(
+        connection: sqlite3.Connection,
+        tiles: Iterable[tuple[tuple[int, int, int], bytes]],
+    ):
+        connection.executemany(
+            "INSERT OR REPLACE INTO tiles "
+            "(zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+            [(z, x, _tms_row(z, y), data) for (z, x, y), data in tiles],
+        )
+        connection.commit()
+
+    @staticmethod
+    def set_metadata(connection: sqlite3.Connection, metadata: dict):
+        connection.executemany(
+            "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+            [(name, str(value)) for name, value in metadata.items()],
+        )
+        connection.commit()
@@ -8,3 +8,23 @@ def tile_to_bbox(z, x, y):
     """
     bounds = mercantile.xy_bounds(mercantile.Tile(x, y, z))
     return bounds.left, bounds.bottom, bounds.right, bounds.top
+
+
+def metatile_origin(z, x, y, size):
+    """Return the top-left tile and the side of the metatile containing a tile.
+
+    Metatiles are aligned on multiples of `size` tiles; the side is clamped to
+    the number of tiles at zoom `z`. `size` must be a power of two, so that
+    metatiles tile each zoom level exactly.
+    """
+    if size < 1 or size & (size - 1):
+        raise ValueError(f"Metatile size must be a power of two, not {size}")
+    size = max(1, min(size, 2**z))
+    return x - x % size, y - y % size, size
+
+
+def metatile_to_bbox(z, x0, y0, size):
+    """Convert a metatile of `size` × `size` tiles to an EPSG:3857 bounding box."""
+    left, _, _, top = tile_to_bbox(z, x0, y0)
+    _, bottom, right, _ = tile_to_bbox(z, x0 + size - 1, y0 + size - 1)
+    return left, bottom, right, top
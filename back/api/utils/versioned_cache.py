@@ -0,0 +1,79 @@
+"""Cache of API responses invalidated by the data version.
+
+`versioned_cache_page` caches a view like `cache_page`, with the version of the
+data it is computed from in the cache key and as ETag. Responses are kept long
+on the server, while clients revalidate them with `If-None-Match` and get a
+`304 Not Modified` until the data changes. The nginx cache keeps them for
+`EDGE_CACHE_DURATION` (`X-Accel-Expires`), then revalidates them the same way.
+
+A view can set `request.server_timing` to the value of its `Server-Timing`
+header: the header is added outside of the cache, so that cached responses do
+not replay the timings of the request that computed them.
+"""
+
+from functools import wraps
+
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import etag
+
+from api.constants import DataType
+from iarbre_data.utils.data_version import get_data_version
+
+VERSIONED_CACHE_DURATION = 60 * 60 * 24 * 30
+# Staleness allowed in the nginx cache after the data changes
+EDGE_CACHE_DURATION = 60
+
+
+def _set_server_timing(response, server_timing: str) -> None:
+    if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+        # After the cache callback, which stores the response when it is rendered
+        response.add_post_render_callback(
+            lambda rendered: rendered.headers.__setitem__(
+                "Server-Timing", server_timing
+            )
+        )
+    else:
+        response["Server-Timing"] = server_timing
+
+
+def versioned_cache_page(
+    *datatypes: str,
+    timeout: int = VERSIONED_CACHE_DURATION,
+    datatype_kwarg: str | None = None,
+):
+    """Cache a view until the data of `datatypes` changes.
+
+    Args:
+        datatypes (str): Datatypes the response is computed from. Without
+            datatypes, the response only changes with the global data version.
+        timeout (int): Server-side cache duration, in seconds.
+        datatype_kwarg (str | None): View argument holding one more datatype.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            scopes = list(datatypes)
+            if datatype_kwarg and kwargs.get(datatype_kwarg) in DataType.values:
+                scopes.append(kwargs[datatype_kwarg])
+            version = get_data_version(*scopes)
+
+            cached_view = cache_page(timeout, key_prefix=f"data-{version}")(view)
+            response = etag(lambda *args, **kwargs: version)(cached_view)(
+                request, *args, **kwargs
+            )
+            # Clients keep the response but check its ETag before using it
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            # Read by nginx instead of Cache-Control, and not sent to clients
+            response["X-Accel-Expires"] = EDGE_CACHE_DURATION
+            # Only set when the view was called, not on cache hits
+            server_timing = getattr(request, "server_timing", None)
+            if server_timing:
+                _set_server_timing(response, server_timing)
+            return response
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,117 @@
+"""Fast GeoJSON and CSV outputs of WFS GetFeature.
+
+django-gisserver builds a model instance per feature and reads each field
+through its XSD element. For flat feature types, whose elements are all fields
+of the model, these renderers read plain rows from the server-side cursor
+instead, with the geometry already encoded (and reprojected) by PostGIS. The
+queryset is the one built by gisserver, so filters, `COUNT`/`STARTINDEX`
+paging and `SRSNAME` are applied as usual. Other feature types are rendered
+by gisserver, with the geometries still encoded by PostGIS.
+"""
+
+from datetime import datetime, timezone
+
+import orjson
+from gisserver.db import AsEWKT, get_db_geometry_target
+from gisserver.output import DBCSVRenderer, DBGeoJsonRenderer
+
+
+def _flat_properties(projection) -> list | None:
+    """Non-geometry elements of the projection, None if they are not all model fields."""
+    properties = [
+        element
+        for element in projection.xsd_root_elements
+        if not element.type.is_geometry
+    ]
+    if projection.orm_relations or any(
+        element.source is None
+        or element.is_many
+        or element.is_flattened
+        or element.type.is_complex_type
+        for element in properties
+    ):
+        return None
+    return properties
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc)
+    return value
+
+
+class RowGeoJsonRenderer(DBGeoJsonRenderer):
+    """GeoJSON renderer reading flat feature types as rows."""
+
+    def __init__(self, *args, **kwargs):
+        # Property names of the projections read as rows
+        self._row_properties = {}
+        super().__init__(*args, **kwargs)
+
+    def decorate_queryset(self, projection, queryset):
+        queryset = super().decorate_queryset(projection, queryset)
+        properties = _flat_properties(projection)
+        geometry = projection.main_geometry_element
+        if (
+            properties is None
+            or geometry is None
+            or projection.feature_type.show_name_field
+        ):
+            return queryset
+
+        self._row_properties[projection] = [element.name for element in properties]
+        # The geometry is annotated by DBGeoJsonRenderer
+        return queryset.values_list(
+            "pk", "_as_db_geojson", *[element.orm_path for element in properties]
+        )
+
+    def render_feature(self, projection, instance) -> bytes:
+        names = self._row_properties.get(projection)
+        if names is None:
+            return super().render_feature(projection, instance)
+
+        pk, geojson, *values = instance
+        return b'    {"type":"Feature","id":%b,"geometry":%b,"properties":%b}' % (
+            orjson.dumps(f"{projection.feature_type.name}.{pk}"),
+            b"null" if geojson is None else geojson.encode(),
+            orjson.dumps(dict(zip(names, map(_format_value, values))), default=str),
+        )
+
+
+class RowCSVRenderer(DBCSVRenderer):
+    """CSV renderer reading flat feature types as rows."""
+
+    def __init__(self, *args, **kwargs):
+        # Projections read as rows, in the order of the CSV header
+        self._row_projections = set()
+        super().__init__(*args, **kwargs)
+
+    def decorate_queryset(self, projection, queryset):
+        queryset = super().decorate_queryset(projection, queryset)
+        if _flat_properties(projection) is None:
+            return queryset
+
+        columns, geometries = [], {}
+        for element in projection.xsd_root_elements:
+            if element.type.is_geometry:
+                name = f"_row_ewkt_{len(geometries)}"
+                geometries[name] = AsEWKT(
+                    get_db_geometry_target(element, projection.output_crs)
+                )
+                columns.append(name)
+            else:
+                columns.append(element.orm_path)
+
+        self._row_projections.add(projection)
+        # Only the selected columns are queried, not the DBCSVRenderer annotations
+        return queryset.annotate(**geometries).values_list(*columns)
+
+    def get_row(self, instance, projection, xsd_elements):
+        if projection not in self._row_projections:
+            return super().get_row(instance, projection, xsd_elements)
+        return [
+            str(value.astimezone(timezone.utc))
+            if isinstance(value, datetime)
+            else value
+            for value in instance
+        ]
@@ -5,7 +5,9 @@ from .heath_views import HealthCheckView  # noqa: F401
 from .qpv_views import QPVListView  # noqa: F401
 from .boundary_views import CityBoundaryView  # noqa: F401
 from .database_version_views import MetadataView  # noqa: F401
-from .raster_views import RasterDownloadView  # noqa: F401
+from .raster_views import RasterClipView, RasterDownloadView  # noqa: F401
+from .export_views import ExportDownloadView  # noqa: F401
 from .wfs_views import IArbreWFSView  # noqa: F401
 from .orthophoto_views import OrthophotoTileView  # noqa: F401
 from .biosphere_views import BiosphereLandCoverAtPointView  # noqa: F401
+from .cadastre_views import CadastreDetailView  # noqa: F401
@@ -5,13 +5,26 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from api.utils.land_cover_composition import (
+    land_cover_areas,
+    land_cover_raster_available,
+)
 from iarbre_data.models import BiosphereFunctionalIntegrityLandCover
-from iarbre_data.utils.biosphere_land_cover import LandCoverClass
+from iarbre_data.utils.biosphere_land_cover import (
+    CLASS_TO_BINARY,
+    LAND_COVER_TO_CLASS,
+    LandCoverClass,
+)
 from iarbre_data.settings import SRID_DB, SRID_DOWNLOADED_DATA
 
 RADIUS_M = 500
 
 
+def _binary_order(binary: bool | None) -> int:
+    """True first, then False, then None."""
+    return {True: 0, False: 1}.get(binary, 2)
+
+
 class BiosphereLandCoverAtPointView(APIView):
     """Retrieve distinct land cover types with area percentages within a 500m radius."""
 
@@ -29,18 +42,13 @@ class BiosphereLandCoverAtPointView(APIView):
 
         point = Point(lng, lat, srid=SRID_DOWNLOADED_DATA)
         point.transform(SRID_DB)
-        buffer = point.buffer(RADIUS_M)
 
-        records = list(
-            BiosphereFunctionalIntegrityLandCover.objects.filter(
-                geometry__intersects=buffer
-            )
-            .values("land_cover", "binary")
-            .annotate(total_area=Sum(Area(Intersection("geometry", buffer))))
-            .order_by(F("binary").desc(nulls_last=True), "land_cover")
-        )
+        if land_cover_raster_available():
+            records = self.records_from_raster(point)
+        else:
+            records = self.records_from_polygons(point)
 
-        total = sum(r["total_area"].sq_m for r in records)
+        total = sum(r["total_area"] for r in records)
         land_cover_labels = dict(LandCoverClass.choices)
         result = [
             {
@@ -50,9 +58,39 @@ class BiosphereLandCoverAtPointView(APIView):
                 ),
                 "binary": r["binary"],
                 "percentage": (
-                    round(r["total_area"].sq_m / total * 100, 1) if total else 0.0
+                    round(r["total_area"] / total * 100, 1) if total else 0.0
                 ),
             }
             for r in records
         ]
         return Response(result)
+
+    @staticmethod
+    def records_from_polygons(point) -> list[dict]:
+        """Area of each land cover intersecting the disc around `point`."""
+        buffer = point.buffer(RADIUS_M)
+        records = (
+            BiosphereFunctionalIntegrityLandCover.objects.filter(
+                geometry__intersects=buffer
+            )
+            .values("land_cover", "binary")
+            .annotate(total_area=Sum(Area(Intersection("geometry", buffer))))
+            .order_by(F("binary").desc(nulls_last=True), "land_cover")
+        )
+        return [{**r, "total_area": r["total_area"].sq_m} for r in records]
+
+    @staticmethod
+    def records_from_raster(point) -> list[dict]:
+        """Area of each land cover in the disc around `point`, read from the
+        window of the disc in the land cover raster."""
+        records = [
+            {
+                "land_cover": land_cover,
+                "binary": CLASS_TO_BINARY[LAND_COVER_TO_CLASS[land_cover]],
+                "total_area": area,
+            }
+            for land_cover, area in land_cover_areas(point, RADIUS_M).items()
+        ]
+        return sorted(
+            records, key=lambda r: (_binary_order(r["binary"]), r["land_cover"])
+        )
@@ -2,10 +2,10 @@ import json
 
 from django.contrib.gis.serializers import geojson
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from rest_framework import generics
 from rest_framework.response import Response
 
+from api.utils.versioned_cache import versioned_cache_page
 from iarbre_data.models import City
 
 
@@ -13,7 +13,7 @@ class CityBoundaryView(generics.ListAPIView):
     def get_queryset(self):
         return City.objects.all()
 
-    @method_decorator(cache_page(60 * 60 * 24 * 30))
+    @method_decorator(versioned_cache_page())
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         geojson_string = geojson.Serializer().serialize(
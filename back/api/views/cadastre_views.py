@@ -0,0 +1,19 @@
+from rest_framework import generics
+
+from api.serializers.serializers import CadastreSerializer
+from iarbre_data.models import Cadastre
+
+
+class CadastreDetailView(generics.RetrieveAPIView):
+    """Plantability and vulnerability statistics of a cadastre parcel.
+
+    The statistics are precomputed by `compute_cadastre_stats`.
+
+    Example: GET /api/cadastre/691230000AB0012/
+    """
+
+    queryset = Cadastre.objects.select_related("vulnerability_idx").defer(
+        "geometry", "map_geometry"
+    )
+    serializer_class = CadastreSerializer
+    lookup_field = "parcel_id"
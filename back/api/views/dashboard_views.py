@@ -1,23 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cache
+from typing import Callable
+
+from django.conf import settings
 
 from django.contrib.gis.db.models.functions import Area
-from django.db.models import Avg, Case, FloatField, QuerySet, Sum, When
+from django.db import close_old_connections, connection
+from django.db.models import Avg, Case, F, FloatField, QuerySet, Sum, When
 from django.db.models.fields.json import KeyTextTransform
 from django.db.models.functions import Cast
+from django.db.models.lookups import IsNull
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from prometheus_client import Histogram
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.constants import INDICE_ROUNDING_DECIMALS
+from api.constants import DASHBOARD_DATATYPES, INDICE_ROUNDING_DECIMALS, GeoLevel
 from api.serializers.dashboard_serializer import DashboardSerializer
-from iarbre_data.models import City, Iris, Lcz, Vegestrate, Vulnerability
+from api.utils.versioned_cache import versioned_cache_page
+from iarbre_data.utils.data_version import get_data_version
+from iarbre_data.models import (
+    AdminUnitOverlay,
+    City,
+    DashboardSummary,
+    Iris,
+    Lcz,
+    Vegestrate,
+    Vulnerability,
+)
 
 M2_TO_HA = 10_000
 
 BUILT_LCZ_INDICES = {"1", "2", "3", "4", "5", "6", "8", "9"}
 
+SECTION_DURATION = Histogram(
+    "iarbre_dashboard_section_seconds",
+    "Time spent computing a section of the dashboard",
+    ["section"],
+)
+
 
 def _safe_round(value: float | None) -> float:
     return round(value, INDICE_ROUNDING_DECIMALS) if value is not None else 0
@@ -27,19 +51,42 @@ def _m2_to_ha(value: float) -> float:
     return round(value / M2_TO_HA, 1) if value else 0
 
 
+def _json_value(key: str, prefix: str = "") -> Cast:
+    """Build Cast(KeyTextTransform(key, 'details'), FloatField) expression."""
+    return Cast(KeyTextTransform(key, f"{prefix}details"), output_field=FloatField())
+
+
+def _built_only(key: str, prefix: str = "") -> Case:
+    """LCZ detail value of built LCZ indices only, NULL otherwise."""
+    return Case(
+        When(
+            **{f"{prefix}lcz_index__in": BUILT_LCZ_INDICES},
+            then=_json_value(key, prefix),
+        ),
+        output_field=FloatField(),
+    )
+
+
 def _json_avg(key: str) -> Avg:
     """Build Avg(Cast(KeyTextTransform(key, 'details'), FloatField)) expression."""
-    return Avg(Cast(KeyTextTransform(key, "details"), output_field=FloatField()))
+    return Avg(_json_value(key))
 
 
 def _json_avg_built_only(key: str) -> Avg:
     """Avg over built LCZ indices only (conditional aggregation)."""
-    return Avg(
+    return Avg(_built_only(key))
+
+
+def _weighted_avg(value) -> Sum:
+    """Average of `value` over overlays, weighted by their intersection area.
+
+    Overlays whose value is NULL are left out of the weights, as `Avg` does.
+    """
+    if isinstance(value, str):
+        value = F(value)
+    return Sum(value * F("intersection_area"), output_field=FloatField()) / Sum(
         Case(
-            When(
-                lcz_index__in=BUILT_LCZ_INDICES,
-                then=Cast(KeyTextTransform(key, "details"), output_field=FloatField()),
-            ),
+            When(IsNull(value, False), then=F("intersection_area")),
             output_field=FloatField(),
         )
     )
@@ -53,6 +100,33 @@ def _avg_from_counts(counts: dict) -> float:
     return sum(int(k) * v for k, v in counts.items()) / total
 
 
+@cache
+def _section_pool() -> ThreadPoolExecutor:
+    """Threads computing the dashboard sections, each with its own DB connection."""
+    return ThreadPoolExecutor(
+        max_workers=settings.DASHBOARD_SECTION_WORKERS,
+        thread_name_prefix="dashboard",
+    )
+
+
+def _timed(name: str, aggregate: Callable, scope) -> tuple[dict, float]:
+    """Compute a section, returning it with its duration in seconds."""
+    start = time.perf_counter()
+    section = aggregate(scope)
+    duration = time.perf_counter() - start
+    SECTION_DURATION.labels(section=name).observe(duration)
+    return section, duration
+
+
+def _timed_in_thread(name: str, aggregate: Callable, scope) -> tuple[dict, float]:
+    # Same connection handling as Django around a request
+    close_old_connections()
+    try:
+        return _timed(name, aggregate, scope)
+    finally:
+        close_old_connections()
+
+
 @dataclass
 class DashboardScope:
     """Geographic scale resolved from query parameters."""
@@ -62,38 +136,123 @@ class DashboardScope:
     geometry_filter: dict
     cities_qs: QuerySet[City]
     area_m2: float
+    # Overlays of the city or IRIS, None for the metropole
+    overlays: QuerySet[AdminUnitOverlay] | None = None
+
+    def layer_overlays(self, layer: str) -> QuerySet[AdminUnitOverlay] | None:
+        """Overlays of the scope with the features of `layer`, None when they are
+        not computed, for instance after the layer is imported again."""
+        if self.overlays is None:
+            return None
+        overlays = self.overlays.filter(**{f"{layer}__isnull": False})
+        return overlays if overlays.exists() else None
 
 
 class DashboardView(APIView):
     """Aggregated dashboard data for the metropole, a city, or an IRIS zone.
 
+    The data is read from the `DashboardSummary` computed by
+    `compute_dashboard_summaries`, and computed on the fly for the scopes
+    without summary or whose summary predates the current data version. The sections are then computed concurrently, with their
+    durations in the `Server-Timing` header and in the
+    `iarbre_dashboard_section_seconds` metric. Metrics of a city or an IRIS
+    are weighted by the area of the layer features inside it, read from the
+    `AdminUnitOverlay` computed by `compute_admin_unit_overlays`. For a layer
+    without overlays, every intersecting feature counts the same.
+
     GET /api/dashboard/                        -> metropole (all cities)
     GET /api/dashboard/?city_code=69123        -> single city
     GET /api/dashboard/?iris_code=691230101    -> single IRIS
     """
 
-    @method_decorator(cache_page(60 * 60))
+    @method_decorator(versioned_cache_page(*DASHBOARD_DATATYPES))
     def get(self, request, *args, **kwargs):
-        scope = self._get_geographic_scale(request)
+        summary = self._get_summary(request)
+        if summary is not None:
+            return Response(summary)
+        timings = {}
+        data = self.compute_dashboard(self._get_geographic_scale(request), timings)
+        # Set outside of the cache by versioned_cache_page
+        request.server_timing = ", ".join(
+            f"{name};dur={duration * 1000:.1f}" for name, duration in timings.items()
+        )
+        return Response(data)
+
+    @staticmethod
+    def _get_summary(request) -> dict | None:
+        city_code = request.query_params.get("city_code")
+        iris_code = request.query_params.get("iris_code")
+        if iris_code:
+            geolevel, code = GeoLevel.IRIS.value, iris_code
+        elif city_code:
+            geolevel, code = GeoLevel.CITY.value, city_code
+        else:
+            geolevel, code = DashboardSummary.METROPOLE, ""
+        # Summaries of older data are computed again
+        return (
+            DashboardSummary.objects.filter(
+                geolevel=geolevel,
+                code=code,
+                data_version=get_data_version(*DASHBOARD_DATATYPES),
+            )
+            .values_list("data", flat=True)
+            .first()
+        )
+
+    def compute_dashboard(
+        self, scope: DashboardScope, timings: dict | None = None
+    ) -> dict:
+        """Compute the dashboard data of a scope from the source layers.
+
+        The duration of each section, in seconds, is added to `timings`.
+        """
         data = {
             "city": self._serialize_city(scope.city),
             "areaHa": round(scope.area_m2 / M2_TO_HA, 1),
-            "plantability": self._aggregate_plantability(scope),
-            "vulnerability": self._aggregate_vulnerability(scope.geometry_filter),
-            "vegetation": self._aggregate_vegetation(scope),
-            "lcz": self._aggregate_lcz(scope.geometry_filter),
         }
+        for name, (section, duration) in self._compute_sections(scope).items():
+            data[name] = section
+            if timings is not None:
+                timings[name] = duration
         serializer = DashboardSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        return Response(serializer.data)
+        return serializer.data
+
+    def _compute_sections(self, scope: DashboardScope) -> dict[str, tuple]:
+        """Compute the independent sections, concurrently when possible."""
+        aggregates = {
+            "plantability": self._aggregate_plantability,
+            "vulnerability": self._aggregate_vulnerability,
+            "vegetation": self._aggregate_vegetation,
+            "lcz": self._aggregate_lcz,
+        }
+        # The connections of other threads cannot see uncommitted rows
+        if settings.DASHBOARD_SECTION_WORKERS <= 1 or connection.in_atomic_block:
+            return {
+                name: _timed(name, aggregate, scope)
+                for name, aggregate in aggregates.items()
+            }
+        futures = {
+            name: _section_pool().submit(_timed_in_thread, name, aggregate, scope)
+            for name, aggregate in aggregates.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    @classmethod
+    def _get_geographic_scale(cls, request) -> DashboardScope:
+        return cls.get_scope(
+            city_code=request.query_params.get("city_code"),
+            iris_code=request.query_params.get("iris_code"),
+        )
 
     @staticmethod
-    def _get_geographic_scale(request) -> DashboardScope:
-        city_code = request.query_params.get("city_code")
-        iris_code = request.query_params.get("iris_code")
+    def get_scope(
+        city_code: str | None = None, iris_code: str | None = None
+    ) -> DashboardScope:
+        """Resolve the scope of a city or IRIS code, the metropole without code."""
         cities_qs = City.objects.all()
 
-        city, iris, geometry = None, None, None
+        city, iris, geometry, overlays = None, None, None, None
 
         if iris_code:
             iris = get_object_or_404(
@@ -101,9 +260,15 @@ class DashboardView(APIView):
             )
             city = iris.city
             geometry = iris.geometry
+            overlays = AdminUnitOverlay.objects.filter(
+                geolevel=GeoLevel.IRIS.value, unit_id=iris.id
+            )
         elif city_code:
             city = get_object_or_404(City, code=city_code)
             geometry = city.geometry
+            overlays = AdminUnitOverlay.objects.filter(
+                geolevel=GeoLevel.CITY.value, unit_id=city.id
+            )
 
         if geometry:
             area_m2 = geometry.area
@@ -120,6 +285,7 @@ class DashboardView(APIView):
             geometry_filter={"geometry__intersects": geometry} if geometry else {},
             cities_qs=cities_qs,
             area_m2=area_m2,
+            overlays=overlays,
         )
 
     @staticmethod
@@ -187,21 +353,30 @@ class DashboardView(APIView):
         }
 
     @staticmethod
-    def _aggregate_vulnerability(geometry_filter: dict) -> dict:
-        qs = Vulnerability.objects.all()
-        if geometry_filter:
-            qs = qs.filter(**geometry_filter)
-
-        result = qs.aggregate(
-            avg_day=Avg("vulnerability_index_day"),
-            avg_night=Avg("vulnerability_index_night"),
-            avg_expo_day=Avg("expo_index_day"),
-            avg_expo_night=Avg("expo_index_night"),
-            avg_sensibility_day=Avg("sensibilty_index_day"),
-            avg_sensibility_night=Avg("sensibilty_index_night"),
-            avg_capaf_day=Avg("capaf_index_day"),
-            avg_capaf_night=Avg("capaf_index_night"),
-        )
+    def _aggregate_vulnerability(scope: DashboardScope) -> dict:
+        fields = {
+            "avg_day": "vulnerability_index_day",
+            "avg_night": "vulnerability_index_night",
+            "avg_expo_day": "expo_index_day",
+            "avg_expo_night": "expo_index_night",
+            "avg_sensibility_day": "sensibilty_index_day",
+            "avg_sensibility_night": "sensibilty_index_night",
+            "avg_capaf_day": "capaf_index_day",
+            "avg_capaf_night": "capaf_index_night",
+        }
+        overlays = scope.layer_overlays("vulnerability")
+        if overlays is not None:
+            result = overlays.aggregate(
+                **{
+                    name: _weighted_avg(f"vulnerability__{field}")
+                    for name, field in fields.items()
+                }
+            )
+        else:
+            qs = Vulnerability.objects.filter(**scope.geometry_filter)
+            result = qs.aggregate(
+                **{name: Avg(field) for name, field in fields.items()}
+            )
 
         return {
             "averageDay": _safe_round(result["avg_day"]),
@@ -216,14 +391,20 @@ class DashboardView(APIView):
 
     @staticmethod
     def _aggregate_vegetation(scope: DashboardScope) -> dict:
-        qs = Vegestrate.objects.all()
-        if scope.geometry_filter:
-            qs = qs.filter(**scope.geometry_filter)
+        overlays = scope.layer_overlays("vegestrate")
+        if overlays is not None:
+            # Surface of each vegetation polygon inside the scope
+            rows = overlays.values(strate=F("vegestrate__strate")).annotate(
+                total=Sum(F("vegestrate__surface") * F("weight"))
+            )
+        else:
+            rows = (
+                Vegestrate.objects.filter(**scope.geometry_filter)
+                .values("strate")
+                .annotate(total=Sum("surface"))
+            )
 
-        by_strate = {
-            row["strate"]: row["total"]
-            for row in qs.values("strate").annotate(total=Sum("surface"))
-        }
+        by_strate = {row["strate"]: row["total"] for row in rows}
 
         trees = by_strate.get("arborescent", 0) or 0
         bushes = by_strate.get("arbustif", 0) or 0
@@ -238,21 +419,31 @@ class DashboardView(APIView):
         }
 
     @staticmethod
-    def _aggregate_lcz(geometry_filter: dict) -> dict:
-        qs = Lcz.objects.all()
-        if geometry_filter:
-            qs = qs.filter(**geometry_filter)
-
-        result = qs.aggregate(
-            avg_hre_built=_json_avg_built_only("hre"),
-            avg_bur_built=_json_avg_built_only("bur"),
-            avg_ror=_json_avg("ror"),
-            avg_bsr=_json_avg("bsr"),
-            avg_bur=_json_avg("bur"),
-            avg_war=_json_avg("war"),
-            avg_ver=_json_avg("ver"),
-            avg_vhr=_json_avg("vhr"),
-        )
+    def _aggregate_lcz(scope: DashboardScope) -> dict:
+        keys = {
+            "avg_ror": "ror",
+            "avg_bsr": "bsr",
+            "avg_bur": "bur",
+            "avg_war": "war",
+            "avg_ver": "ver",
+            "avg_vhr": "vhr",
+        }
+        overlays = scope.layer_overlays("lcz")
+        if overlays is not None:
+            result = overlays.aggregate(
+                avg_hre_built=_weighted_avg(_built_only("hre", "lcz__")),
+                avg_bur_built=_weighted_avg(_built_only("bur", "lcz__")),
+                **{
+                    name: _weighted_avg(_json_value(key, "lcz__"))
+                    for name, key in keys.items()
+                },
+            )
+        else:
+            result = Lcz.objects.filter(**scope.geometry_filter).aggregate(
+                avg_hre_built=_json_avg_built_only("hre"),
+                avg_bur_built=_json_avg_built_only("bur"),
+                **{name: _json_avg(key) for name, key in keys.items()},
+            )
 
         return {
             "averageBuildingSurfaceRate": _safe_round(result["avg_bur_built"]),
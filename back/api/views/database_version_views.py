@@ -1,16 +1,47 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import patch_response_headers
+from django.views import View
 from telescoop_backup.backup import get_backups, FILE_FORMAT
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-
-
-class MetadataView(APIView):
-    @method_decorator(cache_page(60 * 60 * 24))
-    def get(self, request):
-        backups = get_backups(date_format=FILE_FORMAT)
-        generation_date = backups[-1]["key"]["Key"].split("T")[0][:7]
-        print(generation_date)
-        return Response(
-            {"generation_date": generation_date if generation_date else None}
+
+from iarbre_data.utils.data_version import get_data_version, get_data_versions
+
+METADATA_CACHE_DURATION = 60 * 60 * 24
+# The data versions change with each import, clients only keep them shortly
+METADATA_CLIENT_CACHE_DURATION = 60
+
+
+def _get_generation_date() -> str | None:
+    """Month of the last database backup, i.e. of the last data generation."""
+    backups = get_backups(date_format=FILE_FORMAT)
+    if not backups:
+        return None
+    return backups[-1]["key"]["Key"].split("T")[0][:7] or None
+
+
+class MetadataView(View):
+    """Metadata about the served data.
+
+    Listing the backups calls the S3 API, so it runs in a thread and is cached.
+    The data versions, global and per datatype, change each time the data is
+    regenerated or imported, and are the ETags of the cached API responses.
+    """
+
+    async def get(self, request):
+        metadata = await cache.aget("metadata")
+        if metadata is None:
+            metadata = {
+                "generationDate": await sync_to_async(_get_generation_date)(),
+            }
+            await cache.aset("metadata", metadata, METADATA_CACHE_DURATION)
+
+        response = JsonResponse(
+            {
+                **metadata,
+                "dataVersion": await sync_to_async(get_data_version)(),
+                "dataVersions": await sync_to_async(get_data_versions)(),
+            }
         )
+        patch_response_headers(response, METADATA_CLIENT_CACHE_DURATION)
+        return response
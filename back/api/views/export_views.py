@@ -0,0 +1,40 @@
+import os
+
+from django.http import Http404
+from rest_framework.views import APIView
+
+from api.utils.file_range import ranged_file_response
+from iarbre_data.utils.layer_exports import EXPORT_FORMATS, EXPORT_LAYERS, export_path
+
+
+class ExportDownloadView(APIView):
+    """API endpoint to download the plantability and vegestrate layers as
+    GeoParquet or FlatGeobuf files.
+
+    HTTP range requests are answered, so that clients only fetch the index and
+    the features of the bounding box they need.
+
+    Example: GET /api/exports/plantability.fgb or GET /api/exports/vegestrate.parquet
+    """
+
+    def get(self, request, layer, export_format):
+        if layer not in EXPORT_LAYERS or export_format not in EXPORT_FORMATS:
+            raise Http404(
+                "Export does not exist, only plantability or vegestrate are "
+                "available, as parquet or fgb."
+            )
+
+        path = export_path(layer, export_format)
+        if not os.path.exists(path):
+            raise Http404(
+                "Export file not found. Please send an email to contact@telescoop.fr"
+            )
+
+        response = ranged_file_response(
+            request,
+            path,
+            content_type=EXPORT_FORMATS[export_format],
+            filename=f"{layer}.{export_format}",
+        )
+        response["Cache-Control"] = "public, max-age=3600"
+        return response
@@ -1,71 +1,177 @@
+import asyncio
 import logging
+import time
 
-import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
 from django.http import HttpResponse, Http404
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from rest_framework.views import APIView
+from django.utils.cache import patch_vary_headers
+from django.views import View
 
-from api.utils.tile_math import tile_to_bbox
+from api.utils.http_client import (
+    CircuitBreaker,
+    SingleFlight,
+    get_upstream_semaphore,
+)
+from api.utils.orthophoto import (
+    PROXY_FORMATS,
+    WMS_TIMEOUT,
+    WMSError,
+    fetch_metatile,
+    get_orthophoto_archive,
+    negotiate_format,
+    slice_metatile,
+    tile_key,
+)
+from api.utils.tile_math import metatile_origin
 
 logger = logging.getLogger(__name__)
 
-WMS_BASE_URL = "https://download.data.grandlyon.com/wms/grandlyon"
-WMS_LAYER = "grandlyon:ortho_latest"
-TILE_SIZE = 256
 # Cache tiles for 6 months
 CACHE_DURATION = 60 * 60 * 24 * 30 * 6
-WMS_TIMEOUT = 10
 
+# Concurrent cache misses on the same metatile wait for a single WMS call
+_metatile_fetches = SingleFlight()
+_wms_breaker = CircuitBreaker(
+    settings.ORTHOPHOTO_BREAKER_FAILURES, settings.ORTHOPHOTO_BREAKER_RESET_TIMEOUT
+)
+# Keep a reference to background refreshes so they are not garbage collected
+_background_refreshes = set()
 
-class OrthophotoTileView(APIView):
-    """Proxy WMS tiles from Grand Lyon as XYZ PNG tiles.
 
-    Converts XYZ tile coordinates to WMS GetMap requests against
-    the Grand Lyon orthophoto WMS service.
+def _failure_cache_key(z: int, x0: int, y0: int, size: int) -> str:
+    return f"orthophoto:failure:{z}:{x0}:{y0}:{size}"
+
+
+class OrthophotoTileView(View):
+    """Proxy WMS tiles from Grand Lyon as XYZ tiles.
+
+    Tiles pre-seeded in the orthophoto archive (see `seed_orthophoto`) are
+    served from it. Other tiles are proxied from the Grand Lyon orthophoto WMS
+    service: they are fetched by metatiles of `ORTHOPHOTO_METATILE_SIZE` ×
+    `ORTHOPHOTO_METATILE_SIZE` tiles in a single GetMap call, then sliced and
+    cached individually, since neighbouring tiles are requested together by
+    the map. Proxied tiles are re-encoded once, before caching, in WebP and in
+    JPEG (PNG for the tiles with transparent pixels, which JPEG cannot
+    represent) from a single WMS call, and served in WebP when the client
+    accepts it. The view is asynchronous so that waiting on the WMS does not
+    hold a worker under ASGI.
+
+    Cached tiles are fresh for `CACHE_DURATION` (blank tiles for
+    `ORTHOPHOTO_NEGATIVE_CACHE_DURATION`), then served stale for
+    `ORTHOPHOTO_STALE_DURATION` while being refreshed in the background. WMS
+    failures are cached for `ORTHOPHOTO_NEGATIVE_CACHE_DURATION` and repeated
+    failures open a circuit breaker that stops calling the WMS for a while.
 
     Example: GET /api/orthophoto/14/8345/5765.png
     """
 
-    @method_decorator(cache_page(CACHE_DURATION, cache="orthophoto"))
-    def get(self, request, z, x, y):
+    async def get(self, request, z, x, y):
         z, x, y = int(z), int(x), int(y)
 
-        bbox = tile_to_bbox(z, x, y)
-
-        params = {
-            "SERVICE": "WMS",
-            "VERSION": "1.3.0",
-            "REQUEST": "GetMap",
-            "LAYERS": WMS_LAYER,
-            "CRS": "EPSG:3857",
-            "BBOX": f"{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
-            "WIDTH": TILE_SIZE,
-            "HEIGHT": TILE_SIZE,
-            "FORMAT": "image/png",
-            "TRANSPARENT": "TRUE",
-        }
+        content = await sync_to_async(
+            get_orthophoto_archive().get, thread_sensitive=False
+        )(z, x, y)
+        if content is not None:
+            return self._tile_response(content, "image/png", CACHE_DURATION)
 
-        try:
-            wms_response = requests.get(
-                WMS_BASE_URL, params=params, timeout=WMS_TIMEOUT
+        image_format = negotiate_format(request.headers.get("Accept", ""))
+        x0, y0, size = metatile_origin(z, x, y, settings.ORTHOPHOTO_METATILE_SIZE)
+        entry = await caches["orthophoto"].aget(tile_key(z, x, y, image_format))
+        if entry is not None:
+            max_age = int(entry["fresh_until"] - time.time())
+            if max_age <= 0:
+                self._refresh_in_background(z, x0, y0, size)
+            return self._tile_response(
+                entry["content"],
+                entry["content_type"],
+                max(max_age, settings.ORTHOPHOTO_NEGATIVE_CACHE_DURATION),
             )
-            wms_response.raise_for_status()
-        except requests.RequestException:
-            logger.exception("WMS request failed for tile z=%s x=%s y=%s", z, x, y)
+
+        entries = await _metatile_fetches.do(
+            (z, x0, y0, size),
+            lambda: self._fetch_and_cache_metatile(z, x0, y0, size),
+        )
+        entry = entries[tile_key(z, x, y, image_format)]
+        return self._tile_response(
+            entry["content"],
+            entry["content_type"],
+            int(entry["fresh_until"] - time.time()),
+        )
+
+    @staticmethod
+    def _tile_response(content: bytes, content_type: str, max_age: int):
+        response = HttpResponse(content, content_type=content_type)
+        response["Cache-Control"] = f"public, max-age={max_age}"
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    @classmethod
+    def _refresh_in_background(cls, z: int, x0: int, y0: int, size: int):
+        async def refresh():
+            try:
+                await _metatile_fetches.do(
+                    (z, x0, y0, size),
+                    lambda: cls._fetch_and_cache_metatile(z, x0, y0, size),
+                )
+            except Http404:
+                # Keep serving the stale tiles, the failure is already logged
+                pass
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        _background_refreshes.add(task)
+        task.add_done_callback(_background_refreshes.discard)
+
+    @staticmethod
+    async def _fetch_and_cache_metatile(z: int, x0: int, y0: int, size: int) -> dict:
+        cache = caches["orthophoto"]
+        failure_key = _failure_cache_key(z, x0, y0, size)
+        if await cache.aget(failure_key) or not _wms_breaker.allow():
             raise Http404
 
-        content_type = wms_response.headers.get("Content-Type", "image/png")
-        if "xml" in content_type or "html" in content_type:
+        semaphore = get_upstream_semaphore(
+            "orthophoto", settings.ORTHOPHOTO_UPSTREAM_CONCURRENCY
+        )
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=WMS_TIMEOUT)
+        except asyncio.TimeoutError:
             logger.warning(
-                "WMS returned non-image response for tile z=%s x=%s y=%s: %s",
-                z,
-                x,
-                y,
-                wms_response.text[:200],
+                "WMS concurrency limit reached for metatile z=%s x=%s y=%s", z, x0, y0
+            )
+            raise Http404
+        try:
+            content = await fetch_metatile(z, x0, y0, size)
+            tiles = await sync_to_async(slice_metatile, thread_sensitive=False)(
+                content, z, x0, y0, size, PROXY_FORMATS
+            )
+        except WMSError:
+            _wms_breaker.record_failure()
+            await cache.aset(
+                failure_key, True, settings.ORTHOPHOTO_NEGATIVE_CACHE_DURATION
             )
             raise Http404
+        finally:
+            semaphore.release()
+        _wms_breaker.record_success()
 
-        response = HttpResponse(wms_response.content, content_type="image/png")
-        response["Cache-Control"] = f"public, max-age={CACHE_DURATION}"
-        return response
+        now = time.time()
+        entries = {}
+        for image_format, format_tiles in tiles.items():
+            for tile, sliced in format_tiles.items():
+                fresh_for = (
+                    settings.ORTHOPHOTO_NEGATIVE_CACHE_DURATION
+                    if sliced.blank
+                    else CACHE_DURATION
+                )
+                entries[tile_key(*tile, image_format)] = {
+                    "content": sliced.content,
+                    "content_type": sliced.content_type,
+                    "fresh_until": now + fresh_for,
+                }
+        # Blank tiles are kept as long as the others, so that they can be served
+        # stale while being refreshed
+        await cache.aset_many(
+            entries, CACHE_DURATION + settings.ORTHOPHOTO_STALE_DURATION
+        )
+        return entries
@@ -1,10 +1,10 @@
 from rest_framework import generics
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from rest_framework.response import Response
 from django.contrib.gis.serializers import geojson
 import json
 
+from api.utils.versioned_cache import versioned_cache_page
 from iarbre_data.models import Data
 
 
@@ -12,7 +12,7 @@ class QPVListView(generics.ListAPIView):
     def get_queryset(self):
         return Data.objects.filter(factor="QPV")
 
-    @method_decorator(cache_page(60 * 60 * 24))
+    @method_decorator(versioned_cache_page())
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         geojson_string = geojson.Serializer().serialize(
@@ -1,8 +1,23 @@
 import os
-from django.http import FileResponse, Http404
+from django.contrib.gis.geos import Polygon
+from django.http import Http404, HttpResponse
 from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api.constants import GeoLevel
+from api.utils.file_range import ranged_file_response
+from api.utils.raster_clip import (
+    ClipTooLarge,
+    clip_cache_path,
+    clip_raster,
+    write_clip,
+)
+from iarbre_data.models import City, Iris
+from iarbre_data.settings import SRID_DB, SRID_DOWNLOADED_DATA
+
 RASTER_MAP = {
     "plantability": ("rasters/plantability.tif", "plantability_2025.tif"),
     "vegestrate": (
@@ -12,31 +27,132 @@ RASTER_MAP = {
 }
 
 
+def raster_file_path(raster_type: str) -> str:
+    """Path of the raster of `raster_type`, raise a 404 if it does not exist."""
+    if raster_type not in RASTER_MAP:
+        raise Http404(
+            "Raster does not exist, only plantability or vegestrate are available."
+        )
+
+    relative_path, _ = RASTER_MAP[raster_type]
+    raster_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+
+    if not os.path.exists(raster_path):
+        raise Http404(
+            "Raster file not found. Please send an email to contact@telescoop.fr"
+        )
+    return raster_path
+
+
 class RasterDownloadView(APIView):
     """API endpoint to download the plantability and vegestrate raster files.
 
+    The rasters are Cloud-Optimized GeoTIFFs and HTTP range requests are
+    answered (`HEAD` included), so that GIS clients read windows and overviews
+    remotely instead of downloading the whole file.
+
     Example: GET /api/rasters/plantability/ or GET /api/rasters/vegestrate/
     """
 
     def get(self, request, raster_type):
-        if raster_type not in RASTER_MAP:
-            raise Http404(
-                "Raster does not exist, only plantability or vegestrate are available."
-            )
+        raster_path = raster_file_path(raster_type)
+        _, filename = RASTER_MAP[raster_type]
+
+        response = ranged_file_response(
+            request, raster_path, content_type="image/tiff", filename=filename
+        )
+        response["Cache-Control"] = "public, max-age=3600"
+        return response
+
+
+class RasterClipView(APIView):
+    """API endpoint to download the plantability or vegestrate raster clipped
+    to a city, an IRIS or a bounding box, as a GeoTIFF.
 
-        relative_path, filename = RASTER_MAP[raster_type]
-        raster_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    The pixels outside of the city or IRIS are set to nodata. The bounding box
+    is given in WGS84 as `min_lng,min_lat,max_lng,max_lat`. City and IRIS
+    clips are written once per data version under MEDIA_ROOT and served like
+    the whole rasters, bounding box clips are computed for each request.
 
-        if not os.path.exists(raster_path):
-            raise Http404(
-                "Raster file not found. Please send an email to contact@telescoop.fr"
+    Example:
+        GET /api/rasters/plantability/clip/?city_code=69123
+        GET /api/rasters/vegestrate/clip/?iris_code=691230101
+        GET /api/rasters/plantability/clip/?bbox=4.83,45.75,4.85,45.77
+    """
+
+    def get(self, request, raster_type):
+        raster_path = raster_file_path(raster_type)
+
+        city_code = request.query_params.get("city_code")
+        iris_code = request.query_params.get("iris_code")
+        bbox = request.query_params.get("bbox")
+        if iris_code:
+            return self._unit_clip(
+                request, raster_type, raster_path, Iris, GeoLevel.IRIS.value, iris_code
+            )
+        if city_code:
+            return self._unit_clip(
+                request, raster_type, raster_path, City, GeoLevel.CITY.value, city_code
+            )
+        if not bbox:
+            return Response(
+                {"error": "One of city_code, iris_code or bbox is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            geometry = Polygon.from_bbox([float(v) for v in bbox.split(",")])
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "bbox must be min_lng,min_lat,max_lng,max_lat"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        geometry.srid = SRID_DOWNLOADED_DATA
+        geometry.transform(SRID_DB)
+        # The whole rectangle of the bounding box, not the reprojected box
+        geometry = geometry.envelope
+
+        try:
+            content = clip_raster(raster_path, geometry)
+        except ClipTooLarge:
+            return self._too_large(raster_type)
+        if content is None:
+            raise Http404("The area is outside of the raster.")
+
+        response = HttpResponse(content, content_type="image/tiff")
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="{raster_type}_bbox.tif"'
+        # Arbitrary areas are not worth keeping
+        response["Cache-Control"] = "no-store"
+        return response
 
-        response = FileResponse(
-            open(raster_path, "rb"),
+    def _unit_clip(self, request, raster_type, raster_path, model, geolevel, code):
+        geometry = get_object_or_404(model, code=code).geometry
+        clip_path = clip_cache_path(raster_type, f"{geolevel}-{code}")
+        if not os.path.exists(clip_path):
+            try:
+                inside = write_clip(raster_path, geometry, clip_path)
+            except ClipTooLarge:
+                return self._too_large(raster_type)
+            if not inside:
+                raise Http404("The area is outside of the raster.")
+
+        response = ranged_file_response(
+            request,
+            clip_path,
             content_type="image/tiff",
-            as_attachment=True,
-            filename=filename,
+            filename=f"{raster_type}_{code}.tif",
         )
         response["Cache-Control"] = "public, max-age=3600"
         return response
+
+    @staticmethod
+    def _too_large(raster_type):
+        return Response(
+            {
+                "error": "The area is too large, download the whole raster "
+                f"from /api/rasters/{raster_type}/"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
@@ -1,16 +1,23 @@
+import json
 import logging
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.http import HttpResponse, Http404
-from django.contrib.gis.geos import GEOSGeometry
+from django.utils.cache import patch_response_headers
+from django.views import View
+from django.http import HttpResponse, Http404, StreamingHttpResponse
+from djangorestframework_camel_case.util import camelize
+from django.contrib.gis.geos import GEOSGeometry, Polygon
 from django.db.models import Avg, Count, Q
 from django.contrib.postgres.aggregates import ArrayAgg
 
 from iarbre_data.models import (
+    City,
+    Iris,
     MVTTile,
     Tile,
     Lcz,
@@ -36,9 +43,30 @@ from api.constants import (
     DataType,
     FrontendDataType,
 )
+from api.utils.batch_scores import (
+    aggregate_tiles_by_polygon,
+    vulnerability_averages_by_polygon,
+)
+from api.utils.grid_scores import (
+    TilesAggregate,
+    aggregate_tiles_in_polygon,
+    grid_available,
+)
+from api.utils.raster_scores import aggregate_tiles_from_raster, rasters_available
+from api.utils.scores_cache import get_or_compute, scores_cache_key
+from api.utils.tile_analytics import tile_hit_recorder
+from api.utils.versioned_cache import versioned_cache_page
 
 logger = logging.getLogger(__name__)
 
+TILE_CACHE_DURATION = 60 * 60 * 24
+
+
+def _read_file(field_file) -> bytes:
+    with field_file.open("rb") as f:
+        return f.read()
+
+
 # Mapping of datatypes to their models
 DATATYPE_MODEL_MAP = {
     DataType.LCZ.value: Lcz,
@@ -56,25 +84,37 @@ FRONTEND_DATATYPE_MODEL_MAP = {
 }
 
 
-class TileView(generics.RetrieveAPIView):
-    def get_object(self):
-        return MVTTile.objects.get(
-            geolevel=self.kwargs.get("geolevel"),
-            datatype=self.kwargs.get("datatype"),
-            zoom_level=self.kwargs.get("zoom"),
-            tile_x=self.kwargs.get("x"),
-            tile_y=self.kwargs.get("y"),
-        )
+class TileView(View):
+    """Serve a pre-generated MVT tile.
 
-    @method_decorator(cache_page(60 * 60 * 24))
-    def get(self, request, *args, **kwargs):
-        try:
-            return HttpResponse(
-                self.get_object().mvt_file, content_type="application/x-protobuf"
-            )
-        except MVTTile.DoesNotExist:
-            logger.warning("MVTTile not found: %s", self.kwargs)
-            raise Http404
+    The view is asynchronous so that, under ASGI, waiting on the database or on the
+    disk does not hold a worker.
+    """
+
+    async def get(self, request, geolevel, datatype, zoom, x, y):
+        if tile_hit_recorder.record(geolevel, datatype, zoom, x, y):
+            await sync_to_async(tile_hit_recorder.flush)()
+
+        cache_key = f"mvt:{geolevel}:{datatype}:{zoom}:{x}:{y}"
+        mvt_data = await cache.aget(cache_key)
+        if mvt_data is None:
+            try:
+                mvt_tile = await MVTTile.objects.aget(
+                    geolevel=geolevel,
+                    datatype=datatype,
+                    zoom_level=zoom,
+                    tile_x=x,
+                    tile_y=y,
+                )
+            except (MVTTile.DoesNotExist, ValueError):
+                logger.warning("MVTTile not found: %s", self.kwargs)
+                raise Http404
+            mvt_data = await sync_to_async(_read_file)(mvt_tile.mvt_file)
+            await cache.aset(cache_key, mvt_data, TILE_CACHE_DURATION)
+
+        response = HttpResponse(mvt_data, content_type="application/x-protobuf")
+        patch_response_headers(response, TILE_CACHE_DURATION)
+        return response
 
 
 class TileDetailsView(generics.RetrieveAPIView):
@@ -95,7 +135,7 @@ class TileDetailsView(generics.RetrieveAPIView):
             raise Http404
         return DATATYPE_MODEL_MAP[instance]
 
-    @method_decorator(cache_page(60 * 60 * 24))
+    @method_decorator(versioned_cache_page(datatype_kwarg="datatype"))
     def get(self, request, datatype, id, *args, **kwargs):
         try:
             instance = get_object_or_404(DATATYPE_MODEL_MAP[datatype], id=id)
@@ -107,8 +147,23 @@ class TileDetailsView(generics.RetrieveAPIView):
 
 
 class ScoresInPolygonView(APIView):
+    """Scores of the tiles intersecting a polygon.
+
+    Tile-based scores are computed exactly from the pre-aggregated grid when it
+    is built (see `api.utils.grid_scores`), and from the `Tile` table otherwise.
+    When the plantability raster is available, polygons larger than
+    `MAX_POLYGON_AREA_M2` are accepted and scored from the raster (see
+    `api.utils.raster_scores`).
+
+    Results are cached per polygon and data version (see
+    `api.utils.scores_cache`). The outlines of IRIS and cities are recognized
+    and answered from their stored `plantability_counts`.
+    """
+
     MAX_POLYGON_AREA_M2 = 10_000_000
+    MAX_RASTER_POLYGON_AREA_M2 = 200_000_000
     MAX_VERTICES = 10
+    BOUNDARY_MATCH_TOLERANCE_M = 1
 
     def _validate_datatype(self, datatype):
         if datatype not in FRONTEND_DATATYPE_MODEL_MAP:
@@ -143,28 +198,6 @@ class ScoresInPolygonView(APIView):
             if polygon.srid is None or polygon.srid == 0:
                 polygon.srid = SRID_DOWNLOADED_DATA
             polygon.transform(SRID_DB)
-
-            if polygon.area > self.MAX_POLYGON_AREA_M2:
-                return None, Response(
-                    {
-                        "error": f"Polygon area exceeds maximum allowed size ({self.MAX_POLYGON_AREA_M2 / 1_000_000} km²)"
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            num_coords = (
-                len(polygon.coords[0])
-                if polygon.geom_type == "Polygon"
-                else sum(len(ring) for ring in polygon.coords)
-            )
-            if num_coords > self.MAX_VERTICES:
-                return None, Response(
-                    {
-                        "error": f"Polygon complexity exceeds maximum allowed vertices ({self.MAX_VERTICES})"
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
             return polygon, None
 
         except Exception:
@@ -174,6 +207,75 @@ class ScoresInPolygonView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    def _validate_polygon_size(self, polygon, max_area):
+        if polygon.area > max_area:
+            return Response(
+                {
+                    "error": f"Polygon area exceeds maximum allowed size ({max_area / 1_000_000} km²)"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        num_coords = (
+            len(polygon.coords[0])
+            if polygon.geom_type == "Polygon"
+            else sum(len(ring) for ring in polygon.coords)
+        )
+        if num_coords > self.MAX_VERTICES:
+            return Response(
+                {
+                    "error": f"Polygon complexity exceeds maximum allowed vertices ({self.MAX_VERTICES})"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return None
+
+    def _matching_boundary(self, polygon):
+        """IRIS or city whose outline is the polygon, up to coordinate rounding."""
+        tolerance = self.BOUNDARY_MATCH_TOLERANCE_M
+        xmin, ymin, xmax, ymax = polygon.extent
+        if min(xmax - xmin, ymax - ymin) <= 2 * tolerance:
+            return None
+        outer_box = Polygon.from_bbox(
+            (xmin - tolerance, ymin - tolerance, xmax + tolerance, ymax + tolerance)
+        )
+        inner_box = Polygon.from_bbox(
+            (xmin + tolerance, ymin + tolerance, xmax - tolerance, ymax - tolerance)
+        )
+        outer_box.srid = inner_box.srid = SRID_DB
+        for model in (Iris, City):
+            # Only the outlines with (almost) the same bounding box are compared
+            candidates = model.objects.filter(
+                geometry__contained=outer_box, geometry__bbcontains=inner_box
+            )
+            for candidate in candidates:
+                difference = polygon.sym_difference(candidate.geometry)
+                if difference.area <= polygon.length * tolerance:
+                    return candidate
+        return None
+
+    @staticmethod
+    def _boundary_aggregate(boundary):
+        """Aggregate of the tiles of an IRIS or a city, from `plantability_counts`."""
+        histogram = {
+            float(value): count
+            for value, count in boundary.plantability_counts.items()
+            if count
+        }
+        if isinstance(boundary, Iris):
+            iris_ids = {boundary.id}
+            city_ids = {boundary.city_id} if boundary.city_id else set()
+        else:
+            iris_ids = set(boundary.irises.values_list("id", flat=True))
+            city_ids = {boundary.id}
+        return TilesAggregate(
+            count=sum(histogram.values()),
+            histogram=histogram,
+            iris_ids=iris_ids,
+            city_ids=city_ids,
+        )
+
     def _get_scores_data(self, datatype, tiles):
         if datatype == FrontendDataType.PLANTABILITY.value:
             return (
@@ -217,6 +319,109 @@ class ScoresInPolygonView(APIView):
             [code for code in (result["city_codes"] or []) if code],
         )
 
+    def _get_aggregate_scores_data(self, datatype, aggregate):
+        """Same as `_get_scores_data`, from an aggregate of the tiles."""
+        non_null_count = sum(aggregate.histogram.values())
+        avg_score = (
+            sum(value * count for value, count in aggregate.histogram.items())
+            / non_null_count
+            if non_null_count
+            else None
+        )
+        plantability_data = self._format_plantability_scores(
+            avg_score,
+            aggregate.count,
+            {
+                str(int(value)): aggregate.histogram[value]
+                for value in sorted(aggregate.histogram)
+            },
+        )
+        if datatype == FrontendDataType.PLANTABILITY.value:
+            return plantability_data, PlantabilityScoresSerializer
+
+        avg_day, avg_night = self._get_vulnerability_averages(
+            aggregate.vulnerability_ids
+        )
+        return (
+            self._format_plantability_vulnerability_scores(
+                plantability_data, avg_day, avg_night
+            ),
+            PlantabilityVulnerabilityScoresSerializer,
+        )
+
+    def _get_vulnerability_averages(self, vulnerability_ids):
+        """Average day and night indices of the vulnerability zones."""
+        result = Vulnerability.objects.filter(id__in=vulnerability_ids).aggregate(
+            avg_day=Avg("vulnerability_index_day"),
+            avg_night=Avg("vulnerability_index_night"),
+        )
+        return result["avg_day"], result["avg_night"]
+
+    def _get_aggregate_iris_and_city_codes(self, aggregate):
+        """Same as `_get_iris_and_city_codes`, from an aggregate of the tiles."""
+        return (
+            list(
+                Iris.objects.filter(id__in=aggregate.iris_ids, code__isnull=False)
+                .exclude(code="")
+                .order_by("code")
+                .values_list("code", flat=True)
+                .distinct()
+            ),
+            list(
+                City.objects.filter(id__in=aggregate.city_ids, code__isnull=False)
+                .exclude(code="")
+                .order_by("code")
+                .values_list("code", flat=True)
+                .distinct()
+            ),
+        )
+
+    def _aggregate_tiles(self, polygon):
+        """Aggregate the tiles intersecting the polygon without a full scan.
+
+        Returns None when neither the grid nor the rasters can be used.
+        """
+        if polygon.area > self.MAX_POLYGON_AREA_M2:
+            # Only accepted when the rasters are available
+            return aggregate_tiles_from_raster(polygon)
+        if grid_available():
+            return aggregate_tiles_in_polygon(polygon)
+        return None
+
+    @staticmethod
+    def _format_plantability_scores(avg_score, count, distribution):
+        return {
+            "datatype": DataType.TILE.value,
+            "count": count,
+            "plantability_normalized_indice": (
+                round(avg_score, INDICE_ROUNDING_DECIMALS) if avg_score else 0
+            ),
+            "plantability_indice": (
+                round(avg_score, INDICE_ROUNDING_DECIMALS) if avg_score else 0
+            ),
+            "distribution": distribution,
+        }
+
+    @staticmethod
+    def _format_plantability_vulnerability_scores(
+        plantability_data, avg_day, avg_night
+    ):
+        return {
+            "datatype": FrontendDataType.PLANTABILITY_VULNERABILITY.value,
+            "count": plantability_data["count"],
+            "plantability_normalized_indice": plantability_data[
+                "plantability_normalized_indice"
+            ],
+            "distribution": plantability_data["distribution"],
+            "plantability_indice": plantability_data["plantability_indice"],
+            "vulnerability_indice_day": (
+                round(avg_day, INDICE_ROUNDING_DECIMALS) if avg_day else 0
+            ),
+            "vulnerability_indice_night": (
+                round(avg_night, INDICE_ROUNDING_DECIMALS) if avg_night else 0
+            ),
+        }
+
     def _calculate_plantability_scores(self, tiles):
         """Calculates average scores and distribution for plantability"""
 
@@ -238,19 +443,9 @@ class ScoresInPolygonView(APIView):
             if item["plantability_normalized_indice"] is not None
         }
 
-        avg_score = result["avg_score"]
-
-        return {
-            "datatype": DataType.TILE.value,
-            "count": result["total_count"],
-            "plantability_normalized_indice": (
-                round(avg_score, INDICE_ROUNDING_DECIMALS) if avg_score else 0
-            ),
-            "plantability_indice": (
-                round(avg_score, INDICE_ROUNDING_DECIMALS) if avg_score else 0
-            ),
-            "distribution": distribution,
-        }
+        return self._format_plantability_scores(
+            result["avg_score"], result["total_count"], distribution
+        )
 
     def _calculate_vulnerability_scores(self, vulnerabilities):
         """Calculates average scores and distribution for vulnerability"""
@@ -262,12 +457,15 @@ class ScoresInPolygonView(APIView):
             total_count=Count("id"),
         )
 
-        avg_day = result["avg_day"]
-        avg_night = result["avg_night"]
+        return self._format_vulnerability_scores(
+            result["total_count"], result["avg_day"], result["avg_night"]
+        )
 
+    @staticmethod
+    def _format_vulnerability_scores(count, avg_day, avg_night):
         return {
             "datatype": DataType.VULNERABILITY.value,
-            "count": result["total_count"],
+            "count": count,
             "vulnerability_indice_day": (
                 round(avg_day, INDICE_ROUNDING_DECIMALS) if avg_day else 0
             ),
@@ -290,24 +488,48 @@ class ScoresInPolygonView(APIView):
             )
         )
 
-        avg_day = vuln_result["avg_day"]
-        avg_night = vuln_result["avg_night"]
+        return self._format_plantability_vulnerability_scores(
+            plantability_data, vuln_result["avg_day"], vuln_result["avg_night"]
+        )
 
-        return {
-            "datatype": FrontendDataType.PLANTABILITY_VULNERABILITY.value,
-            "count": plantability_data["count"],
-            "plantability_normalized_indice": plantability_data[
-                "plantability_normalized_indice"
-            ],
-            "distribution": plantability_data["distribution"],
-            "plantability_indice": plantability_data["plantability_indice"],
-            "vulnerability_indice_day": (
-                round(avg_day, INDICE_ROUNDING_DECIMALS) if avg_day else 0
-            ),
-            "vulnerability_indice_night": (
-                round(avg_night, INDICE_ROUNDING_DECIMALS) if avg_night else 0
-            ),
-        }
+    def _compute_scores(self, datatype, polygon, boundary):
+        """Scores of the polygon, as a `(data, status)` pair that can be cached."""
+        model = FRONTEND_DATATYPE_MODEL_MAP[datatype]
+        if boundary is not None:
+            aggregate = self._boundary_aggregate(boundary)
+        elif model is Tile:
+            aggregate = self._aggregate_tiles(polygon)
+        else:
+            aggregate = None
+
+        if aggregate is not None:
+            if not aggregate.count:
+                return {"error": "No tiles found in polygon"}, status.HTTP_404_NOT_FOUND
+            iris_codes, city_codes = self._get_aggregate_iris_and_city_codes(aggregate)
+            data, serializer_class = self._get_aggregate_scores_data(
+                datatype, aggregate
+            )
+        else:
+            tiles = model.objects.filter(geometry__intersects=polygon)
+
+            if not tiles.exists():
+                return {"error": "No tiles found in polygon"}, status.HTTP_404_NOT_FOUND
+
+            iris_codes, city_codes = self._get_iris_and_city_codes(tiles)
+            data, serializer_class = self._get_scores_data(datatype, tiles)
+
+        return (
+            self._serialize_scores(data, serializer_class, iris_codes, city_codes),
+            status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def _serialize_scores(data, serializer_class, iris_codes, city_codes):
+        serializer = serializer_class(
+            data={**data, "iris_codes": iris_codes, "city_codes": city_codes}
+        )
+        serializer.is_valid(raise_exception=True)
+        return dict(serializer.data)
 
     def post(self, request, datatype, *args, **kwargs):
         error_response = self._validate_datatype(datatype)
@@ -323,20 +545,210 @@ class ScoresInPolygonView(APIView):
         if error_response:
             return error_response
 
-        model = FRONTEND_DATATYPE_MODEL_MAP[datatype]
-        tiles = model.objects.filter(geometry__intersects=polygon)
+        # The scores of IRIS and cities are stored, whatever their size
+        boundary = (
+            self._matching_boundary(polygon)
+            if datatype == FrontendDataType.PLANTABILITY.value
+            else None
+        )
+        if boundary is None:
+            model = FRONTEND_DATATYPE_MODEL_MAP[datatype]
+            error_response = self._validate_polygon_size(
+                polygon,
+                (
+                    self.MAX_RASTER_POLYGON_AREA_M2
+                    if model is Tile and rasters_available()
+                    else self.MAX_POLYGON_AREA_M2
+                ),
+            )
+            if error_response:
+                return error_response
 
-        if not tiles.exists():
-            return Response(
-                {"error": "No tiles found in polygon"},
-                status=status.HTTP_404_NOT_FOUND,
+        data, status_code = get_or_compute(
+            scores_cache_key(datatype, polygon),
+            lambda: self._compute_scores(datatype, polygon, boundary),
+        )
+        return Response(data, status=status_code)
+
+
+class ScoresInPolygonsBatchView(ScoresInPolygonView):
+    """Scores of each polygon of a GeoJSON FeatureCollection.
+
+    Polygons are scored by chunks of `CHUNK_SIZE`, with a single spatial join
+    grouped by polygon per chunk (see `api.utils.batch_scores`). Each feature gets
+    its own result, with its `id`, so that an invalid polygon does not fail the
+    whole batch. Batches larger than a chunk are streamed, chunk by chunk.
+    """
+
+    MAX_FEATURES = 1000
+    CHUNK_SIZE = 200
+    # Parcels are not drawn by hand: their cost is bounded by MAX_FEATURES and
+    # MAX_POLYGON_AREA_M2, this only rejects pathological outlines
+    MAX_VERTICES = 10_000
+
+    def _validate_features(self, collection):
+        features = (
+            collection.get("features")
+            if isinstance(collection, dict)
+            and collection.get("type") == "FeatureCollection"
+            else None
+        )
+        if not features or not isinstance(features, list):
+            return None, Response(
+                {"error": "A FeatureCollection with at least one feature is required"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        if len(features) > self.MAX_FEATURES:
+            return None, Response(
+                {
+                    "error": f"Too many features, the maximum is {self.MAX_FEATURES} per request"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return features, None
+
+    def _get_feature_polygon(self, feature):
+        geometry = feature.get("geometry") if isinstance(feature, dict) else None
+        if not isinstance(geometry, dict) or geometry.get("type") not in (
+            "Polygon",
+            "MultiPolygon",
+        ):
+            return None, Response(
+                {"error": "Feature geometry must be a Polygon or a MultiPolygon"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        polygon, error_response = self._process_polygon_geometry(json.dumps(geometry))
+        if error_response:
+            return None, error_response
+        error_response = self._validate_polygon_size(polygon, self.MAX_POLYGON_AREA_M2)
+        if error_response:
+            return None, error_response
+        return polygon, None
+
+    def _load_lookups(self, aggregates):
+        """Load the codes and indices needed by the chunk, in one query each."""
+        iris_ids = set().union(*(aggregate.iris_ids for aggregate in aggregates))
+        city_ids = set().union(*(aggregate.city_ids for aggregate in aggregates))
+        vulnerability_ids = set().union(
+            *(aggregate.vulnerability_ids for aggregate in aggregates)
+        )
+        self._iris_codes = dict(
+            Iris.objects.filter(id__in=iris_ids).values_list("id", "code")
+        )
+        self._city_codes = dict(
+            City.objects.filter(id__in=city_ids).values_list("id", "code")
+        )
+        self._vulnerability_indices = {
+            id_: (day, night)
+            for id_, day, night in Vulnerability.objects.filter(
+                id__in=vulnerability_ids
+            ).values_list("id", "vulnerability_index_day", "vulnerability_index_night")
+        }
 
-        iris_codes, city_codes = self._get_iris_and_city_codes(tiles)
-        data, serializer_class = self._get_scores_data(datatype, tiles)
+    def _get_aggregate_iris_and_city_codes(self, aggregate):
+        return (
+            sorted({self._iris_codes[id_] for id_ in aggregate.iris_ids} - {None, ""}),
+            sorted({self._city_codes[id_] for id_ in aggregate.city_ids} - {None, ""}),
+        )
 
-        serializer = serializer_class(
-            data={**data, "iris_codes": iris_codes, "city_codes": city_codes}
+    def _get_vulnerability_averages(self, vulnerability_ids):
+        averages = []
+        for position in (0, 1):
+            values = [
+                self._vulnerability_indices[id_][position]
+                for id_ in vulnerability_ids
+                if id_ in self._vulnerability_indices
+                and self._vulnerability_indices[id_][position] is not None
+            ]
+            averages.append(sum(values) / len(values) if values else None)
+        return tuple(averages)
+
+    def _score_chunk(self, datatype, features):
+        results = [
+            {"id": feature.get("id") if isinstance(feature, dict) else None}
+            for feature in features
+        ]
+        scored = []
+        for result, feature in zip(results, features):
+            polygon, error_response = self._get_feature_polygon(feature)
+            if error_response:
+                result.update(
+                    status=error_response.status_code,
+                    error=error_response.data["error"],
+                )
+            else:
+                scored.append((result, polygon))
+        if not scored:
+            return results
+
+        polygons = [polygon for _, polygon in scored]
+        if FRONTEND_DATATYPE_MODEL_MAP[datatype] is Tile:
+            aggregates = aggregate_tiles_by_polygon(polygons)
+            self._load_lookups(aggregates)
+            for (result, _), aggregate in zip(scored, aggregates):
+                if not aggregate.count:
+                    result.update(
+                        status=status.HTTP_404_NOT_FOUND,
+                        error="No tiles found in polygon",
+                    )
+                    continue
+                iris_codes, city_codes = self._get_aggregate_iris_and_city_codes(
+                    aggregate
+                )
+                data, serializer_class = self._get_aggregate_scores_data(
+                    datatype, aggregate
+                )
+                result.update(
+                    status=status.HTTP_200_OK,
+                    scores=self._serialize_scores(
+                        data, serializer_class, iris_codes, city_codes
+                    ),
+                )
+        else:
+            averages = vulnerability_averages_by_polygon(polygons)
+            for (result, _), average in zip(scored, averages):
+                if not average["count"]:
+                    result.update(
+                        status=status.HTTP_404_NOT_FOUND,
+                        error="No tiles found in polygon",
+                    )
+                    continue
+                result.update(
+                    status=status.HTTP_200_OK,
+                    scores=self._serialize_scores(
+                        self._format_vulnerability_scores(**average),
+                        VulnerabilityScoresSerializer,
+                        [],
+                        [],
+                    ),
+                )
+        return results
+
+    def _iter_results(self, datatype, features):
+        for start in range(0, len(features), self.CHUNK_SIZE):
+            yield from self._score_chunk(
+                datatype, features[start : start + self.CHUNK_SIZE]
+            )
+
+    @staticmethod
+    def _stream_results(results):
+        yield '{"results": ['
+        for index, result in enumerate(results):
+            yield ("," if index else "") + json.dumps(camelize(result))
+        yield "]}"
+
+    def post(self, request, datatype, *args, **kwargs):
+        error_response = self._validate_datatype(datatype)
+        if error_response:
+            return error_response
+
+        features, error_response = self._validate_features(request.data)
+        if error_response:
+            return error_response
+
+        results = self._iter_results(datatype, features)
+        if len(features) <= self.CHUNK_SIZE:
+            return Response({"results": list(results)})
+        return StreamingHttpResponse(
+            self._stream_results(results), content_type="application/json"
         )
-        serializer.is_valid(raise_exception=True)
-        return Response(serializer.data)
@@ -1,11 +1,23 @@
+import json
 import logging
 import time
 
+from django.conf import settings
 from django.contrib.gis.geos import Polygon
+from django.db import DatabaseError
 from gisserver.crs import CRS84, WEB_MERCATOR, CRS
+from gisserver.exceptions import InvalidParameterValue
 from gisserver.features import FeatureType, ServiceDescription
 from gisserver.geometries import WGS84BoundingBox
+from gisserver.operations import wfs20
+from gisserver.output import (
+    CSVRenderer,
+    DBCSVRenderer,
+    DBGeoJsonRenderer,
+    GeoJsonRenderer,
+)
 from gisserver.views import WFSView
+from api.utils.wfs_output import RowCSVRenderer, RowGeoJsonRenderer
 from iarbre_data.settings import SRID_DB
 from iarbre_data.models import Tile, Vegestrate
 
@@ -47,19 +59,28 @@ def _parse_bbox(bbox_str):
     return poly, srid
 
 
-def _count_features(typename, bbox_poly):
-    """Return approximate feature count for the given BBOX using a fast bbox-overlap index scan."""
-    if bbox_poly is None:
-        return None
-    name = typename.lower()
+def _planner_rows(queryset):
+    """Number of rows of the queryset estimated by the PostgreSQL planner."""
     try:
-        if "vegestrate" in name:
-            return Vegestrate.objects.filter(geometry__bboverlaps=bbox_poly).count()
-        return Tile.objects.filter(geometry__bboverlaps=bbox_poly).count()
-    except Exception:
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (DatabaseError, ValueError, LookupError, TypeError):
         return None
 
 
+def _estimate_features(typename, bbox_poly):
+    """Return the estimated feature count for the given BBOX, without scanning it.
+
+    The estimate comes from the planner statistics, which only costs an
+    EXPLAIN. Exact counts are requested with `RESULTTYPE=hits`.
+    """
+    model = Vegestrate if "vegestrate" in typename.lower() else Tile
+    queryset = model.objects.all()
+    if bbox_poly is not None:
+        queryset = queryset.filter(geometry__bboverlaps=bbox_poly)
+    return _planner_rows(queryset)
+
+
 class TileFeatureType(FeatureType):
     def get_bounding_box(self):
         return WGS84BoundingBox(4.6, 45.5, 5.2, 46.0)
@@ -76,6 +97,46 @@ _tile_qs = Tile.objects.only(
 _vegestrate_qs = Vegestrate.objects.only("geometry", "strate", "surface")
 
 
+class RowsGetFeature(wfs20.GetFeature):
+    """GetFeature rendering GeoJSON and CSV from rows, see `api.utils.wfs_output`.
+
+    Requests estimated by the view to return more than
+    `WFS_MAX_ESTIMATED_FEATURES` features are rejected. The estimate is capped
+    by the page size, which depends on COUNT and on the output format.
+    """
+
+    ROW_RENDERERS = {
+        GeoJsonRenderer: RowGeoJsonRenderer,
+        DBGeoJsonRenderer: RowGeoJsonRenderer,
+        CSVRenderer: RowCSVRenderer,
+        DBCSVRenderer: RowCSVRenderer,
+    }
+
+    def get_output_formats(self):
+        output_formats = super().get_output_formats()
+        for output_format in output_formats:
+            output_format.renderer_class = self.ROW_RENDERERS.get(
+                output_format.renderer_class, output_format.renderer_class
+            )
+        return output_formats
+
+    def validate_request(self, ows_request):
+        super().validate_request(ows_request)
+        estimated_count = self.view.estimated_count
+        max_features = settings.WFS_MAX_ESTIMATED_FEATURES
+        if estimated_count is None or not max_features:
+            return
+        _, page_size = self.get_pagination()
+        if min(estimated_count, page_size) > max_features:
+            logger.info("REJECTED typename=%s", self.view.typename)
+            raise InvalidParameterValue(
+                f"The request would return about {estimated_count} features, "
+                f"more than the {max_features} allowed: reduce the BBOX or page "
+                "the results with COUNT and STARTINDEX.",
+                locator="bbox",
+            )
+
+
 class IArbreWFSView(WFSView):
     xml_namespace = "http://carte.iarbre.fr/api/wfs"
     xml_namespace_aliases = {"iarbre": "http://carte.iarbre.fr/api/wfs"}
@@ -89,16 +150,29 @@ class IArbreWFSView(WFSView):
         contact_person="contact@telescoop.fr",
     )
 
+    # Set by `dispatch` for the GetFeature operation
+    typename = None
+    estimated_count = None
+
+    accept_operations = {
+        "WFS": {
+            **WFSView.accept_operations["WFS"],
+            "GetFeature": RowsGetFeature,
+        }
+    }
+
     def dispatch(self, request, *args, **kwargs):
         params = {k.upper(): v for k, v in request.GET.items()}
         if params.get("REQUEST", "").upper() != "GETFEATURE":
             return super().dispatch(request, *args, **kwargs)
 
         typename = params.get("TYPENAMES") or params.get("TYPENAME", "unknown")
+        self.typename = typename
         count_param = params.get("COUNT", "default")
         start_index = params.get("STARTINDEX", "0")
         output_format = params.get("OUTPUTFORMAT", "gml")
         bbox_str = params.get("BBOX", "")
+        result_type = params.get("RESULTTYPE", "results").lower()
 
         bbox_poly, srid = _parse_bbox(bbox_str)
         bbox_area = None
@@ -106,18 +180,22 @@ class IArbreWFSView(WFSView):
             ext = bbox_poly.extent
             bbox_area = abs((ext[2] - ext[0]) * (ext[3] - ext[1]))
 
-        feature_count = _count_features(typename, bbox_poly)
+        estimated_count = None
+        # Identifiers and filters select few features, out of the BBOX estimate
+        if result_type != "hits" and not {"RESOURCEID", "FILTER"} & params.keys():
+            estimated_count = _estimate_features(typename, bbox_poly)
+        self.estimated_count = estimated_count
 
         logger.info(
             "START typename=%s count_param=%s startindex=%s format=%s "
-            "bbox_srid=%s bbox_area=%.2f feature_count=%s",
+            "bbox_srid=%s bbox_area=%.2f estimated_count=%s",
             typename,
             count_param,
             start_index,
             output_format,
             srid,
             bbox_area or 0.0,
-            feature_count,
+            estimated_count,
         )
 
         t_start = time.monotonic()
@@ -0,0 +1,79 @@
+"""Compute the overlays of the cities and IRIS with the Vulnerability, Lcz and
+Vegestrate features.
+
+Each overlay stores the area of the intersection of a unit with a feature, so
+that the dashboard computes area-weighted metrics with indexed aggregates
+instead of intersecting the unit boundary with the layers on every request.
+The intersections are computed by PostGIS, one set-based query per unit level
+and source layer.
+"""
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from api.constants import DASHBOARD_DATATYPES, GeoLevel
+from iarbre_data.models import (
+    AdminUnitOverlay,
+    City,
+    Iris,
+    Lcz,
+    Vegestrate,
+    Vulnerability,
+)
+from iarbre_data.utils.data_version import bump_data_version
+
+UNITS = {GeoLevel.CITY.value: City, GeoLevel.IRIS.value: Iris}
+# Overlay foreign key -> source layer
+SOURCES = {"vulnerability": Vulnerability, "lcz": Lcz, "vegestrate": Vegestrate}
+
+
+def insert_overlays(geolevel: str, source: str) -> int:
+    """Insert the overlays of the units of `geolevel` with the `source` features.
+
+    Returns:
+        int: Number of overlays inserted.
+    """
+    query = f"""
+        INSERT INTO {AdminUnitOverlay._meta.db_table}
+            (geolevel, unit_id, {source}_id, intersection_area, weight)
+        SELECT %s, unit_id, feature_id, area, area / feature_area
+        FROM (
+            SELECT
+                unit.id AS unit_id,
+                feature.id AS feature_id,
+                ST_Area(ST_Intersection(unit.geometry, feature.geometry)) AS area,
+                ST_Area(feature.geometry) AS feature_area
+            FROM {UNITS[geolevel]._meta.db_table} AS unit
+            JOIN (
+                SELECT
+                    id,
+                    CASE WHEN ST_IsValid(geometry) THEN geometry
+                    ELSE ST_MakeValid(geometry) END AS geometry
+                FROM {SOURCES[source]._meta.db_table}
+            ) AS feature ON ST_Intersects(unit.geometry, feature.geometry)
+        ) AS overlay
+        WHERE area > 0
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query, [geolevel])
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = "Compute the overlays of the cities and IRIS with the source layers"
+
+    def handle(self, *args, **options):
+        # Replace all the overlays at once, the view never sees a partial set
+        with transaction.atomic():
+            AdminUnitOverlay.objects.all().delete()
+            for geolevel in UNITS:
+                for source in SOURCES:
+                    count = insert_overlays(geolevel, source)
+                    self.stdout.write(f"{count} {geolevel}/{source} overlays")
+        bump_data_version(*DASHBOARD_DATATYPES)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully computed {AdminUnitOverlay.objects.count()} overlays!"
+            )
+        )
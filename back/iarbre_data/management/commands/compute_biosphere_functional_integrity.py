@@ -1,38 +1,128 @@
+import json
 import math
 
-from django.contrib.gis.db.models.functions import Area, Intersection
+import numpy as np
+import rasterio
+from django.contrib.gis.db.models import Extent
 from django.core.management import BaseCommand
-from django.db.models import Sum
+from rasterio import features
+from rasterio.transform import from_origin
+from scipy import signal
 from tqdm import tqdm
 
+from api.constants import DataType
 from iarbre_data.models import (
     BiosphereFunctionalIntegrity,
     BiosphereFunctionalIntegrityLandCover,
 )
-from iarbre_data.settings import SRID_DB
+from iarbre_data.utils.data_version import bump_data_version
 from iarbre_data.utils.database import log_progress
 
 RADIUS_M = 500
-CIRCLE_AREA = math.pi * RADIUS_M**2
+# Grid of the reference method, see docs/methodology/biosphere_functional_integrity.md
+RESOLUTION_M = 4
 BATCH_SIZE = 1000
 
 
-def compute_indice() -> None:
+def disk_kernel(radius: float) -> np.ndarray:
+    """Kernel of the pixels whose center is within `radius` pixels of the center."""
+    size = int(radius)
+    y, x = np.ogrid[-size : size + 1, -size : size + 1]
+    return (x**2 + y**2 <= radius**2).astype(np.float32)
+
+
+def rasterize_binary_land_cover(
+    resolution: float,
+) -> tuple[np.ndarray | None, rasterio.Affine | None]:
+    """
+    Rasterize the binary land cover over the extent of all the land cover.
+
+    A pixel is 1 when its center is in a land cover polygon with `binary=True`.
+
+    Args:
+        resolution (float): Size of the pixels, in meters.
+
+    Returns:
+        tuple[np.ndarray | None, Affine]: The raster and its transform, None
+            without land cover.
+    """
+    extent = BiosphereFunctionalIntegrityLandCover.objects.aggregate(
+        extent=Extent("geometry")
+    )["extent"]
+    if extent is None:
+        return None, None
+    minx, miny, maxx, maxy = extent
+    width = max(1, math.ceil((maxx - minx) / resolution))
+    height = max(1, math.ceil((maxy - miny) / resolution))
+    transform = from_origin(minx, maxy, resolution, resolution)
+
+    geometries = BiosphereFunctionalIntegrityLandCover.objects.filter(
+        binary=True
+    ).values_list("geometry", flat=True)
+    raster = features.rasterize(
+        (
+            (json.loads(geometry.json), 1)
+            for geometry in geometries.iterator(chunk_size=BATCH_SIZE)
+        ),
+        out_shape=(height, width),
+        transform=transform,
+        fill=0,
+        dtype=np.uint8,
+    )
+    return raster, transform
+
+
+def focal_fraction(raster: np.ndarray, radius: float) -> np.ndarray:
+    """
+    Fraction of the pixels set to 1 in the disk around each pixel.
+
+    The disk sums are computed for all the pixels at once, by an FFT
+    convolution with overlap-add. Pixels outside of the raster count as 0.
+
+    Args:
+        raster (np.ndarray): Binary raster.
+        radius (float): Radius of the disk, in pixels.
+
+    Returns:
+        np.ndarray: Fraction between 0 and 1, for each pixel.
+    """
+    kernel = disk_kernel(radius)
+    sums = signal.oaconvolve(raster.astype(np.float32), kernel, mode="same")
+    # FFT rounding errors around 0 and 1
+    return np.clip(sums / kernel.sum(), 0, 1)
+
+
+def compute_indice(resolution: float = RESOLUTION_M) -> None:
+    """
+    Compute the indice of each land cover polygon.
+
+    The indice is the percentage of binary land cover within `RADIUS_M` of the
+    polygon centroid, read from the focal fraction raster.
+
+    Args:
+        resolution (float): Size of the pixels of the focal raster, in meters.
+    """
+    log_progress("Rasterize binary land cover")
+    raster, transform = rasterize_binary_land_cover(resolution)
+    if raster is None:
+        return
+    log_progress("Compute focal fraction")
+    fraction = focal_fraction(raster, RADIUS_M / resolution)
+    del raster
+    height, width = fraction.shape
+    inverse = ~transform
+
+    log_progress("Assign indices")
     qs = BiosphereFunctionalIntegrityLandCover.objects.only("id", "geometry")
     to_create = []
 
     for lc in tqdm(qs.iterator(chunk_size=BATCH_SIZE), total=qs.count()):
-        buffer = lc.geometry.centroid.buffer(RADIUS_M)
-        buffer.srid = SRID_DB
-
-        binary_area = (
-            BiosphereFunctionalIntegrityLandCover.objects.filter(
-                binary=True, geometry__intersects=buffer
-            ).aggregate(total=Sum(Area(Intersection("geometry", buffer))))["total"]
-            or 0.0
-        )
+        centroid = lc.geometry.centroid
+        col, row = inverse * (centroid.x, centroid.y)
+        # Centroids on the right or bottom edge of the extent
+        value = fraction[min(int(row), height - 1), min(int(col), width - 1)]
 
-        indice = min(100, round(float(binary_area) / CIRCLE_AREA * 100))
+        indice = min(100, round(float(value) * 100))
         to_create.append(
             BiosphereFunctionalIntegrity(geometry=lc.geometry, indice=indice)
         )
@@ -48,8 +138,17 @@ def compute_indice() -> None:
 class Command(BaseCommand):
     help = "Compute BiosphereFunctionalIntegrity indice from LandCover data."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resolution",
+            type=float,
+            default=RESOLUTION_M,
+            help="Pixel size in meters of the focal raster",
+        )
+
     def handle(self, *args, **options):
         log_progress("Delete existing data")
         BiosphereFunctionalIntegrity.objects.all().delete()
         log_progress("Compute indice")
-        compute_indice()
+        compute_indice(options["resolution"])
+        bump_data_version(DataType.BIOSPHERE_FUNCTIONAL_INTEGRITY.value)
@@ -0,0 +1,94 @@
+"""Rasterize the biosphere land cover, with the class code of each pixel.
+
+The raster is read by `api/biosphere/land-cover-at-point/` to compute the land
+cover around a point from a small window, instead of intersecting the land
+cover polygons on every request.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import rasterio
+from django.contrib.gis.db.models import Extent
+from django.core.management import BaseCommand
+from rasterio import features
+from rasterio.transform import from_origin
+
+from api.constants import DataType
+from api.utils.land_cover_composition import LAND_COVER_RASTER, NO_LAND_COVER
+from api.utils.raster_scores import raster_path
+from iarbre_data.models import BiosphereFunctionalIntegrityLandCover
+from iarbre_data.settings import SRID_DB
+from iarbre_data.utils.biosphere_land_cover import LAND_COVER_TO_CLASS
+from iarbre_data.utils.data_version import bump_data_version
+from iarbre_data.utils.database import log_progress
+
+# Resolution of the COSIA + CarHab land cover
+RESOLUTION_M = 4
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Rasterize the biosphere land cover"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resolution",
+            type=float,
+            default=RESOLUTION_M,
+            help="Pixel size in meters",
+        )
+
+    def handle(self, *args, **options):
+        resolution = options["resolution"]
+        qs = BiosphereFunctionalIntegrityLandCover.objects.all()
+        extent = qs.aggregate(extent=Extent("geometry"))["extent"]
+        if extent is None:
+            self.stderr.write(self.style.ERROR("No land cover to rasterize"))
+            return
+        minx, miny, maxx, maxy = extent
+        width = max(1, math.ceil((maxx - minx) / resolution))
+        height = max(1, math.ceil((maxy - miny) / resolution))
+        transform = from_origin(minx, maxy, resolution, resolution)
+
+        log_progress("Rasterize land cover")
+        raster = features.rasterize(
+            (
+                (json.loads(geometry.json), LAND_COVER_TO_CLASS[land_cover])
+                for geometry, land_cover in qs.values_list(
+                    "geometry", "land_cover"
+                ).iterator(chunk_size=BATCH_SIZE)
+            ),
+            out_shape=(height, width),
+            transform=transform,
+            fill=NO_LAND_COVER,
+            dtype=np.uint8,
+        )
+
+        output_file = raster_path(LAND_COVER_RASTER)
+        tmp_file = output_file.replace(".tif", ".tmp.tif")
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with rasterio.open(
+            tmp_file,
+            "w",
+            driver="GTiff",
+            height=height,
+            width=width,
+            count=1,
+            dtype=np.uint8,
+            crs=f"EPSG:{SRID_DB}",
+            transform=transform,
+            nodata=NO_LAND_COVER,
+            tiled=True,
+            blockxsize=256,
+            blockysize=256,
+            compress="deflate",
+        ) as dst:
+            dst.write(raster, 1)
+        # Requests in progress keep reading the previous raster
+        os.replace(tmp_file, output_file)
+        bump_data_version(DataType.BIOSPHERE_FUNCTIONAL_INTEGRITY.value)
+
+        self.stdout.write(self.style.SUCCESS(f"Land cover rasterized to {output_file}"))
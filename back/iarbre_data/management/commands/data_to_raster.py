@@ -1,19 +1,30 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from django.contrib.gis.db.models import Union
 import rasterio
 from django.contrib.gis.geos import GEOSGeometry
 from django.core.management import BaseCommand
+from django.db import connection
 from rasterio.transform import from_origin
 from rasterio.features import rasterize
 import numpy as np
 import os
+import time
 
 from scipy import ndimage
 
 from iarbre_data.data_config import FACTORS
 from iarbre_data.models import City, Data
-from iarbre_data.settings import BASE_DIR
+from iarbre_data.settings import (
+    BASE_DIR,
+    DATA_TO_RASTER_MEMORY_BUDGET_MB,
+    DATA_TO_RASTER_WORKERS,
+)
 from iarbre_data.utils.database import load_geodataframe_from_db, log_progress
 
+# Peak memory of a factor, per pixel of the 1 m raster: the raster and its
+# convolution (uint8), plus a margin for the geometries and rasterio buffers
+BYTES_PER_PIXEL = 3
+
 
 def rasterize_data_across_all_cities(
     factor_name: str,
@@ -89,6 +100,89 @@ def rasterize_data_across_all_cities(
         dst.write(coarse_raster, 1)
 
 
+def factor_memory_estimate(height: int, width: int) -> int:
+    """Estimated peak memory, in bytes, of rasterizing a factor on a `height` x `width` grid."""
+    return height * width * BYTES_PER_PIXEL
+
+
+def parallel_workers(workers: int, factor_memory: int, memory_budget: int) -> int:
+    """
+    Number of factors to rasterize at the same time.
+
+    Args:
+        workers (int): Maximum number of processes.
+        factor_memory (int): Estimated peak memory of a factor, in bytes.
+        memory_budget (int): Memory available for all the factors, in bytes.
+
+    Returns:
+        int: Between 1 and `workers`, so that the estimated peak memory fits in
+            the budget when possible.
+    """
+    return max(1, min(workers, memory_budget // max(factor_memory, 1)))
+
+
+def timed_rasterize(factor_name: str, **kwargs) -> float:
+    """Run `rasterize_data_across_all_cities` and return its duration in seconds."""
+    start = time.perf_counter()
+    rasterize_data_across_all_cities(factor_name, **kwargs)
+    return time.perf_counter() - start
+
+
+def rasterize_factors(
+    factor_names: list[str],
+    workers: int = 1,
+    memory_budget_mb: int = 0,
+    **kwargs,
+) -> dict[str, float]:
+    """
+    Rasterize each factor with `rasterize_data_across_all_cities`.
+
+    The factors are independent: with several workers, they are rasterized in
+    parallel processes, as many at once as the memory budget allows.
+
+    Args:
+        factor_names (list[str]): Factors to rasterize.
+        workers (int): Maximum number of processes, 1 to rasterize in turn.
+        memory_budget_mb (int): Memory available for all the factors, in MB,
+            0 for no limit.
+        **kwargs: Arguments of `rasterize_data_across_all_cities`.
+
+    Returns:
+        dict[str, float]: Duration of each factor, in seconds.
+    """
+    if memory_budget_mb:
+        factor_memory = factor_memory_estimate(kwargs["height"], kwargs["width"])
+        workers = parallel_workers(workers, factor_memory, memory_budget_mb * 2**20)
+        log_progress(f"{factor_memory / 2**20:.0f} MB per factor, {workers} worker(s)")
+
+    timings = {}
+
+    def record(factor_name: str, duration: float) -> None:
+        timings[factor_name] = duration
+        log_progress(
+            f"{factor_name} rasterized in {duration:.1f}s "
+            f"({len(timings)}/{len(factor_names)})"
+        )
+
+    # A single worker rasterizes in this process, which tests rely on: the test
+    # database would be destroyed by child processes, see MVTGenerator
+    if workers == 1:
+        for factor_name in factor_names:
+            record(factor_name, timed_rasterize(factor_name, **kwargs))
+        return timings
+
+    # Forked workers must not share the connection of the parent process
+    connection.close()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(timed_rasterize, factor_name, **kwargs): factor_name
+            for factor_name in factor_names
+        }
+        for future in as_completed(futures):
+            record(futures[future], future.result())
+    return timings
+
+
 class Command(BaseCommand):
     help = "Convert Data polygons to raster."
 
@@ -97,6 +191,18 @@ class Command(BaseCommand):
         parser.add_argument(
             "--grid-size", type=int, default=5, help="Grid size in meters"
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DATA_TO_RASTER_WORKERS,
+            help="Processes rasterizing the factors in parallel",
+        )
+        parser.add_argument(
+            "--memory-budget",
+            type=int,
+            default=DATA_TO_RASTER_MEMORY_BUDGET_MB,
+            help="Estimated peak memory in MB of the parallel factors, 0 for no limit",
+        )
 
     def handle(self, *args, **options):
         output_dir = str(BASE_DIR) + "/media/rasters/"
@@ -122,19 +228,23 @@ class Command(BaseCommand):
         height_out = int((maxy - miny) / grid_size)
         transform_out = from_origin(minx, maxy, grid_size, grid_size)
 
-        for factor_name in FACTORS.keys():
-            log_progress(f"Processing {factor_name}")
-            if factor_name == "QPV":
-                continue
-            rasterize_data_across_all_cities(
-                factor_name,
-                height,
-                width,
-                height_out,
-                width_out,
-                transform,
-                transform_out,
-                all_cities_union=all_cities_union,
-                grid_size=kernel_size,
-                output_dir=output_dir,
-            )
+        factor_names = [name for name in FACTORS.keys() if name != "QPV"]
+        timings = rasterize_factors(
+            factor_names,
+            workers=options["workers"],
+            memory_budget_mb=options["memory_budget"],
+            height=height,
+            width=width,
+            height_out=height_out,
+            width_out=width_out,
+            transform=transform,
+            transform_out=transform_out,
+            all_cities_union=all_cities_union,
+            grid_size=kernel_size,
+            output_dir=output_dir,
+        )
+        log_progress(f"Rasterized {len(timings)} factors", star=True)
+        for factor_name, duration in sorted(
+            timings.items(), key=lambda item: item[1], reverse=True
+        ):
+            log_progress(f"{factor_name}: {duration:.1f}s")
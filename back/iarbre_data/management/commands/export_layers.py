@@ -0,0 +1,31 @@
+"""Export the plantability and vegestrate layers to GeoParquet and FlatGeobuf.
+
+The exports are downloaded from `/api/exports/`, which answers HTTP range
+requests: clients read the whole layers, or only their bounding box, without
+paging through the WFS.
+"""
+
+from django.core.management import BaseCommand
+
+from iarbre_data.utils.layer_exports import EXPORT_LAYERS, write_exports
+
+
+class Command(BaseCommand):
+    help = "Export the plantability and vegestrate layers to GeoParquet and FlatGeobuf"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--layer",
+            type=str,
+            choices=list(EXPORT_LAYERS),
+            help="Optional: Export only this layer",
+        )
+
+    def handle(self, *args, **options):
+        layers = [options["layer"]] if options["layer"] else list(EXPORT_LAYERS)
+        for layer in layers:
+            count, paths = write_exports(layer)
+            for path in paths:
+                self.stdout.write(f"{count} {layer} features written to {path}")
+
+        self.stdout.write(self.style.SUCCESS("Successfully exported the layers!"))
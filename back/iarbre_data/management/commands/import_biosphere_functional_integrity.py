@@ -1,8 +1,10 @@
 import geopandas
 from django.core.management.base import BaseCommand
 from django.contrib.gis.geos import GEOSGeometry
+from api.constants import DataType
 from iarbre_data.models import BiosphereFunctionalIntegrity
 from iarbre_data.settings import SRID_DB, SRID_MAPLIBRE
+from iarbre_data.utils.data_version import bump_data_version
 from iarbre_data.utils.database import log_progress
 from iarbre_data.utils.data_processing import make_valid
 from tqdm import tqdm
@@ -43,3 +45,4 @@ class Command(BaseCommand):
                     for _, row in batch.iterrows()
                 ]
             )
+        bump_data_version(DataType.BIOSPHERE_FUNCTIONAL_INTEGRITY.value)
@@ -1,10 +1,11 @@
 from iarbre_data.utils.database import log_progress
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, call_command
 from django.contrib.gis.geos import GEOSGeometry
+from django.db import connection
 from iarbre_data.models import BiosphereFunctionalIntegrityLandCover
 from iarbre_data.settings import SRID_MAPLIBRE, SRID_DB
-from iarbre_data.utils.data_processing import make_valid, split_geometry_with_grid
-from concurrent.futures import ThreadPoolExecutor
+from iarbre_data.utils.data_processing import make_valid, split_geometries_with_grid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from iarbre_data.utils.biosphere_land_cover import CLASS_TO_LAND_COVER, CLASS_TO_BINARY
 
 import geopandas
@@ -12,52 +13,69 @@ import os
 import shutil
 from tqdm import tqdm
 
+GRID_SIZE = 100.0
 
-def split_data(shp_folder, shp_filename, batch_folder) -> geopandas.GeoDataFrame:
+
+def split_chunk(chunk: geopandas.GeoDataFrame, path: str) -> int:
+    """Dissolve a chunk by class, split it on the grid and write it to `path`.
+
+    Returns:
+        int: Number of polygons written.
+    """
+    chunk = chunk.dissolve(by="class").reset_index().to_crs(SRID_DB)
+    # Split large geometries using 100m x 100m grid
+    source_idx, polygons = split_geometries_with_grid(
+        chunk.geometry.to_numpy(), grid_size=GRID_SIZE
+    )
+    parts = geopandas.GeoDataFrame(
+        {"class": chunk["class"].to_numpy()[source_idx]},
+        geometry=polygons,
+        crs=SRID_DB,
+    )
+    parts.to_file(path)
+    return len(parts)
+
+
+def split_data(shp_folder, shp_filename, batch_folder, workers=None) -> None:
+    """Split the shapefile in batch files of polygons smaller than a grid cell.
+
+    The chunks of the shapefile are dissolved and split in parallel processes,
+    each one writing its batch file.
+    """
     batch_size = 5_000
     gdf = geopandas.read_file(os.path.join(shp_folder, shp_filename))
     if os.path.exists(batch_folder):
         shutil.rmtree(batch_folder)
     os.mkdir(batch_folder)
 
-    index = 0
-    for start in tqdm(range(0, gdf.shape[0], batch_size)):
-        end = start + batch_size
-        batch = gdf.iloc[start:end]
-        batch = batch.dissolve(by="class")
-        batch.to_file(os.path.join(batch_folder, f"part_{index}.shp"))
-        index += 1
+    chunks = [
+        (gdf.iloc[start : start + batch_size], f"part_{index}.shp")
+        for index, start in enumerate(range(0, gdf.shape[0], batch_size))
+    ]
+    if workers == 1:
+        for chunk, filename in tqdm(chunks):
+            split_chunk(chunk, os.path.join(batch_folder, filename))
+        return
+
+    # Forked workers must not share the connection of the parent process
+    connection.close()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(split_chunk, chunk, os.path.join(batch_folder, filename))
+            for chunk, filename in chunks
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            future.result()
 
 
 def load_data(shp_path) -> geopandas.GeoDataFrame:
-    """Open the shapefile for LandCover.
+    """Open a batch file of LandCover, split by `split_data`.
 
     Returns:
         geopandas.GeoDataFrame: The loaded shapefile as a GeoDataFrame.
-
-    Raises:
-        FileNotFoundError: If no folder with "lcz" in the name is found or no .shp file is found in the folder.
     """
-    gdf = geopandas.read_file(shp_path)
-
-    gdf = gdf[["class", "geometry"]]
-    gdf.to_crs(SRID_DB, inplace=True)
-    gdf_filtered = gdf
-
-    # Split large geometries using 100m x 100m grid
-    def worker(row, progress):
-        print(f"splitting row : { round(progress, 2) }%")
-        split_geoms = split_geometry_with_grid(row.geometry, grid_size=100.0)
-        for geom in split_geoms:
-            split_geometries.append({**row.to_dict(), "geometry": geom})
-
-    split_geometries = []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        for idx, row in gdf_filtered.iterrows():
-            executor.submit(worker, row, 100.0 * idx / gdf_filtered.shape[0])
-    gdf_filtered = geopandas.GeoDataFrame(
-        split_geometries, geometry="geometry", crs=SRID_DB
-    )
+    gdf_filtered = geopandas.read_file(shp_path)
+    gdf_filtered = gdf_filtered[["class", "geometry"]]
 
     # Simple correction for invalid geometry
     gdf_filtered["geometry"] = gdf_filtered["geometry"].apply(make_valid)
@@ -101,6 +119,14 @@ def save_geometries(lcz_datas: geopandas.GeoDataFrame) -> None:
 class Command(BaseCommand):
     help = "Import Land Cover data from COSIA + Carhab in the DB."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processes splitting the shapefile (default: number of CPUs)",
+        )
+
     def handle(self, *args, **options):
         """Load the shapefile produced by Emile to add it in the DB."""
         shp_folder = "file_data/biosphere_functional_integrity"
@@ -110,9 +136,13 @@ class Command(BaseCommand):
         BiosphereFunctionalIntegrityLandCover.objects.all().delete()
 
         log_progress("Split data")
-        batch_folder = os.path.join(shp_folder, f"{shp_filename}_parts")
+        # Not the "_parts" folder of the previous format, whose batches are
+        # only dissolved, neither reprojected nor split on the grid
+        batch_folder = os.path.join(shp_folder, f"{shp_filename}_grid_parts")
         if not os.path.exists(batch_folder):
-            split_data(shp_folder, shp_filename, batch_folder)
+            split_data(
+                shp_folder, shp_filename, batch_folder, workers=options["workers"]
+            )
 
         shp_files = [
             x for x in os.listdir(os.path.join(batch_folder)) if x.endswith(".shp")
@@ -123,3 +153,5 @@ class Command(BaseCommand):
 
             save_geometries(landcover_data)
             os.remove(os.path.join(batch_folder, shp_file))
+        # Read around a point by the API, also bumps the data version
+        call_command("compute_land_cover_raster")
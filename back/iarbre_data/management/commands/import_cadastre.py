@@ -3,8 +3,10 @@ from django.core.management import BaseCommand
 from django.contrib.gis.geos import GEOSGeometry
 from tqdm import tqdm
 
+from api.constants import DataType
 from iarbre_data.models import City, Cadastre
 from iarbre_data.settings import SRID_DB, SRID_DOWNLOADED_DATA
+from iarbre_data.utils.data_version import bump_data_version
 
 
 class Command(BaseCommand):
@@ -42,6 +44,7 @@ class Command(BaseCommand):
                 self.import_cadastre_for_city(city)
             except Exception as e:
                 print(f"Error processing city {city.name}: {e}")
+        bump_data_version(DataType.CADASTRE.value)
 
     def import_cadastre_for_city(self, city):
         print(f"Downloading cadastre for {city.name} ({city.code})...")
@@ -9,11 +9,13 @@ from django.contrib.gis.geos import GEOSGeometry
 from django.core.management import BaseCommand
 from tqdm import tqdm
 
+from api.constants import DataType
 from iarbre_data.data_config import URL_FILES, LCZ
 from iarbre_data.utils.database import select_city, log_progress
-from iarbre_data.models import Lcz
+from iarbre_data.models import AdminUnitOverlay, Lcz
 from iarbre_data.settings import SRID_MAPLIBRE, SRID_DB
 from iarbre_data.utils.data_processing import make_valid, split_geometry_with_grid
+from iarbre_data.utils.data_version import bump_data_version
 
 
 def download_data() -> None:
@@ -142,6 +144,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """Load LCZ from CEREMA and then save all LCZ data in the DB."""
         log_progress("Clean model")
+        AdminUnitOverlay.objects.filter(lcz__isnull=False).delete()
         print(Lcz.objects.all().delete())
         log_progress("Download data if needed")
         download_data()
@@ -149,3 +152,4 @@ class Command(BaseCommand):
         lcz_data = load_data()
         log_progress("Save geometries")
         save_geometries(lcz_data)
+        bump_data_version(DataType.LCZ.value)
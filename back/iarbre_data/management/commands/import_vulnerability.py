@@ -14,8 +14,10 @@ from django.core.management import BaseCommand
 from tqdm import tqdm
 
 
-from iarbre_data.models import Vulnerability
+from api.constants import DataType
+from iarbre_data.models import AdminUnitOverlay, Vulnerability
 from iarbre_data.settings import SRID_MAPLIBRE, SRID_DB
+from iarbre_data.utils.data_version import bump_data_version
 from iarbre_data.utils.database import log_progress
 
 
@@ -156,8 +158,10 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """Load heat vulnerability data in the DB."""
         log_progress("Remove existing data")
+        AdminUnitOverlay.objects.filter(vulnerability__isnull=False).delete()
         print(Vulnerability.objects.all().delete())
         log_progress("Loading data")
         vulnerability_data = load_data()
         log_progress("Saving data")
         save_geometries(vulnerability_data)
+        bump_data_version(DataType.VULNERABILITY.value)
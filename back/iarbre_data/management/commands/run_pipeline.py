@@ -9,7 +9,9 @@ import humanize
 import yaml
 from django.core.management import BaseCommand
 
+from api.utils.raster_clip import delete_previous_clips
 from iarbre_data.settings import BASE_DIR
+from iarbre_data.utils.data_version import bump_data_version
 
 MANAGE_PY = Path(BASE_DIR) / "manage.py"
 
@@ -167,6 +169,9 @@ class Command(BaseCommand):
             node_state["duration"] = _humanize(duration)
 
             if return_code == 0:
+                # Results cached by the API for the previous data are now stale
+                bump_data_version()
+                delete_previous_clips()
                 node_state["status"] = "completed"
                 node_state.pop("return_code", None)
                 self.stdout.write(
@@ -0,0 +1,91 @@
+"""Write the vulnerability zone of each tile to a raster.
+
+The raster is aligned on `plantability.tif`: each pixel holds the id of the
+vulnerability zone of the tile created from the same pixel, 0 when the tile has
+none. It is read by `ScoresInPolygonView` to compute vulnerability scores from
+the rasters, and must be regenerated after `vulnerability_projection`.
+"""
+
+import numpy as np
+import rasterio
+from django.contrib.gis.db.models.functions import Centroid
+from django.core.management import BaseCommand
+from django.db.models import FloatField, Func
+from rasterio.transform import rowcol
+
+from api.constants import DataType
+from api.utils.raster_scores import (
+    NO_VULNERABILITY,
+    PLANTABILITY_RASTER,
+    VULNERABILITY_IDX_RASTER,
+    raster_path,
+)
+from iarbre_data.models import Tile
+from iarbre_data.utils.data_version import bump_data_version
+from iarbre_data.utils.database import log_progress
+
+BATCH_SIZE = 100_000
+
+
+def write_vulnerability_idx_raster(plantability_file: str, output_file: str) -> int:
+    """Rasterize `Tile.vulnerability_idx` on the grid of the plantability raster.
+
+    Args:
+        plantability_file (str): Path to the plantability raster.
+        output_file (str): Path of the raster to write.
+
+    Returns:
+        int: Number of tiles written to the raster.
+    """
+    with rasterio.open(plantability_file) as src:
+        meta = src.meta.copy()
+        transform = src.transform
+        shape = (src.height, src.width)
+
+    ids = np.full(shape, NO_VULNERABILITY, dtype=np.int32)
+    tiles = (
+        Tile.objects.filter(vulnerability_idx__isnull=False)
+        .annotate(
+            x=Func(Centroid("geometry"), function="ST_X", output_field=FloatField()),
+            y=Func(Centroid("geometry"), function="ST_Y", output_field=FloatField()),
+        )
+        .values_list("x", "y", "vulnerability_idx_id")
+    )
+    total = 0
+    batch = []
+    for row in tiles.iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            total += _burn_batch(ids, transform, batch)
+            batch.clear()
+    if batch:
+        total += _burn_batch(ids, transform, batch)
+
+    meta.update(dtype="int32", count=1, nodata=NO_VULNERABILITY, compress="lzw")
+    with rasterio.open(output_file, "w", **meta) as dst:
+        dst.write(ids, 1)
+    return total
+
+
+def _burn_batch(ids: np.ndarray, transform, batch: list) -> int:
+    xs, ys, values = (np.asarray(column) for column in zip(*batch))
+    rows, cols = rowcol(transform, xs, ys)
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    inside = (rows >= 0) & (rows < ids.shape[0]) & (cols >= 0) & (cols < ids.shape[1])
+    ids[rows[inside], cols[inside]] = values[inside]
+    return int(inside.sum())
+
+
+class Command(BaseCommand):
+    help = "Write the vulnerability zone of each tile to a raster."
+
+    def handle(self, *args, **options):
+        output_file = raster_path(VULNERABILITY_IDX_RASTER)
+        log_progress(f"Writing tile vulnerability ids to {output_file}")
+        total = write_vulnerability_idx_raster(
+            raster_path(PLANTABILITY_RASTER), output_file
+        )
+        bump_data_version(DataType.VULNERABILITY.value)
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} tiles written to {output_file}.")
+        )
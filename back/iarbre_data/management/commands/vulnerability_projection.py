@@ -9,7 +9,9 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from tqdm import tqdm
 
+from api.constants import DataType
 from iarbre_data.models import Tile, Vulnerability
+from iarbre_data.utils.data_version import bump_data_version
 from iarbre_data.utils.database import log_progress
 
 BATCH_SIZE = 10_000
@@ -75,6 +77,7 @@ class Command(BaseCommand):
         if updates:
             with transaction.atomic():
                 Tile.objects.bulk_update(updates, ["vulnerability_idx"])
+        bump_data_version(DataType.VULNERABILITY.value)
         # Report results
         assigned_count = Tile.objects.filter(vulnerability_idx__isnull=False).count()
         total_count = Tile.objects.count()
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.13 on 2026-10-19 14:10
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0041_biosphere_land_cover_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlantabilityGridCell",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("resolution", models.IntegerField()),
+                ("col", models.IntegerField()),
+                ("row", models.IntegerField()),
+                (
+                    "geometry",
+                    django.contrib.gis.db.models.fields.PolygonField(srid=2154),
+                ),
+                ("tile_count", models.IntegerField()),
+                ("plantability_histogram", models.JSONField(default=dict)),
+                ("vulnerability_ids", models.JSONField(default=list)),
+                ("iris_ids", models.JSONField(default=list)),
+                ("city_ids", models.JSONField(default=list)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("resolution", "col", "row"), name="unique_grid_cell"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.13 on 2026-10-19 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0042_plantabilitygridcell"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cadastre",
+            name="average_normalized_indice",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="cadastre",
+            name="plantability_counts",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="cadastre",
+            name="plantable_area",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="cadastre",
+            name="vulnerability_idx",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="iarbre_data.vulnerability",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.13 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0043_cadastre_plantability_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("geolevel", models.CharField(max_length=20)),
+                ("code", models.CharField(blank=True, default="", max_length=50)),
+                ("data", models.JSONField()),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("geolevel", "code"), name="unique_dashboard_summary"
+                    )
+                ],
+            },
+        ),
+    ]
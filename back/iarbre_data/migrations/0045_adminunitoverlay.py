@@ -0,0 +1,73 @@
+# Generated by Django 5.2.13 on 2026-10-19 17:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0044_dashboardsummary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdminUnitOverlay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("geolevel", models.CharField(max_length=20)),
+                ("unit_id", models.IntegerField()),
+                ("intersection_area", models.FloatField()),
+                ("weight", models.FloatField()),
+                (
+                    "lcz",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="overlays",
+                        to="iarbre_data.lcz",
+                    ),
+                ),
+                (
+                    "vegestrate",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="overlays",
+                        to="iarbre_data.vegestrate",
+                    ),
+                ),
+                (
+                    "vulnerability",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="overlays",
+                        to="iarbre_data.vulnerability",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["geolevel", "unit_id"],
+                        name="admin_unit_overlay_unit_idx",
+                    )
+                ],
+            },
+        ),
+    ]
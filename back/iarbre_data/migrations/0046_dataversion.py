@@ -0,0 +1,29 @@
+# Generated by Django 5.2.13 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0045_adminunitoverlay"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("datatype", models.CharField(blank=True, max_length=50, unique=True)),
+                ("version", models.CharField(max_length=12)),
+            ],
+        ),
+    ]
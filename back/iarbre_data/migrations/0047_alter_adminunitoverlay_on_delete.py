@@ -0,0 +1,50 @@
+# Generated by Django 5.2.13 on 2026-10-19 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0046_dataversion"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="adminunitoverlay",
+            name="lcz",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="overlays",
+                to="iarbre_data.lcz",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="adminunitoverlay",
+            name="vegestrate",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="overlays",
+                to="iarbre_data.vegestrate",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="adminunitoverlay",
+            name="vulnerability",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="overlays",
+                to="iarbre_data.vulnerability",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.13 on 2026-10-19 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("iarbre_data", "0047_alter_adminunitoverlay_on_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dashboardsummary",
+            name="data_version",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+    ]
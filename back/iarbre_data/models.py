@@ -156,6 +156,75 @@ class Tile(models.Model):
         }
 
 
+class PlantabilityGridCell(models.Model):
+    """Aggregate of the tiles of a square cell, for fast in-polygon scores.
+
+    Cells of several resolutions are aligned on the tile grid, each tile lying in
+    a single cell of each resolution. Built by `compute_plantability_grid`.
+    """
+
+    resolution = models.IntegerField()
+    col = models.IntegerField()
+    row = models.IntegerField()
+    geometry = PolygonField(srid=SRID_DB)
+    tile_count = models.IntegerField()
+    # Number of tiles per plantability_normalized_indice value (null excluded)
+    plantability_histogram = models.JSONField(default=dict)
+    vulnerability_ids = models.JSONField(default=list)
+    iris_ids = models.JSONField(default=list)
+    city_ids = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["resolution", "col", "row"], name="unique_grid_cell"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Grid cell {self.resolution}m ({self.col}, {self.row})"
+
+
+class DashboardSummary(models.Model):
+    """Dashboard data of the metropole, a city or an IRIS.
+
+    Computed by `compute_dashboard_summaries` and served as is by `DashboardView`
+    while the data it was computed from is unchanged.
+    """
+
+    METROPOLE = "metropole"
+
+    # METROPOLE, GeoLevel.CITY or GeoLevel.IRIS
+    geolevel = models.CharField(max_length=20)
+    # City or IRIS code, empty for the metropole
+    code = models.CharField(max_length=50, blank=True, default="")
+    data = models.JSONField()
+    # Version of the dashboard datatypes the data was computed from
+    data_version = models.CharField(max_length=100, blank=True, default="")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["geolevel", "code"], name="unique_dashboard_summary"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Dashboard summary {self.geolevel} {self.code}".strip()
+
+
+class DataVersion(models.Model):
+    """Version of the data of a datatype, see `iarbre_data.utils.data_version`."""
+
+    # Datatype, empty for the global version
+    datatype = models.CharField(max_length=50, unique=True, blank=True)
+    version = models.CharField(max_length=12)
+
+    def __str__(self):
+        return f"Data version {self.datatype or 'global'}: {self.version}"
+
+
 class Data(models.Model):
     """Land occupancy data"""
 
@@ -238,6 +307,20 @@ class Cadastre(models.Model):
         City, on_delete=models.CASCADE, related_name="cadastres", null=True, blank=True
     )
 
+    # Statistics of the plantability raster pixels of the parcel, computed by
+    # `compute_cadastre_stats`
+    plantability_counts = models.JSONField(null=True, blank=True)
+    average_normalized_indice = models.FloatField(null=True, blank=True)
+    plantable_area = models.FloatField(null=True, blank=True)
+    # Vulnerability zone covering most of the parcel
+    vulnerability_idx = models.ForeignKey(
+        Vulnerability,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,  # No DB-level FK constraint
+    )
+
     geolevel = GeoLevel.CADASTRE.value
     datatype = DataType.CADASTRE.value
 
@@ -250,6 +333,9 @@ class Cadastre(models.Model):
             "section": self.section,
             "numero": self.numero,
             "surface": self.surface,
+            "average_normalized_indice": self.average_normalized_indice,
+            "plantable_area": self.plantable_area,
+            "vulnerability_idx": self.vulnerability_idx_id,
         }
 
     def __str__(self):
@@ -292,6 +378,59 @@ class Vegestrate(models.Model):
         }
 
 
+class AdminUnitOverlay(models.Model):
+    """Intersection of a city or an IRIS with a feature of a source layer.
+
+    Computed by `compute_admin_unit_overlays`, one row per (unit, feature) pair
+    with a non-empty intersection. Exactly one of the source features is set.
+    The overlays of a layer are deleted by its import command, before the
+    features they reference.
+    """
+
+    # GeoLevel.CITY or GeoLevel.IRIS
+    geolevel = models.CharField(max_length=20)
+    # Id of the City or Iris
+    unit_id = models.IntegerField()
+    vulnerability = models.ForeignKey(
+        Vulnerability,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="overlays",
+        db_constraint=False,  # No DB-level FK constraint
+    )
+    lcz = models.ForeignKey(
+        Lcz,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="overlays",
+        db_constraint=False,
+    )
+    vegestrate = models.ForeignKey(
+        Vegestrate,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="overlays",
+        db_constraint=False,
+    )
+    # Area of the intersection, in m²
+    intersection_area = models.FloatField()
+    # Share of the source feature area inside the unit
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["geolevel", "unit_id"], name="admin_unit_overlay_unit_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Overlay {self.geolevel} {self.unit_id}"
+
+
 class BiosphereFunctionalIntegrity(models.Model):
     geometry = PolygonField(srid=SRID_DB)
     map_geometry = PolygonField(srid=SRID_MAPLIBRE, null=True, blank=True)
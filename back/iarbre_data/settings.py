@@ -14,6 +14,7 @@ import os
 import sys
 from pathlib import Path
 import getconf
+from django.core.exceptions import ImproperlyConfigured
 from django.http import Http404
 
 # Required for decap auth
@@ -83,6 +84,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.AsyncStreamingMiddleware",
     "django_prometheus.middleware.PrometheusAfterMiddleware",
 ]
 
@@ -250,6 +252,75 @@ SRID_DOWNLOADED_DATA = (
 )
 BUFFER_SIZE = 2  # meters
 
+# Tile request analytics, see api/utils/tile_analytics.py
+TILE_ANALYTICS_SAMPLE_RATE = config.getfloat(
+    "analytics.tile_sample_rate", 0.0 if IS_TESTING else 0.1
+)
+TILE_ANALYTICS_FLUSH_INTERVAL = config.getint("analytics.tile_flush_interval", 60)
+TILE_ANALYTICS_MAX_PENDING = 5000
+
+# Compute in-polygon scores from the plantability raster when it is available
+POLYGON_SCORES_FROM_RASTER = config.getbool("scores.from_raster", not IS_TESTING)
+
+# Compute the land cover around a point from the land cover raster when it is
+# available
+LAND_COVER_FROM_RASTER = config.getbool(
+    "biosphere.land_cover_from_raster", not IS_TESTING
+)
+
+# WFS GetFeature requests estimated to return more features are rejected, 0 to
+# accept all of them
+WFS_MAX_ESTIMATED_FEATURES = config.getint("wfs.max_estimated_features", 5_000_000)
+
+# Raster clips covering more pixels are rejected, 0 to accept all of them
+RASTER_CLIP_MAX_PIXELS = config.getint("rasters.clip_max_pixels", 25_000_000)
+
+# Internal nginx location aliasing MEDIA_ROOT: raster and export downloads are
+# handed to nginx with X-Accel-Redirect instead of being read by Django, empty
+# to serve them from Django
+MEDIA_X_ACCEL_REDIRECT_LOCATION = config.getstr("media.x_accel_redirect_location", "")
+
+# Processes rasterizing the factors in data_to_raster, 1 to rasterize them in turn
+DATA_TO_RASTER_WORKERS = config.getint("rasters.data_to_raster_workers", 1)
+# Estimated peak memory, in MB, of the factors rasterized at the same time
+DATA_TO_RASTER_MEMORY_BUDGET_MB = config.getint(
+    "rasters.data_to_raster_memory_budget_mb", 16_000
+)
+
+# Threads computing the dashboard sections concurrently, 1 to compute them in turn
+DASHBOARD_SECTION_WORKERS = config.getint("dashboard.section_workers", 4)
+
+# Upstream services proxied by the API (Grand Lyon orthophoto WMS)
+UPSTREAM_MAX_CONNECTIONS = config.getint("upstream.max_connections", 20)
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = config.getint(
+    "upstream.max_keepalive_connections", 10
+)
+ORTHOPHOTO_UPSTREAM_CONCURRENCY = config.getint("orthophoto.upstream_concurrency", 8)
+# Side, in tiles, of the metatile requested to the WMS in a single GetMap call
+ORTHOPHOTO_METATILE_SIZE = config.getint("orthophoto.metatile_size", 4)
+if ORTHOPHOTO_METATILE_SIZE < 1 or ORTHOPHOTO_METATILE_SIZE & (
+    ORTHOPHOTO_METATILE_SIZE - 1
+):
+    raise ImproperlyConfigured("orthophoto.metatile_size must be a power of two")
+# Quality of the lossy orthophoto tiles served by the proxy
+ORTHOPHOTO_WEBP_QUALITY = config.getint("orthophoto.webp_quality", 80)
+ORTHOPHOTO_JPEG_QUALITY = config.getint("orthophoto.jpeg_quality", 85)
+# Stale orthophoto tiles are served for this long while being refreshed
+ORTHOPHOTO_STALE_DURATION = config.getint(
+    "orthophoto.stale_duration", 60 * 60 * 24 * 30
+)
+# WMS errors and blank tiles are only cached for a short time
+ORTHOPHOTO_NEGATIVE_CACHE_DURATION = config.getint(
+    "orthophoto.negative_cache_duration", 60 * 5
+)
+# Consecutive WMS failures before the proxy stops calling it, and for how long
+ORTHOPHOTO_BREAKER_FAILURES = config.getint("orthophoto.breaker_failures", 5)
+ORTHOPHOTO_BREAKER_RESET_TIMEOUT = config.getint("orthophoto.breaker_reset_timeout", 60)
+# MBTiles archive filled by the seed_orthophoto command, read before the WMS
+ORTHOPHOTO_ARCHIVE_PATH = config.getstr(
+    "orthophoto.archive_path", os.path.join(MEDIA_ROOT, "orthophoto.mbtiles")
+)
+
 # telescoop-backup
 BACKUP_ACCESS = config.getstr("backup.backup_access", None)  # S3 ACCESS
 BACKUP_SECRET = config.getstr("backup.backup_secret", None)  # S3 SECRET KEY
@@ -0,0 +1,62 @@
+import numpy as np
+from django.contrib.gis.geos import Polygon
+from django.test import SimpleTestCase, TestCase
+
+from iarbre_data.management.commands.compute_biosphere_functional_integrity import (
+    compute_indice,
+    disk_kernel,
+    focal_fraction,
+)
+from iarbre_data.models import (
+    BiosphereFunctionalIntegrity,
+    BiosphereFunctionalIntegrityLandCover,
+)
+from iarbre_data.utils.biosphere_land_cover import LandCoverClass
+
+
+class FocalFractionTest(SimpleTestCase):
+    def test_disk_kernel(self):
+        kernel = disk_kernel(100)
+        self.assertEqual(kernel.shape, (201, 201))
+        self.assertAlmostEqual(kernel.sum() / (np.pi * 100**2), 1, places=3)
+
+    def test_focal_fraction(self):
+        raster = np.zeros((400, 400), dtype=np.uint8)
+        raster[:, :200] = 1
+
+        fraction = focal_fraction(raster, 50)
+
+        self.assertAlmostEqual(fraction[200, 100], 1, places=5)
+        self.assertAlmostEqual(fraction[200, 300], 0, places=5)
+        self.assertAlmostEqual(fraction[200, 200], 0.5, delta=0.01)
+        # Outside of the raster counts as 0
+        self.assertAlmostEqual(fraction[0, 100], 0.5, delta=0.01)
+
+
+class ComputeIndiceTest(TestCase):
+    def _land_cover(self, bbox, land_cover, binary):
+        return BiosphereFunctionalIntegrityLandCover.objects.create(
+            geometry=Polygon.from_bbox(bbox),
+            land_cover=land_cover,
+            binary=binary,
+        )
+
+    def setUp(self):
+        self.forest = self._land_cover((0, 0, 1000, 1000), LandCoverClass.FEUILLU, True)
+        self.edge = self._land_cover((950, 0, 1050, 1000), LandCoverClass.SOL_NU, None)
+        self.buildings = self._land_cover(
+            (2000, 0, 3000, 1000), LandCoverClass.BATIMENT, False
+        )
+
+    def test_compute_indice(self):
+        compute_indice()
+
+        self.assertEqual(BiosphereFunctionalIntegrity.objects.count(), 3)
+        indices = {
+            bfi.geometry.centroid.x: bfi.indice
+            for bfi in BiosphereFunctionalIntegrity.objects.all()
+        }
+        self.assertEqual(indices[500], 100)
+        self.assertEqual(indices[2500], 0)
+        # Half of the 500 m disk around the edge is in the forest
+        self.assertAlmostEqual(indices[1000], 50, delta=2)
@@ -0,0 +1,46 @@
+import tempfile
+
+import numpy as np
+import rasterio
+from django.contrib.gis.geos import Polygon
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.utils.land_cover_composition import LAND_COVER_RASTER
+from api.utils.raster_scores import raster_path
+from iarbre_data.models import BiosphereFunctionalIntegrityLandCover
+from iarbre_data.utils.biosphere_land_cover import LandCoverClass
+
+
+class ComputeLandCoverRasterTest(TestCase):
+    def setUp(self):
+        BiosphereFunctionalIntegrityLandCover.objects.create(
+            geometry=Polygon.from_bbox((0, 0, 40, 40)),
+            land_cover=LandCoverClass.FEUILLU,
+            binary=True,
+        )
+        BiosphereFunctionalIntegrityLandCover.objects.create(
+            geometry=Polygon.from_bbox((40, 0, 80, 40)),
+            land_cover=LandCoverClass.BATIMENT,
+            binary=False,
+        )
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_compute_land_cover_raster(self):
+        call_command("compute_land_cover_raster")
+
+        with rasterio.open(raster_path(LAND_COVER_RASTER)) as src:
+            classes = src.read(1)
+            self.assertEqual(src.res, (4, 4))
+            self.assertEqual(tuple(src.bounds), (0, 0, 80, 40))
+        self.assertEqual(classes.shape, (10, 20))
+        # Class codes of COSIA: 9 for Feuillu, 1 for Bâtiment
+        self.assertTrue((classes[:, :10] == 9).all())
+        self.assertTrue((classes[:, 10:] == 1).all())
+        self.assertEqual(np.unique(classes).tolist(), [1, 9])
@@ -10,7 +10,9 @@ from rasterio.transform import from_origin
 from iarbre_data.settings import SRID_DB
 from iarbre_data.factories import CityFactory
 from iarbre_data.management.commands.data_to_raster import (
+    parallel_workers,
     rasterize_data_across_all_cities,
+    rasterize_factors,
 )
 from iarbre_data.models import Data
 import geopandas as gpd
@@ -100,3 +102,42 @@ class DataToRasterTestCase(TestCase):
                 import shutil
 
                 shutil.rmtree(self.test_output_dir)
+
+    def test_rasterize_factors_records_timings(self):
+        try:
+            timings = rasterize_factors(
+                [self.factor_name],
+                workers=1,
+                memory_budget_mb=1,
+                height=self.height,
+                width=self.width,
+                height_out=self.height_out,
+                width_out=self.width_out,
+                transform=self.transform,
+                transform_out=self.transform_out,
+                all_cities_union=GEOSGeometry(
+                    self.all_cities_union.geometry.iloc[0].wkt
+                ),
+                grid_size=self.grid_size,
+                output_dir=self.test_output_dir,
+            )
+
+            self.assertEqual(list(timings), [self.factor_name])
+            self.assertGreaterEqual(timings[self.factor_name], 0)
+            self.assertTrue(
+                os.path.exists(
+                    os.path.join(self.test_output_dir, f"{self.factor_name}.tif")
+                )
+            )
+        finally:
+            if os.path.exists(self.test_output_dir):
+                import shutil
+
+                shutil.rmtree(self.test_output_dir)
+
+    def test_parallel_workers(self):
+        # The budget fits 3 factors
+        self.assertEqual(parallel_workers(8, 100, 350), 3)
+        self.assertEqual(parallel_workers(2, 100, 350), 2)
+        # A single factor over the budget is still rasterized
+        self.assertEqual(parallel_workers(8, 500, 350), 1)
@@ -0,0 +1,74 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+import geopandas as gpd
+import pyarrow.parquet as pq
+from django.contrib.gis.geos import Polygon
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from iarbre_data.models import Tile, Vegestrate
+from iarbre_data.settings import SRID_DB
+from iarbre_data.utils.layer_exports import export_path
+
+
+class ExportLayersTest(TestCase):
+    def setUp(self):
+        for x in range(3):
+            Tile.objects.create(
+                geometry=Polygon.from_bbox((x * 5, 0, x * 5 + 5, 5)),
+                plantability_indice=x,
+                plantability_normalized_indice=x * 2,
+            )
+        Vegestrate.objects.create(
+            geometry=Polygon.from_bbox((0, 0, 10, 10)), strate="arborescent"
+        )
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_export_layers(self):
+        call_command("export_layers")
+
+        parquet = gpd.read_parquet(export_path("plantability", "parquet"))
+        self.assertEqual(len(parquet), 3)
+        self.assertEqual(parquet.crs.to_epsg(), SRID_DB)
+        self.assertEqual(
+            sorted(parquet["plantability_normalized_indice"]), [0.0, 2.0, 4.0]
+        )
+        # Bbox covering column read by clients to skip row groups
+        self.assertIn("bbox", parquet.columns)
+
+        fgb = gpd.read_file(export_path("vegestrate", "fgb"))
+        self.assertEqual(list(fgb["strate"]), ["arborescent"])
+        self.assertAlmostEqual(fgb.geometry.iloc[0].area, 100)
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(export_path("vegestrate", "fgb")))),
+            [
+                "plantability.fgb",
+                "plantability.parquet",
+                "vegestrate.fgb",
+                "vegestrate.parquet",
+            ],
+        )
+
+    def test_export_one_layer(self):
+        call_command("export_layers", layer="vegestrate")
+
+        self.assertTrue(os.path.exists(export_path("vegestrate", "parquet")))
+        self.assertFalse(os.path.exists(export_path("plantability", "parquet")))
+
+    @patch("iarbre_data.utils.layer_exports.CHUNK_SIZE", 2)
+    def test_export_by_chunks(self):
+        call_command("export_layers", layer="plantability")
+
+        parquet = pq.ParquetFile(export_path("plantability", "parquet"))
+        self.assertEqual(parquet.metadata.num_rows, 3)
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        fgb = gpd.read_file(export_path("plantability", "fgb"))
+        self.assertEqual(sorted(fgb["plantability_indice"]), [0.0, 1.0, 2.0])
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+import numpy as np
+import rasterio
+from django.test import SimpleTestCase
+from rasterio.transform import from_origin
+
+from iarbre_data.utils.cog import convert_to_cog, is_cog
+
+
+class ConvertToCogTest(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "plantability.tif")
+        self.data = np.arange(2048 * 2048, dtype=np.float32).reshape(2048, 2048)
+        self.data[:10, :10] = -9999
+        with rasterio.open(
+            self.path,
+            "w",
+            driver="GTiff",
+            height=2048,
+            width=2048,
+            count=1,
+            dtype="float32",
+            nodata=-9999,
+            crs="EPSG:2154",
+            transform=from_origin(842000, 6520000, 5, 5),
+            compress="lzw",
+        ) as dst:
+            dst.write(self.data, 1)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_convert_to_cog(self):
+        self.assertFalse(is_cog(self.path))
+
+        convert_to_cog(self.path, resampling="average")
+
+        self.assertTrue(is_cog(self.path))
+        self.assertEqual(os.listdir(self.temp_dir.name), ["plantability.tif"])
+        with rasterio.open(self.path) as src:
+            self.assertEqual(src.block_shapes, [(512, 512)])
+            self.assertEqual(src.overviews(1), [2, 4])
+            self.assertEqual(src.nodata, -9999)
+            self.assertEqual(src.crs.to_epsg(), 2154)
+            np.testing.assert_array_equal(src.read(1), self.data)
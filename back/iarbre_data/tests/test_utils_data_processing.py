@@ -7,6 +7,7 @@ from iarbre_data.utils.data_processing import (
     make_valid,
     geocode_address,
     split_geometry_with_grid,
+    split_geometries_with_grid,
 )
 from shapely.geometry import Polygon, Point
 
@@ -86,3 +87,17 @@ class UtilsDataProcessingTestCase(TestCase):
         # All results should be valid geometries
         for geom in result:
             self.assertTrue(geom.is_valid)
+
+    def test_split_geometries_with_grid(self):
+        square = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+        # Within a single grid cell
+        small = Polygon([(1, 1), (2, 1), (2, 2), (1, 2)])
+
+        source_idx, pieces = split_geometries_with_grid(
+            [square, Polygon(), small], grid_size=5.0
+        )
+
+        self.assertEqual(list(source_idx), [0, 0, 0, 0, 2])
+        self.assertTrue(all(piece.geom_type == "Polygon" for piece in pieces))
+        self.assertAlmostEqual(sum(piece.area for piece in pieces[:4]), 100.0)
+        self.assertTrue(pieces[4].equals(small))
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.constants import DataType
+from iarbre_data.utils.data_version import (
+    bump_data_version,
+    get_data_version,
+    get_data_versions,
+)
+
+
+class DataVersionTestCase(TestCase):
+    def test_version_is_stable(self):
+        self.assertEqual(get_data_version(), get_data_version())
+        self.assertEqual(
+            get_data_version(DataType.LCZ.value), get_data_version(DataType.LCZ.value)
+        )
+
+    def test_version_survives_cache_clear(self):
+        version = get_data_version(DataType.LCZ.value)
+
+        cache.clear()
+
+        self.assertEqual(get_data_version(DataType.LCZ.value), version)
+
+    def test_datatype_bump_only_changes_its_versions(self):
+        before = get_data_versions()
+        global_version = get_data_version()
+
+        bump_data_version(DataType.LCZ.value)
+
+        after = get_data_versions()
+        self.assertNotEqual(
+            after.pop(DataType.LCZ.value), before.pop(DataType.LCZ.value)
+        )
+        self.assertEqual(after, before)
+        self.assertEqual(get_data_version(), global_version)
+
+    def test_global_bump_changes_all_versions(self):
+        before = get_data_versions()
+
+        bump_data_version()
+
+        after = get_data_versions()
+        for datatype in DataType.values:
+            self.assertNotEqual(after[datatype], before[datatype])
+
+    def test_combined_version_changes_with_each_datatype(self):
+        version = get_data_version(DataType.TILE.value, DataType.VULNERABILITY.value)
+
+        bump_data_version(DataType.VULNERABILITY.value)
+
+        self.assertNotEqual(
+            get_data_version(DataType.TILE.value, DataType.VULNERABILITY.value),
+            version,
+        )
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import numpy as np
+import rasterio
+from django.contrib.gis.geos import Polygon
+from django.test import TestCase
+from rasterio.transform import from_origin
+
+from iarbre_data.factories import TileFactory, VulnerabilityFactory
+from iarbre_data.management.commands.vulnerability_idx_to_raster import (
+    write_vulnerability_idx_raster,
+)
+from iarbre_data.settings import SRID_DB
+
+
+class VulnerabilityIdxToRasterTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.plantability_file = os.path.join(self.tmp_dir.name, "plantability.tif")
+        self.output_file = os.path.join(self.tmp_dir.name, "vulnerability_idx.tif")
+        with rasterio.open(
+            self.plantability_file,
+            "w",
+            driver="GTiff",
+            height=2,
+            width=2,
+            count=1,
+            dtype="float32",
+            crs=f"EPSG:{SRID_DB}",
+            transform=from_origin(900000, 6450010, 5, 5),
+            nodata=-9999,
+        ) as dst:
+            dst.write(np.zeros((2, 2), dtype=np.float32), 1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tiles_are_burnt_on_their_pixel(self):
+        vulnerability = VulnerabilityFactory()
+        # Bottom-left pixel of the raster
+        TileFactory(
+            geometry=Polygon.from_bbox((900000, 6450000, 900005, 6450005)),
+            vulnerability_idx=vulnerability,
+        )
+        # Tile without vulnerability zone, in the top-right pixel
+        TileFactory(
+            geometry=Polygon.from_bbox((900005, 6450005, 900010, 6450010)),
+            vulnerability_idx=None,
+        )
+
+        total = write_vulnerability_idx_raster(self.plantability_file, self.output_file)
+
+        self.assertEqual(total, 1)
+        with rasterio.open(self.output_file) as src:
+            ids = src.read(1)
+        np.testing.assert_array_equal(ids, [[0, 0], [vulnerability.id, 0]])
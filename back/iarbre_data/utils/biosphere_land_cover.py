@@ -66,3 +66,7 @@ CLASS_TO_BINARY = {
     121: True,
     122: True,
 }
+
+LAND_COVER_TO_CLASS = {
+    land_cover.value: code for code, land_cover in CLASS_TO_LAND_COVER.items()
+}
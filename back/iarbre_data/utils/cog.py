@@ -0,0 +1,46 @@
+"""Cloud-Optimized GeoTIFF conversion of the served rasters.
+
+A COG is a GeoTIFF with square tiles and internal overviews, ordered so that
+the header, the overviews and each tile are read with a few HTTP range
+requests. GIS clients open them remotely (`/vsicurl/` in GDAL/QGIS) and only
+fetch the window and resolution they display.
+"""
+
+import os
+
+import rasterio
+import rasterio.shutil
+
+COG_OPTIONS = {
+    "driver": "COG",
+    "blocksize": 512,
+    "compress": "LZW",
+    "predictor": "YES",
+    "overviews": "AUTO",
+    "bigtiff": "IF_SAFER",
+}
+
+
+def is_cog(path: str) -> bool:
+    """Whether the raster at `path` is already laid out as a COG."""
+    with rasterio.open(path) as src:
+        return src.tags(ns="IMAGE_STRUCTURE").get("LAYOUT") == "COG"
+
+
+def convert_to_cog(path: str, resampling: str = "nearest") -> None:
+    """Rewrite the raster at `path` as a COG.
+
+    The COG is written next to the raster then renamed, so that pending
+    downloads keep reading the previous file.
+
+    Args:
+        path (str): Path of the raster, replaced by the COG.
+        resampling (str): Resampling of the overviews: `nearest` for classes
+            and colors, `average` for continuous values.
+    """
+    root, extension = os.path.splitext(path)
+    tmp_path = f"{root}.cog{extension}"
+    rasterio.shutil.copy(
+        path, tmp_path, overview_resampling=resampling.upper(), **COG_OPTIONS
+    )
+    os.replace(tmp_path, path)
@@ -7,6 +7,7 @@ from shapely.geometry import LineString
 from shapely.ops import split
 from functools import reduce
 from django.contrib.gis.geos import GEOSGeometry, Point
+import numpy as np
 import shapely
 import geopandas as gpd
 from tqdm import tqdm
@@ -201,6 +202,81 @@ def split_geometry_with_grid(
     return [geom for geom in result if not geom.is_empty]
 
 
+def _grid_cells(bounds: np.ndarray, grid_size: float) -> np.ndarray:
+    """
+    Cells of the grid overlapping at least one of the bounding boxes.
+
+    Args:
+        bounds (np.ndarray): Bounding boxes, one `(minx, miny, maxx, maxy)` per row.
+        grid_size (float): Size of the cells, aligned on multiples of it.
+
+    Returns:
+        np.ndarray: Boxes of the cells.
+    """
+    ix0, iy0 = np.floor(bounds[:, 0] / grid_size), np.floor(bounds[:, 1] / grid_size)
+    ix1, iy1 = np.floor(bounds[:, 2] / grid_size), np.floor(bounds[:, 3] / grid_size)
+    nx = (ix1 - ix0 + 1).astype(np.int64)
+    ny = (iy1 - iy0 + 1).astype(np.int64)
+    counts = nx * ny
+    # (bounding box, cell) pairs, cells numbered row by row within each box
+    owner = np.repeat(np.arange(len(bounds)), counts)
+    rank = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ix = ix0[owner] + rank % nx[owner]
+    iy = iy0[owner] + rank // nx[owner]
+    cells = np.unique(np.stack([ix, iy], axis=1), axis=0)
+    return shapely.box(
+        cells[:, 0] * grid_size,
+        cells[:, 1] * grid_size,
+        (cells[:, 0] + 1) * grid_size,
+        (cells[:, 1] + 1) * grid_size,
+    )
+
+
+def split_geometries_with_grid(
+    geometries: np.ndarray, grid_size: float = 100.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Split geometries with a grid, all at once.
+
+    Vectorized counterpart of `split_geometry_with_grid`, with a single grid
+    aligned on multiples of `grid_size`. The cells intersecting each geometry
+    are found with an STRtree, and each geometry is intersected with its cells
+    by the shapely array functions. Invalid geometries are fixed with a zero
+    buffer first, as in `make_valid`.
+
+    Args:
+        geometries (np.ndarray): Polygonal geometries.
+        grid_size (float): Size of the grid cells in meters (default 100m).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Index in `geometries` of the source of
+            each piece, and the pieces, as Polygons.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    invalid = ~shapely.is_valid(geometries)
+    geometries[invalid] = shapely.buffer(geometries[invalid], 0)
+    indices = np.flatnonzero(~shapely.is_empty(geometries))
+    if not indices.size:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=object)
+
+    cells = _grid_cells(shapely.bounds(geometries[indices]), grid_size)
+    tree = shapely.STRtree(cells)
+    source_idx, cell_idx = tree.query(geometries[indices], predicate="intersects")
+    sources, boxes = geometries[indices][source_idx], cells[cell_idx]
+
+    # Geometries inside a single cell are kept as they are
+    pieces = sources.copy()
+    crossing = ~shapely.covers(boxes, sources)
+    pieces[crossing] = shapely.intersection(sources[crossing], boxes[crossing])
+
+    # Drop the lines and points where a geometry only touches a cell
+    parts, part_idx = shapely.get_parts(pieces, return_index=True)
+    keep = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & (
+        shapely.area(parts) > 0
+    )
+    return indices[source_idx[part_idx[keep]]], parts[keep]
+
+
 def geocode_address(address: str) -> Point:
     """
     Geocode address using OpenStreetMap Nominatim API.
@@ -0,0 +1,70 @@
+"""Version of the data served by the API.
+
+The version is a random token stored in the `DataVersion` table, changed each
+time the data is regenerated. Cached results computed from the data include it
+in their keys and ETags, so they are invalidated at once without wiping the
+cache. The tokens are not stored in the cache themselves, where an eviction
+would invalidate every cached result.
+
+Besides the global version, bumped by every pipeline step, each datatype has
+its own version, bumped by the commands importing only that datatype. The
+version of a datatype changes with both, so importing a layer only invalidates
+the results computed from it.
+"""
+
+import uuid
+
+from api.constants import DataType
+from iarbre_data.models import DataVersion
+
+# Datatype of the global version
+GLOBAL_VERSION = ""
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _get_versions(keys: list[str]) -> dict[str, str]:
+    """Version of each datatype of `keys`, created when missing."""
+    versions = dict(
+        DataVersion.objects.filter(datatype__in=keys).values_list("datatype", "version")
+    )
+    for key in keys:
+        if key not in versions:
+            data_version, _ = DataVersion.objects.get_or_create(
+                datatype=key, defaults={"version": _new_version()}
+            )
+            versions[key] = data_version.version
+    return versions
+
+
+def get_data_version(*datatypes: str) -> str:
+    """Return the current version of the data, or of the data of `datatypes`."""
+    keys = [GLOBAL_VERSION, *datatypes]
+    versions = _get_versions(keys)
+    return "-".join(versions[key] for key in keys)
+
+
+def get_data_versions() -> dict[str, str]:
+    """Return the current version of the data of each datatype."""
+    versions = _get_versions([GLOBAL_VERSION, *DataType.values])
+    return {
+        datatype: f"{versions[GLOBAL_VERSION]}-{versions[datatype]}"
+        for datatype in DataType.values
+    }
+
+
+def bump_data_version(*datatypes: str) -> str:
+    """Invalidate the results cached for the previous data version.
+
+    Without `datatypes`, the results of all the datatypes are invalidated.
+
+    Returns:
+        str: The new version of the data of `datatypes`.
+    """
+    for key in datatypes or [GLOBAL_VERSION]:
+        DataVersion.objects.update_or_create(
+            datatype=key, defaults={"version": _new_version()}
+        )
+    return get_data_version(*datatypes)
@@ -0,0 +1,200 @@
+"""Bulk exports of the plantability and vegestrate layers.
+
+Each layer is written as GeoParquet and FlatGeobuf after the data is updated,
+and served by `api.views.export_views` with HTTP range requests. The features
+are sorted by PostGIS along a space-filling curve, so that each row group of
+the GeoParquet file covers a compact area, described by its bbox covering
+column, and readers skip the row groups outside of their bounding box. The
+FlatGeobuf file embeds a packed R-tree to the same effect.
+
+The features are read and written by chunks of `CHUNK_SIZE`, so that the
+memory used does not grow with the size of the layer.
+"""
+
+import json
+import os
+from itertools import islice
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyproj
+import shapely
+from django.conf import settings
+from django.contrib.gis.db.models.functions import AsWKB
+from pyogrio.raw import write_arrow
+
+from iarbre_data.models import Tile, Vegestrate
+from iarbre_data.settings import SRID_DB
+
+# Layer -> (model, exported fields besides the geometry)
+EXPORT_LAYERS = {
+    "plantability": (
+        Tile,
+        ["plantability_indice", "plantability_normalized_indice"],
+    ),
+    "vegestrate": (Vegestrate, ["strate", "surface"]),
+}
+# File extension -> content type
+EXPORT_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "fgb": "application/octet-stream",
+}
+CHUNK_SIZE = 100_000
+ROW_GROUP_SIZE = 50_000
+
+# Django internal type -> Arrow type of the exported column
+ARROW_TYPES = {
+    "AutoField": pa.int32(),
+    "BigAutoField": pa.int64(),
+    "IntegerField": pa.int32(),
+    "FloatField": pa.float64(),
+    "CharField": pa.string(),
+}
+BBOX_TYPE = pa.struct(
+    [(name, pa.float64()) for name in ("xmin", "ymin", "xmax", "ymax")]
+)
+
+
+def export_path(layer: str, export_format: str) -> str:
+    """Path of the export of `layer` in `export_format`."""
+    return os.path.join(settings.MEDIA_ROOT, "exports", f"{layer}.{export_format}")
+
+
+def _geometry_type(layer: str) -> str:
+    model, _ = EXPORT_LAYERS[layer]
+    return model._meta.get_field("geometry").geom_class.__name__
+
+
+def layer_schema(layer: str) -> pa.Schema:
+    """Arrow schema of the GeoParquet export of `layer`.
+
+    The geometries are stored as WKB, with a bbox covering column, as described
+    by the GeoParquet 1.1 metadata of the schema.
+    """
+    model, fields = EXPORT_LAYERS[layer]
+    geo = {
+        "version": "1.1.0",
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_types": [_geometry_type(layer)],
+                "crs": pyproj.CRS.from_epsg(SRID_DB).to_json_dict(),
+                "covering": {
+                    "bbox": {
+                        name: ["bbox", name]
+                        for name in ("xmin", "ymin", "xmax", "ymax")
+                    }
+                },
+            }
+        },
+    }
+    columns = [
+        (name, ARROW_TYPES[model._meta.get_field(name).get_internal_type()])
+        for name in ["id", *fields]
+    ]
+    return pa.schema(
+        [*columns, ("geometry", pa.binary()), ("bbox", BBOX_TYPE)],
+        metadata={"geo": json.dumps(geo)},
+    )
+
+
+def iter_layer_batches(layer: str) -> Iterator[pa.RecordBatch]:
+    """Yield the features of `layer` by batches of `CHUNK_SIZE`.
+
+    The features are sorted in SQL, and their geometries are read as WKB, which
+    is stored as is.
+    """
+    model, fields = EXPORT_LAYERS[layer]
+    schema = layer_schema(layer)
+    columns = ["id", *fields, "wkb"]
+    rows = (
+        # PostGIS sorts geometries along a space-filling curve
+        model.objects.order_by("geometry")
+        .annotate(wkb=AsWKB("geometry"))
+        .values_list(*columns)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        yield rows_to_batch(chunk, schema)
+
+
+def rows_to_batch(rows: list[tuple], schema: pa.Schema) -> pa.RecordBatch:
+    """Convert rows of fields ending with the WKB geometry to a record batch."""
+    values = list(zip(*rows))
+    wkbs = [bytes(wkb) for wkb in values.pop()]
+    bounds = shapely.bounds(shapely.from_wkb(wkbs))
+    bbox = pa.StructArray.from_arrays(
+        [pa.array(bounds[:, index]) for index in range(4)],
+        fields=list(BBOX_TYPE),
+    )
+    return pa.RecordBatch.from_arrays([*values, wkbs, bbox], schema=schema)
+
+
+def write_parquet(layer: str, path: str) -> int:
+    """Write the GeoParquet export of `layer` to `path`.
+
+    Returns:
+        int: Number of features written.
+    """
+    count = 0
+    with pq.ParquetWriter(path, layer_schema(layer)) as writer:
+        for batch in iter_layer_batches(layer):
+            writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+            count += batch.num_rows
+    return count
+
+
+def write_flatgeobuf(layer: str, parquet_path: str, path: str) -> None:
+    """Write the FlatGeobuf export of `layer` from its GeoParquet export.
+
+    The batches of the GeoParquet file are streamed to GDAL, which builds the
+    spatial index.
+    """
+    _, fields = EXPORT_LAYERS[layer]
+    columns = ["id", *fields, "geometry"]
+    parquet = pq.ParquetFile(parquet_path)
+    batches = pa.RecordBatchReader.from_batches(
+        parquet.schema_arrow.remove_metadata().remove(
+            parquet.schema_arrow.get_field_index("bbox")
+        ),
+        parquet.iter_batches(batch_size=CHUNK_SIZE, columns=columns),
+    )
+    write_arrow(
+        batches,
+        path,
+        layer=layer,
+        driver="FlatGeobuf",
+        geometry_name="geometry",
+        geometry_type=_geometry_type(layer),
+        crs=f"EPSG:{SRID_DB}",
+        layer_options={"SPATIAL_INDEX": "YES"},
+    )
+
+
+def write_exports(layer: str) -> tuple[int, list[str]]:
+    """Write the GeoParquet and FlatGeobuf exports of `layer`.
+
+    Each file is written under a temporary name then renamed, so that pending
+    downloads keep reading the previous export.
+
+    Returns:
+        tuple[int, list[str]]: Number of features and paths of the exports.
+    """
+    paths = {
+        export_format: export_path(layer, export_format)
+        for export_format in EXPORT_FORMATS
+    }
+    directory = os.path.dirname(paths["parquet"])
+    os.makedirs(directory, exist_ok=True)
+    # GDAL picks the FlatGeobuf layout from the extension, keep it last
+    tmp_paths = {
+        export_format: os.path.join(directory, f"{layer}.tmp.{export_format}")
+        for export_format in EXPORT_FORMATS
+    }
+    count = write_parquet(layer, tmp_paths["parquet"])
+    write_flatgeobuf(layer, tmp_paths["parquet"], tmp_paths["fgb"])
+    for export_format, path in paths.items():
+        os.replace(tmp_paths[export_format], path)
+    return count, list(paths.values())
@@ -1,5 +1,7 @@
 from enum import IntEnum
 
+import numpy as np
+
 
 class PlantabilityNormalizedThreshold(IntEnum):
     IMPOSSIBLE = 0
@@ -36,3 +38,13 @@ def score_thresholding(value):
         if value <= threshold:
             return i * 2
     return PLANTABILITY_THRESHOLDS[-1]
+
+
+def score_thresholding_array(values: np.ndarray) -> np.ndarray:
+    """Vectorized `score_thresholding` over an array of plantability indices."""
+    # Compare in double precision, as `score_thresholding` does on Python floats
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, PLANTABILITY_THRESHOLDS[-1], dtype=np.float32)
+    for i, threshold in reversed(list(enumerate(PLANTABILITY_THRESHOLDS[:-1]))):
+        result[values <= threshold] = i * 2
+    return result
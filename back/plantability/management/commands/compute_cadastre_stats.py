@@ -0,0 +1,225 @@
+"""Compute the plantability statistics of the cadastre parcels from the rasters."""
+
+import json
+import os
+
+import numpy as np
+import rasterio
+from django.core.management import BaseCommand
+from django.db.models import Q
+from rasterio import features
+from rasterio.errors import WindowError
+from rasterio.windows import Window, from_bounds
+from tqdm import tqdm
+
+from api.utils.raster_scores import (
+    NO_VULNERABILITY,
+    PLANTABILITY_RASTER,
+    VULNERABILITY_IDX_RASTER,
+    raster_path,
+)
+from api.constants import DataType
+from iarbre_data.models import Cadastre
+from iarbre_data.utils.data_version import bump_data_version
+from plantability.constants import (
+    PLANTABILITY_NORMALIZED,
+    PLANTABILITY_THRESHOLDS,
+    score_thresholding_array,
+)
+
+# Pixels above this plantability indice (favorable or very favorable) are
+# counted in the plantable area
+PLANTABLE_MIN_INDICE = PLANTABILITY_THRESHOLDS[3]
+BATCH_SIZE = 5000
+
+
+def _parcels_window(src, geometries: list) -> Window | None:
+    """Window of the raster covering all the geometries, None if outside."""
+    extents = np.array([geometry.extent for geometry in geometries])
+    window = from_bounds(
+        extents[:, 0].min(),
+        extents[:, 1].min(),
+        extents[:, 2].max(),
+        extents[:, 3].max(),
+        transform=src.transform,
+    )
+    window = window.round_offsets(op="floor").round_lengths(op="ceil")
+    try:
+        return window.intersection(Window(0, 0, src.width, src.height))
+    except WindowError:
+        return None
+
+
+def _dominant_vulnerabilities(labels: np.ndarray, vulnerability_ids: np.ndarray):
+    """Most frequent vulnerability id per label."""
+    covered = vulnerability_ids != NO_VULNERABILITY
+    pairs, counts = np.unique(
+        np.stack([labels[covered], vulnerability_ids[covered]]),
+        axis=1,
+        return_counts=True,
+    )
+    dominant = {}
+    for (label, vulnerability_id), count in zip(pairs.T, counts):
+        if count > dominant.get(label, (None, 0))[1]:
+            dominant[label] = (int(vulnerability_id), count)
+    return {
+        label: vulnerability_id for label, (vulnerability_id, _) in dominant.items()
+    }
+
+
+def compute_parcel_stats(
+    geometries: list, plantability_file: str, vulnerability_file: str | None = None
+) -> list[dict | None]:
+    """Zonal statistics of the plantability raster, for each geometry.
+
+    The geometries are rasterized on the grid of the plantability raster, then
+    the statistics of all the geometries are computed at once with `bincount`.
+    A pixel belongs to the geometry containing its center, so geometries smaller
+    than a pixel may have no statistics.
+
+    Args:
+        geometries (list[GEOSGeometry]): Non-overlapping polygons in the raster CRS.
+        plantability_file (str): Path to the plantability raster.
+        vulnerability_file (str | None): Optional raster of the vulnerability zone
+            ids, aligned on the plantability raster.
+
+    Returns:
+        list[dict | None]: `plantability_counts`, `average_normalized_indice`,
+            `plantable_area` and `vulnerability_idx_id` per geometry, None when
+            the geometry covers no pixel.
+    """
+    with rasterio.open(plantability_file) as src:
+        window = _parcels_window(src, geometries)
+        if window is None:
+            return [None] * len(geometries)
+        values = src.read(1, window=window)
+        transform = src.window_transform(window)
+        nodata = src.nodata
+        pixel_area = abs(src.transform.a * src.transform.e)
+
+    labels = features.rasterize(
+        (
+            (json.loads(geometry.json), label)
+            for label, geometry in enumerate(geometries, start=1)
+        ),
+        out_shape=values.shape,
+        transform=transform,
+        fill=0,
+        dtype="int32",
+    )
+    valid = (labels > 0) & np.isfinite(values)
+    if nodata is not None:
+        valid &= values != nodata
+    labels = labels[valid]
+    values = values[valid]
+    indices = score_thresholding_array(values)
+
+    size = len(geometries) + 1
+    counts = np.bincount(labels, minlength=size)
+    indice_sums = np.bincount(labels, weights=indices, minlength=size)
+    plantable_counts = np.bincount(
+        labels, weights=values > PLANTABLE_MIN_INDICE, minlength=size
+    )
+    histograms = {
+        str(value): np.zeros(size, dtype=np.int64) for value in PLANTABILITY_NORMALIZED
+    }
+    for indice in np.unique(indices):
+        # Same bucketing as `compute_plantability_counts`
+        key = str(min(PLANTABILITY_NORMALIZED, key=lambda x: abs(x - indice)))
+        histograms[key] += np.bincount(labels[indices == indice], minlength=size)
+
+    dominant_vulnerabilities = {}
+    if vulnerability_file and os.path.exists(vulnerability_file):
+        with rasterio.open(vulnerability_file) as src:
+            vulnerability_ids = src.read(1, window=window)[valid]
+        dominant_vulnerabilities = _dominant_vulnerabilities(labels, vulnerability_ids)
+
+    stats = []
+    for label in range(1, size):
+        if not counts[label]:
+            stats.append(None)
+            continue
+        stats.append(
+            {
+                "plantability_counts": {
+                    key: int(histogram[label]) for key, histogram in histograms.items()
+                },
+                "average_normalized_indice": float(indice_sums[label] / counts[label]),
+                "plantable_area": float(plantable_counts[label] * pixel_area),
+                "vulnerability_idx_id": dominant_vulnerabilities.get(label),
+            }
+        )
+    return stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the plantability and vulnerability statistics of the cadastre parcels"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--city-code",
+            type=str,
+            help="Optional: Compute only for a specific city code",
+        )
+
+    def handle(self, *args, **options):
+        parcels = Cadastre.objects.all()
+        if options["city_code"]:
+            parcels = parcels.filter(city_code=options["city_code"])
+        # Parcels without a city code are processed together, under ""
+        city_codes = sorted(
+            {code or "" for code in parcels.values_list("city_code", flat=True)}
+        )
+
+        plantability_file = raster_path(PLANTABILITY_RASTER)
+        vulnerability_file = raster_path(VULNERABILITY_IDX_RASTER)
+        if not os.path.exists(vulnerability_file):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{vulnerability_file} not found, run vulnerability_idx_to_raster "
+                    "to compute the dominant vulnerability of the parcels."
+                )
+            )
+
+        fields = [
+            "plantability_counts",
+            "average_normalized_indice",
+            "plantable_area",
+            "vulnerability_idx",
+        ]
+        # One zonal pass per city, whose parcels are close to each other
+        for city_code in tqdm(city_codes, desc="Processing cities"):
+            city_filter = (
+                Q(city_code=city_code)
+                if city_code
+                else Q(city_code="") | Q(city_code__isnull=True)
+            )
+            city_parcels = list(parcels.filter(city_filter).only("id", "geometry"))
+            stats = compute_parcel_stats(
+                [parcel.geometry for parcel in city_parcels],
+                plantability_file,
+                vulnerability_file,
+            )
+            for parcel, parcel_stats in zip(city_parcels, stats):
+                parcel_stats = parcel_stats or {}
+                parcel.plantability_counts = parcel_stats.get("plantability_counts")
+                parcel.average_normalized_indice = parcel_stats.get(
+                    "average_normalized_indice"
+                )
+                parcel.plantable_area = parcel_stats.get("plantable_area")
+                parcel.vulnerability_idx_id = parcel_stats.get("vulnerability_idx_id")
+            Cadastre.objects.bulk_update(city_parcels, fields, batch_size=BATCH_SIZE)
+
+        bump_data_version(DataType.CADASTRE.value)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully computed the statistics of {parcels.count()} parcels!"
+            )
+        )
+        # The statistics are properties of the cadastre MVT tiles
+        self.stdout.write(
+            "Regenerate the cadastre tiles to serve them: "
+            "generate_mvt --geolevel cadastre --datatype cadastre"
+        )
@@ -0,0 +1,172 @@
+"""Compute the PlantabilityGridCell aggregates used for in-polygon scores."""
+
+from collections import defaultdict
+
+from django.contrib.gis.db.models import Extent
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, FloatField, Func, Q
+from django.db.models.functions import Floor
+from tqdm import tqdm
+
+from api.utils.grid_scores import GRID_RESOLUTIONS
+from iarbre_data.models import PlantabilityGridCell, Tile
+from iarbre_data.settings import SRID_DB
+
+
+class XMin(Func):
+    function = "ST_XMin"
+    output_field = FloatField()
+
+
+class YMax(Func):
+    function = "ST_YMax"
+    output_field = FloatField()
+
+
+class Command(BaseCommand):
+    help = "Aggregate the tiles into a grid of nested cells, for fast in-polygon scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of cells created per query",
+        )
+
+    @staticmethod
+    def _finest_cells(x0: float, y0: float) -> dict:
+        """Aggregate the tiles by cell of the finest resolution, in the database."""
+        resolution = GRID_RESOLUTIONS[0]
+        tiles = Tile.objects.annotate(
+            col=Floor((XMin("geometry") - x0) / resolution),
+            row=Floor((y0 - YMax("geometry")) / resolution),
+        )
+        cells = {}
+        for cell in tiles.values("col", "row").annotate(
+            tile_count=Count("id"),
+            vulnerability_ids=ArrayAgg(
+                "vulnerability_idx_id",
+                distinct=True,
+                filter=Q(vulnerability_idx_id__isnull=False),
+                default=[],
+            ),
+            iris_ids=ArrayAgg(
+                "iris_id", distinct=True, filter=Q(iris_id__isnull=False), default=[]
+            ),
+            city_ids=ArrayAgg(
+                "city_id", distinct=True, filter=Q(city_id__isnull=False), default=[]
+            ),
+        ):
+            cells[(int(cell["col"]), int(cell["row"]))] = {
+                "tile_count": cell["tile_count"],
+                "plantability_histogram": {},
+                "vulnerability_ids": set(cell["vulnerability_ids"]),
+                "iris_ids": set(cell["iris_ids"]),
+                "city_ids": set(cell["city_ids"]),
+            }
+
+        histograms = (
+            tiles.exclude(plantability_normalized_indice__isnull=True)
+            .values("col", "row", "plantability_normalized_indice")
+            .annotate(count=Count("id"))
+        )
+        for item in histograms:
+            histogram = cells[(int(item["col"]), int(item["row"]))][
+                "plantability_histogram"
+            ]
+            histogram[str(item["plantability_normalized_indice"])] = item["count"]
+        return cells
+
+    @staticmethod
+    def _coarser_cells(finest_cells: dict, resolution: int) -> dict:
+        """Merge the finest cells into the cells of a coarser resolution."""
+        cells = defaultdict(
+            lambda: {
+                "tile_count": 0,
+                "plantability_histogram": defaultdict(int),
+                "vulnerability_ids": set(),
+                "iris_ids": set(),
+                "city_ids": set(),
+            }
+        )
+        ratio = resolution // GRID_RESOLUTIONS[0]
+        for (col, row), cell in finest_cells.items():
+            parent = cells[(col // ratio, row // ratio)]
+            parent["tile_count"] += cell["tile_count"]
+            for value, count in cell["plantability_histogram"].items():
+                parent["plantability_histogram"][value] += count
+            for key in ("vulnerability_ids", "iris_ids", "city_ids"):
+                parent[key].update(cell[key])
+        return cells
+
+    def handle(self, *args, **options):
+        extent = Tile.objects.aggregate(extent=Extent("geometry"))["extent"]
+        if extent is None:
+            raise CommandError("No tiles, run raster_plantability_to_geom first.")
+        x0, y0 = extent[0], extent[3]
+
+        # Tiles are the pixels of the plantability raster: with the grid origin
+        # on a tile corner, each tile lies in a single cell of each resolution.
+        xmin, ymin, xmax, ymax = Tile.objects.first().geometry.extent
+        if any(
+            resolution % (xmax - xmin) or resolution % (ymax - ymin)
+            for resolution in GRID_RESOLUTIONS
+        ):
+            raise CommandError(
+                f"Tiles of {xmax - xmin}x{ymax - ymin}m are not aligned with the "
+                f"{GRID_RESOLUTIONS} grid resolutions."
+            )
+
+        self.stdout.write("Aggregating tiles by cell...")
+        finest_cells = self._finest_cells(x0, y0)
+        cells_by_resolution = {GRID_RESOLUTIONS[0]: finest_cells}
+        for resolution in GRID_RESOLUTIONS[1:]:
+            cells_by_resolution[resolution] = self._coarser_cells(
+                finest_cells, resolution
+            )
+
+        with transaction.atomic():
+            PlantabilityGridCell.objects.all().delete()
+            for resolution, cells in cells_by_resolution.items():
+                grid_cells = [
+                    PlantabilityGridCell(
+                        resolution=resolution,
+                        col=col,
+                        row=row,
+                        geometry=Polygon.from_bbox(
+                            (
+                                x0 + col * resolution,
+                                y0 - (row + 1) * resolution,
+                                x0 + (col + 1) * resolution,
+                                y0 - row * resolution,
+                            )
+                        ),
+                        tile_count=cell["tile_count"],
+                        plantability_histogram=dict(cell["plantability_histogram"]),
+                        vulnerability_ids=sorted(cell["vulnerability_ids"]),
+                        iris_ids=sorted(cell["iris_ids"]),
+                        city_ids=sorted(cell["city_ids"]),
+                    )
+                    for (col, row), cell in tqdm(
+                        cells.items(), desc=f"Cells of {resolution}m"
+                    )
+                ]
+                for grid_cell in grid_cells:
+                    grid_cell.geometry.srid = SRID_DB
+                PlantabilityGridCell.objects.bulk_create(
+                    grid_cells, batch_size=options["batch_size"]
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Successfully computed the plantability grid: "
+                + ", ".join(
+                    f"{len(cells)} cells of {resolution}m"
+                    for resolution, cells in cells_by_resolution.items()
+                )
+            )
+        )
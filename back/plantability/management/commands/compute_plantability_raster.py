@@ -5,6 +5,7 @@ import numpy as np
 from iarbre_data.data_config import FACTORS
 from iarbre_data.settings import BASE_DIR
 
+from iarbre_data.utils.cog import convert_to_cog
 from iarbre_data.utils.database import log_progress, select_city
 from typing import Dict, Any
 from plantability.constants import colors, rgb_colors
@@ -182,3 +183,8 @@ class Command(BaseCommand):
         with rasterio.open(output_color_file, "w", **color_meta) as dst:
             for i in range(3):
                 dst.write(result_colors[:, :, i], i + 1)
+
+        # Tiled with overviews, for clients reading windows over HTTP
+        log_progress("Converting the plantability rasters to COG")
+        convert_to_cog(output_file, resampling="average")
+        convert_to_cog(output_color_file)
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+import numpy as np
+import rasterio
+from django.contrib.gis.geos import Polygon
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rasterio.transform import from_origin
+
+from iarbre_data.factories import VulnerabilityFactory
+from iarbre_data.models import Cadastre
+from iarbre_data.settings import SRID_DB
+from plantability.management.commands.compute_cadastre_stats import (
+    compute_parcel_stats,
+)
+
+
+class ComputeCadastreStatsTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp_dir.name, "rasters"))
+        self.plantability_file = os.path.join(
+            self.tmp_dir.name, "rasters", "plantability.tif"
+        )
+        self.vulnerability_file = os.path.join(
+            self.tmp_dir.name, "rasters", "tile_vulnerability_idx.tif"
+        )
+        profile = {
+            "driver": "GTiff",
+            "height": 20,
+            "width": 20,
+            "count": 1,
+            "crs": f"EPSG:{SRID_DB}",
+            "transform": from_origin(900000, 6450100, 5, 5),
+        }
+        # Plantability 1.0 (favorable) on the left half, -3.0 on the right half
+        plantability = np.ones((20, 20), dtype=np.float32)
+        plantability[:, 10:] = -3.0
+        with rasterio.open(
+            self.plantability_file, "w", dtype="float32", nodata=-9999, **profile
+        ) as dst:
+            dst.write(plantability, 1)
+
+        self.vulnerabilities = [VulnerabilityFactory(), VulnerabilityFactory()]
+        # First zone on the 5 top rows, second zone below
+        vulnerability_ids = np.full((20, 20), self.vulnerabilities[1].id, np.int32)
+        vulnerability_ids[:5, :] = self.vulnerabilities[0].id
+        with rasterio.open(
+            self.vulnerability_file, "w", dtype="int32", nodata=0, **profile
+        ) as dst:
+            dst.write(vulnerability_ids, 1)
+
+        # Left half of the raster, and a square across both halves
+        self.left = Polygon.from_bbox((900000, 6450000, 900050, 6450100))
+        self.middle = Polygon.from_bbox((900050, 6450000, 900070, 6450020))
+        self.middle.srid = self.left.srid = SRID_DB
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parcel_stats(self):
+        left, middle, outside = compute_parcel_stats(
+            [
+                self.left,
+                self.middle,
+                Polygon.from_bbox((800000, 6400000, 800010, 6400010)),
+            ],
+            self.plantability_file,
+            self.vulnerability_file,
+        )
+
+        self.assertEqual(left["plantability_counts"]["8"], 200)
+        self.assertEqual(left["average_normalized_indice"], 8.0)
+        self.assertEqual(left["plantable_area"], 200 * 25)
+        self.assertEqual(left["vulnerability_idx_id"], self.vulnerabilities[1].id)
+        self.assertEqual(middle["plantability_counts"]["2"], 16)
+        self.assertEqual(middle["plantable_area"], 0)
+        self.assertIsNone(outside)
+
+    def test_command_stores_stats(self):
+        parcel = Cadastre.objects.create(
+            geometry=self.left, parcel_id="69123000AB0001", city_code="69123"
+        )
+
+        with override_settings(MEDIA_ROOT=self.tmp_dir.name):
+            call_command("compute_cadastre_stats")
+
+        parcel.refresh_from_db()
+        self.assertEqual(parcel.average_normalized_indice, 8.0)
+        self.assertEqual(parcel.plantable_area, 5000)
+        self.assertEqual(parcel.vulnerability_idx, self.vulnerabilities[1])
+
+    def test_command_stores_stats_of_parcels_without_city_code(self):
+        parcel = Cadastre.objects.create(
+            geometry=self.left, parcel_id="69123000AB0002", city_code=""
+        )
+
+        with override_settings(MEDIA_ROOT=self.tmp_dir.name):
+            call_command("compute_cadastre_stats")
+
+        parcel.refresh_from_db()
+        self.assertEqual(parcel.average_normalized_indice, 8.0)
@@ -6,8 +6,11 @@ from django.core.management import BaseCommand
 from django.db.models import Sum
 from tqdm import tqdm
 
+from api.constants import DataType
+from api.utils.raster_clip import delete_previous_clips
+from iarbre_data.utils.data_version import bump_data_version
 from iarbre_data.utils.database import log_progress
-from iarbre_data.models import Vegestrate, City
+from iarbre_data.models import AdminUnitOverlay, Vegestrate, City
 from iarbre_data.settings import SRID_MAPLIBRE, SRID_DB
 
 STRATE_TREES = 3
@@ -125,7 +128,10 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """Load Vegestrate data, compute stats for cities and save everything in DB."""
         log_progress("Cleaning Vegestrate model")
+        AdminUnitOverlay.objects.filter(vegestrate__isnull=False).delete()
         print(Vegestrate.objects.all().delete())
         log_progress("Process and save large Vegestrate data in chunks")
         process_vegestrate_data_in_chunks(PATHS[0], chunk_size=5000)
         compute_city_vegetation_surfaces()
+        bump_data_version(DataType.VEGESTRATE.value)
+        delete_previous_clips()